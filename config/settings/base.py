@@ -302,11 +302,48 @@ CELERY_TASK_SERIALIZER = "json"
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std:setting-result_serializer
 CELERY_RESULT_SERIALIZER = "json"
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#task-time-limit
-# TODO: set to whatever value is adequate in your circumstances
+# Default for short tasks; long-running ones set their own limits.
 CELERY_TASK_TIME_LIMIT = 5 * 60
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#task-soft-time-limit
-# TODO: set to whatever value is adequate in your circumstances
 CELERY_TASK_SOFT_TIME_LIMIT = 60
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#task-default-queue
+CELERY_TASK_DEFAULT_QUEUE = "default"
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#task-routes
+# Heavy work gets its own queues so it can't starve short tasks; see the
+# worker start scripts for which worker consumes which queue.
+CELERY_TASK_ROUTES = {
+    "netcdf_backend.apps.netcdf.tasks.preprocess_netcdf": {"queue": "preprocess"},
+    "netcdf_backend.apps.netcdf.tasks.export_geotiff": {"queue": "export"},
+    "netcdf_backend.apps.netcdf.tasks.export_geojson": {"queue": "export"},
+    "netcdf_backend.apps.netcdf.tasks.create_timeseries_copy": {"queue": "preprocess"},
+    "netcdf_backend.apps.netcdf.tasks.convert_netcdf_to_zarr": {"queue": "preprocess"},
+    "netcdf_backend.apps.netcdf.tasks.create_climatology": {"queue": "preprocess"},
+    "netcdf_backend.apps.netcdf.tasks.plan_animation": {"queue": "render"},
+    "netcdf_backend.apps.netcdf.tasks.render_animation_frames": {"queue": "render"},
+    "netcdf_backend.apps.netcdf.tasks.encode_animation_frames": {"queue": "render"},
+    "netcdf_backend.apps.netcdf.tasks.warm_file_cache": {"queue": "maintenance"},
+    "netcdf_backend.apps.netcdf.tasks.evict_file_cache": {"queue": "maintenance"},
+}
+# https://docs.celeryq.dev/en/stable/userguide/routing.html#redis-message-priorities
+# Within a queue, messages of a lower priority step are served first; a
+# task's priority is rounded down to a step (USER_PRIORITY 0 and
+# BATCH_PRIORITY 6 are steps of their own). These are the transport's
+# defaults, spelled out because changing them renames the priority queues.
+# Queues themselves are consumed round-robin so none starves the others.
+# The visibility timeout must exceed the longest task's time limit, or
+# late-acked tasks are redelivered while still running.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": [0, 3, 6, 9],
+    "sep": "\x06\x16",
+    "visibility_timeout": 2 * 60 * 60,
+}
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#task-acks-late
+# Tasks are acknowledged once done, so a crashed worker's task is retried.
+CELERY_TASK_ACKS_LATE = True
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#worker-prefetch-multiplier
+# Long tasks: don't reserve more than the one being run, or queued work
+# waits behind a busy worker while others idle.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-scheduler
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#worker-send-task-events
@@ -360,6 +397,112 @@ SPECTACULAR_SETTINGS = {
 # Your stuff...
 # ------------------------------------------------------------------------------
 
+# NetCDF
+# ------------------------------------------------------------------------------
+# Write a time-contiguous copy of every upload so point timeseries reads only
+# touch the chunks of the requested cell instead of the whole file.
+NETCDF_TIMESERIES_COPY_ENABLED = env.bool(
+    "NETCDF_TIMESERIES_COPY_ENABLED",
+    default=True,
+)
+# Number of lat/lon cells per chunk in the timeseries copy (time is never split).
+NETCDF_TIMESERIES_SPATIAL_CHUNK = env.int("NETCDF_TIMESERIES_SPATIAL_CHUNK", default=8)
+# Bytes of a variable read at a time when writing the copy: larger slabs read
+# sources chunked per time step fewer times.
+NETCDF_TIMESERIES_COPY_MEMORY = env.int(
+    "NETCDF_TIMESERIES_COPY_MEMORY",
+    default=256 * 1024 * 1024,
+)
+# Convert every upload to a Zarr store next to the original; readers prefer it
+# because it needs no HDF5 lock and its consolidated metadata opens instantly.
+NETCDF_ZARR_ENABLED = env.bool("NETCDF_ZARR_ENABLED", default=True)
+# Zarr chunk length per dimension name; dimensions not listed are not split.
+NETCDF_ZARR_CHUNKS = {
+    "time": 365,
+    "lat": 128,
+    "latitude": 128,
+    "lon": 128,
+    "longitude": 128,
+}
+NETCDF_ZARR_COMPRESSION_LEVEL = env.int("NETCDF_ZARR_COMPRESSION_LEVEL", default=3)
+# Compute each upload's climatology (monthly means, annual mean, std) once, for
+# the spatial plots and anomalies to read instead of reducing the full series.
+NETCDF_CLIMATOLOGY_ENABLED = env.bool("NETCDF_CLIMATOLOGY_ENABLED", default=True)
+# Time steps read at once while computing it, or a change's window means;
+# bounds their memory.
+NETCDF_CLIMATOLOGY_TIME_BLOCK = env.int("NETCDF_CLIMATOLOGY_TIME_BLOCK", default=365)
+# Periods precomputed for every scenario/variable/season by the cache warm-up.
+NETCDF_PRECOMPUTE_PERIODS = env.list(
+    "NETCDF_PRECOMPUTE_PERIODS",
+    default=["2025-2054", "2055-2084"],
+)
+# Seconds clients/CDNs may reuse a GeoTIFF/GeoJSON lookup before revalidating.
+NETCDF_LOOKUP_MAX_AGE = env.int("NETCDF_LOOKUP_MAX_AGE", default=60)
+# Part of every FileCache source fingerprint: bump it when a change to the
+# preprocessing pipeline should regenerate all cached artifacts.
+NETCDF_PIPELINE_VERSION = env("NETCDF_PIPELINE_VERSION", default="2")
+# Significance level of the change maps, applied to the Benjamini-Hochberg
+# q-values (false discovery rate across the grid) or, with FDR control off,
+# to each cell's own Welch t-test p-value.
+NETCDF_SIGNIFICANCE_LEVEL = env.float("NETCDF_SIGNIFICANCE_LEVEL", default=0.05)
+NETCDF_SIGNIFICANCE_FDR = env.bool("NETCDF_SIGNIFICANCE_FDR", default=True)
+# Maps of grids with more cells than this are drawn as a raster instead of
+# filled contours, with contour lines computed on a grid coarsened to at most
+# NETCDF_RENDER_CONTOUR_MAX_CELLS.
+NETCDF_RENDER_RASTER_MIN_CELLS = env.int(
+    "NETCDF_RENDER_RASTER_MIN_CELLS",
+    default=40_000,
+)
+NETCDF_RENDER_CONTOUR_MAX_CELLS = env.int(
+    "NETCDF_RENDER_CONTOUR_MAX_CELLS",
+    default=10_000,
+)
+# Seconds a map render may take before optional layers (contour lines, their
+# labels) are skipped.
+NETCDF_RENDER_TIME_BUDGET = env.float("NETCDF_RENDER_TIME_BUDGET", default=5.0)
+# Seconds rendered plots and computed changes are cached, keyed by file and
+# every request parameter.
+NETCDF_PLOT_CACHE_TIMEOUT = env.int("NETCDF_PLOT_CACHE_TIMEOUT", default=60 * 60 * 24)
+# Seconds plots are cached when an image failed, or was drawn without the
+# layers skipped over NETCDF_RENDER_TIME_BUDGET.
+NETCDF_PLOT_PARTIAL_CACHE_TIMEOUT = env.int(
+    "NETCDF_PLOT_PARTIAL_CACHE_TIMEOUT",
+    default=60,
+)
+# Animations keep every n-th frame beyond this many, and render this many
+# frames per task, the tasks running in parallel on the render workers.
+NETCDF_ANIMATION_MAX_FRAMES = env.int("NETCDF_ANIMATION_MAX_FRAMES", default=240)
+NETCDF_ANIMATION_CHUNK_FRAMES = env.int("NETCDF_ANIMATION_CHUNK_FRAMES", default=24)
+# Seconds an encoded animation is kept before the eviction job deletes it.
+NETCDF_ANIMATION_MAX_AGE = env.int(
+    "NETCDF_ANIMATION_MAX_AGE",
+    default=60 * 60 * 24 * 7,
+)
+# Weighted percentiles reported by the zonal statistics, besides mean/min/max.
+NETCDF_ZONAL_PERCENTILES = env.list(
+    "NETCDF_ZONAL_PERCENTILES",
+    cast=int,
+    default=[10, 50, 90],
+)
+# Maximum number of warm-up jobs running at once.
+NETCDF_PRECOMPUTE_CONCURRENCY = env.int("NETCDF_PRECOMPUTE_CONCURRENCY", default=4)
+# Storage budget of the cached GeoTIFF/GeoJSON artifacts. Keep it above the
+# size of the warm-up matrix, or eviction and warm-up undo each other's work.
+NETCDF_CACHE_MAX_BYTES = env.int("NETCDF_CACHE_MAX_BYTES", default=20 * 1024**3)
+# Which artifacts go first when over budget: "lru" or "lfu".
+NETCDF_CACHE_EVICTION_POLICY = env("NETCDF_CACHE_EVICTION_POLICY", default="lru")
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-schedule
+CELERY_BEAT_SCHEDULE = {
+    "warm-netcdf-file-cache": {
+        "task": "netcdf_backend.apps.netcdf.tasks.warm_file_cache",
+        "schedule": 15 * 60,
+    },
+    "evict-netcdf-file-cache": {
+        "task": "netcdf_backend.apps.netcdf.tasks.evict_file_cache",
+        "schedule": 60 * 60,
+    },
+}
+
 
 # Jazzmin
 JAZZMIN_SETTINGS = {
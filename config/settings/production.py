@@ -92,7 +92,7 @@ aws_s3_domain = AWS_S3_CUSTOM_DOMAIN or f"{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws
 # ------------------------
 STORAGES = {
     "default": {
-        "BACKEND": "storages.backends.s3.S3Storage",
+        "BACKEND": "netcdf_backend.core.storages.MediaS3Storage",
         "OPTIONS": {
             "location": "media",
             "file_overwrite": False,
@@ -1,13 +1,67 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from redis import asyncio as aioredis
+
+from netcdf_backend.apps.netcdf.services.jobs import job_channel, job_status
+
+
+async def forward_job_events(pubsub, send):
+    async for message in pubsub.listen():
+        if message["type"] == "message":
+            await send({"type": "websocket.send", "text": message["data"].decode()})
+
+
+async def subscribe_to_job(pubsub, job_id, send):
+    """
+    Push the job's status once it completes. The job may already be done by
+    the time the client subscribes, so its current status is checked after
+    subscribing and sent straight away if final.
+    """
+    await pubsub.subscribe(job_channel(job_id))
+    status = await sync_to_async(job_status)(job_id)
+    if status["state"] in ("SUCCESS", "FAILURE", "REVOKED"):
+        await send({"type": "websocket.send", "text": json.dumps(status)})
+
+
 async def websocket_application(scope, receive, send):
-    while True:
-        event = await receive()
+    redis_client = None
+    pubsub = None
+    listener = None
+
+    try:
+        while True:
+            event = await receive()
+
+            if event["type"] == "websocket.connect":
+                await send({"type": "websocket.accept"})
+
+            if event["type"] == "websocket.disconnect":
+                break
 
-        if event["type"] == "websocket.connect":
-            await send({"type": "websocket.accept"})
+            if event["type"] == "websocket.receive":
+                text = event.get("text") or ""
+                if text == "ping":
+                    await send({"type": "websocket.send", "text": "pong!"})
+                    continue
 
-        if event["type"] == "websocket.disconnect":
-            break
+                # {"subscribe": "<job id>"} pushes the job's status on completion
+                try:
+                    job_id = json.loads(text)["subscribe"]
+                except (ValueError, KeyError, TypeError):
+                    continue
 
-        if event["type"] == "websocket.receive":
-            if event["text"] == "ping":
-                await send({"type": "websocket.send", "text": "pong!"})
+                if pubsub is None:
+                    redis_client = aioredis.Redis.from_url(settings.REDIS_URL)
+                    pubsub = redis_client.pubsub()
+                await subscribe_to_job(pubsub, str(job_id), send)
+                if listener is None:
+                    listener = asyncio.create_task(forward_job_events(pubsub, send))
+    finally:
+        if listener is not None:
+            listener.cancel()
+        if pubsub is not None:
+            await pubsub.aclose()
+            await redis_client.aclose()
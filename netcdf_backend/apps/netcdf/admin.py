@@ -16,13 +16,38 @@ class NetCDFFileAdmin(admin.ModelAdmin):
     search_fields = (
         "uuid",
         "file",
+        "content_hash",
     )
     readonly_fields = (
         "uuid",
+        "content_hash",
+        "climatology_file",
         "created_at",
     )
 
 
+@admin.register(models.UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = (
+        "uuid",
+        "filename",
+        "size",
+        "offset",
+        "status",
+        "created_at",
+    )
+    search_fields = (
+        "uuid",
+        "filename",
+    )
+    list_filter = ("status",)
+    readonly_fields = (
+        "uuid",
+        "created_at",
+        "updated_at",
+    )
+
+
 @admin.register(models.ClimateData)
 class ClimateDataAdmin(GISModelAdmin):
     list_display = (
@@ -38,6 +63,7 @@ class ClimateDataAdmin(GISModelAdmin):
         "period",
     )
     list_filter = (
+        "region",
         "season",
         "period",
         "variable",
@@ -52,6 +78,10 @@ class FileCacheAdmin(admin.ModelAdmin):
         "season",
         "period",
         "file_type",
+        "size",
+        "hit_count",
+        "last_accessed_at",
+        "created_at",
     )
     search_fields = (
         "variable",
@@ -60,8 +90,59 @@ class FileCacheAdmin(admin.ModelAdmin):
         "period",
         "file_type",
     )
+    readonly_fields = (
+        "file_hash",
+        "source_fingerprint",
+        "size",
+        "hit_count",
+        "last_accessed_at",
+        "created_at",
+    )
     list_filter = (
+        "region",
         "season",
         "period",
         "file_type",
     )
+
+
+@admin.register(models.AdministrativeArea)
+class AdministrativeAreaAdmin(GISModelAdmin):
+    list_display = (
+        "name",
+        "code",
+        "level",
+        "updated_at",
+    )
+    search_fields = (
+        "name",
+        "code",
+    )
+    list_filter = ("level",)
+    readonly_fields = (
+        "uuid",
+        "created_at",
+        "updated_at",
+    )
+
+
+@admin.register(models.Region)
+class RegionAdmin(GISModelAdmin):
+    list_display = (
+        "slug",
+        "name",
+        "min_lon",
+        "min_lat",
+        "max_lon",
+        "max_lat",
+        "updated_at",
+    )
+    search_fields = (
+        "slug",
+        "name",
+    )
+    readonly_fields = (
+        "uuid",
+        "created_at",
+        "updated_at",
+    )
@@ -1,6 +1,12 @@
+import contextlib
+
 from django.apps import AppConfig
 
 
 class NetcdfConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "netcdf_backend.apps.netcdf"
+
+    def ready(self):
+        with contextlib.suppress(ImportError):
+            import netcdf_backend.apps.netcdf.signals  # noqa: F401
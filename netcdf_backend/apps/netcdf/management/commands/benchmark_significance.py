@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from scipy import stats
+
+from netcdf_backend.apps.netcdf.services.significance import (
+    benjamini_hochberg,
+    mann_kendall,
+    welch_ttest,
+)
+
+
+def best_of(repeat: int, func, *args, **kwargs):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the vectorized significance tests against SciPy on a synthetic "
+        "grid of yearly means, and check that both give the same p-values."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--years", type=int, default=30)
+        parser.add_argument("--lat", type=int, default=200)
+        parser.add_argument("--lon", type=int, default=200)
+        parser.add_argument(
+            "--nan-fraction",
+            type=float,
+            default=0.01,
+            help="Share of values replaced by NaN",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        shape = (options["years"], options["lat"], options["lon"])
+        historical = rng.normal(size=shape)
+        future = rng.normal(loc=0.2, scale=1.2, size=shape)
+        for values in (historical, future):
+            values[rng.random(shape) < options["nan_fraction"]] = np.nan
+        repeat = options["repeat"]
+
+        vectorized, (_, p_values) = best_of(repeat, welch_ttest, historical, future)
+        reference, (_, scipy_p_values) = best_of(
+            repeat,
+            stats.ttest_ind,
+            historical,
+            future,
+            axis=0,
+            equal_var=False,
+            nan_policy="omit",
+        )
+        difference = np.nanmax(np.abs(p_values - np.asarray(scipy_p_values)))
+        self.stdout.write(
+            f"Welch t-test on {shape}: {vectorized:.4f}s, "
+            f"SciPy nan_policy='omit': {reference:.4f}s "
+            f"({reference / vectorized:.0f}x), max p-value difference {difference:.2e}",
+        )
+
+        elapsed, q_values = best_of(repeat, benjamini_hochberg, p_values)
+        self.stdout.write(
+            f"Benjamini-Hochberg: {elapsed:.4f}s, "
+            f"{int(np.sum(p_values <= 0.05))} cells at p <= 0.05, "  # noqa: PLR2004
+            f"{int(np.sum(q_values <= 0.05))} at q <= 0.05",  # noqa: PLR2004
+        )
+
+        elapsed, _ = best_of(repeat, mann_kendall, future)
+        self.stdout.write(f"Mann-Kendall: {elapsed:.4f}s")
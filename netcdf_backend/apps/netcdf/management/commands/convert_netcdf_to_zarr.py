@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from netcdf_backend.apps.netcdf.services.zarr_store import convert_to_zarr
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert NetCDF files (e.g. the ensemble files under netcdf_backend/data) "
+        "to Zarr stores next to them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="NetCDF files to convert")
+
+    def handle(self, *args, **options):
+        for path in options["paths"]:
+            output_path = convert_to_zarr(
+                path,
+                chunks=settings.NETCDF_ZARR_CHUNKS,
+                compression_level=settings.NETCDF_ZARR_COMPRESSION_LEVEL,
+            )
+            self.stdout.write(self.style.SUCCESS(f"{path} -> {output_path}"))
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from netcdf_backend.apps.netcdf.models import ClimateData
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+from netcdf_backend.apps.netcdf.services.zonal import combination_statistics, write_csv
+
+# In `Combination`'s field order, as combinations are built positionally
+COMBINATION_FIELDS = ["scenario", "variable", "season", "period", "region"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the zonal statistics of every processed combination (or those "
+        "matching the filters) over the areas of a level, as one CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--level", default="district")
+        parser.add_argument("--output", help="CSV file to write, stdout if unset")
+        for field in COMBINATION_FIELDS:
+            parser.add_argument(f"--{field}", help=f"Only this {field}")
+
+    def handle(self, *args, **options):
+        filters = {
+            field: options[field] for field in COMBINATION_FIELDS if options[field]
+        }
+        combinations = [
+            Combination(*values)
+            for values in ClimateData.objects.filter(**filters)
+            .order_by(*COMBINATION_FIELDS)
+            .values_list(*COMBINATION_FIELDS)
+            .distinct()
+        ]
+
+        percentiles = settings.NETCDF_ZONAL_PERCENTILES
+        rows = []
+        for combination in combinations:
+            statistics = combination_statistics(
+                combination,
+                options["level"],
+                percentiles,
+            )
+            rows += [{**combination.as_kwargs(), **row} for row in statistics]
+            self.stderr.write(f"{combination}: done")
+
+        if options["output"]:
+            with Path(options["output"]).open("w", newline="") as f:
+                write_csv(f, rows, percentiles, extra_columns=COMBINATION_FIELDS)
+        else:
+            write_csv(sys.stdout, rows, percentiles, extra_columns=COMBINATION_FIELDS)
+        self.stderr.write(
+            f"Exported {len(rows)} row(s) for {len(combinations)} combination(s)",
+        )
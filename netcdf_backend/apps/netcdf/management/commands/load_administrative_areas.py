@@ -0,0 +1,46 @@
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from geopandas import read_file
+
+from netcdf_backend.apps.netcdf.models import AdministrativeArea
+
+
+class Command(BaseCommand):
+    help = (
+        "Load administrative areas (e.g. districts) from any file GeoPandas "
+        "reads, replacing the areas already stored for the level."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="GeoJSON, shapefile, GeoPackage...")
+        parser.add_argument("--level", required=True, help="e.g. district")
+        parser.add_argument("--name-field", required=True)
+        parser.add_argument("--code-field", help="Attribute holding the area code")
+
+    def handle(self, *args, **options):
+        gdf = read_file(options["path"]).to_crs("EPSG:4326")
+        areas = []
+        for _, feature in gdf.iterrows():
+            geom = GEOSGeometry(feature.geometry.wkb, srid=4326)
+            if geom.geom_type == "Polygon":
+                geom = MultiPolygon(geom, srid=4326)
+            areas.append(
+                AdministrativeArea(
+                    level=options["level"],
+                    name=str(feature[options["name_field"]]),
+                    code=(
+                        str(feature[options["code_field"]])
+                        if options["code_field"]
+                        else ""
+                    ),
+                    geom=geom,
+                ),
+            )
+
+        with transaction.atomic():
+            AdministrativeArea.objects.filter(level=options["level"]).delete()
+            AdministrativeArea.objects.bulk_create(areas)
+        self.stdout.write(
+            self.style.SUCCESS(f"Loaded {len(areas)} {options['level']} area(s)"),
+        )
@@ -0,0 +1,49 @@
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon
+from django.core.management.base import BaseCommand
+from geopandas import read_file
+
+from netcdf_backend.apps.netcdf.models import Region
+
+
+class Command(BaseCommand):
+    help = (
+        "Add a region the pipeline computes results for, or replace its border, "
+        "from any file GeoPandas reads. All features are merged into one border."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="GeoJSON, shapefile, GeoPackage...")
+        parser.add_argument("--slug", required=True, help="e.g. tanzania")
+        parser.add_argument("--name", required=True)
+        parser.add_argument(
+            "--bbox",
+            type=float,
+            nargs=4,
+            metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"),
+            help="Bounding box to compute over, the border's extent if unset",
+        )
+
+    def handle(self, *args, **options):
+        border = read_file(options["path"]).to_crs("EPSG:4326").union_all()
+        geom = GEOSGeometry(border.wkb, srid=4326)
+        if geom.geom_type == "Polygon":
+            geom = MultiPolygon(geom, srid=4326)
+        min_lon, min_lat, max_lon, max_lat = options["bbox"] or geom.extent
+
+        region, created = Region.objects.update_or_create(
+            slug=options["slug"],
+            defaults={
+                "name": options["name"],
+                "geom": geom,
+                "min_lon": min_lon,
+                "min_lat": min_lat,
+                "max_lon": max_lon,
+                "max_lat": max_lat,
+            },
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{'Added' if created else 'Updated'} region {region.slug} "
+                f"with bounding box {region.bbox}",
+            ),
+        )
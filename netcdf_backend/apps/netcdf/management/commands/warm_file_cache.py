@@ -0,0 +1,78 @@
+import time
+
+from celery.result import AsyncResult
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from netcdf_backend.apps.netcdf.services.precompute import plan_precompute
+from netcdf_backend.apps.netcdf.tasks import BATCH_PRIORITY, enqueue_processing
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the GeoTIFF/GeoJSON caches of every scenario, variable, "
+        "season and period that is missing or stale, e.g. after a data release."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.NETCDF_PRECOMPUTE_CONCURRENCY,
+            help="Maximum number of jobs running at once",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds between job status checks",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the combinations that would be computed",
+        )
+
+    def handle(self, *args, **options):
+        pending = plan_precompute()
+        total = len(pending)
+        self.stdout.write(f"{total} combination(s) missing or stale")
+
+        if options["dry_run"]:
+            for combination in pending:
+                self.stdout.write(f"  {combination}")
+            return
+
+        running = {}
+        succeeded = failed = 0
+        while pending or running:
+            while pending and len(running) < options["concurrency"]:
+                combination = pending.pop(0)
+                running[combination] = (
+                    AsyncResult(
+                        enqueue_processing(combination, priority=BATCH_PRIORITY),
+                    ),
+                    time.monotonic(),
+                )
+
+            time.sleep(options["poll_interval"])
+
+            for combination, (result, started) in list(running.items()):
+                if not result.ready():
+                    continue
+                del running[combination]
+                elapsed = time.monotonic() - started
+                if result.successful():
+                    succeeded += 1
+                    style = self.style.SUCCESS
+                else:
+                    failed += 1
+                    style = self.style.ERROR
+                self.stdout.write(
+                    style(
+                        f"[{succeeded + failed}/{total}] {combination}: "
+                        f"{result.state} in {elapsed:.0f}s",
+                    ),
+                )
+
+        self.stdout.write(f"Done: {succeeded} succeeded, {failed} failed")
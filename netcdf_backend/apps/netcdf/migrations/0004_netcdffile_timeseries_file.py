@@ -0,0 +1,22 @@
+# Generated by Django 5.1.9 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netcdf", "0003_alter_climatedata_variable"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="netcdffile",
+            name="timeseries_file",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                upload_to="netcdf-timeseries/",
+            ),
+        ),
+    ]
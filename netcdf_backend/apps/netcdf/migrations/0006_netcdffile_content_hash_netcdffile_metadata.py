@@ -0,0 +1,23 @@
+# Generated by Django 5.1.9 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netcdf", "0005_uploadsession"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="netcdffile",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="netcdffile",
+            name="metadata",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.9 on 2026-10-19 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netcdf", "0006_netcdffile_content_hash_netcdffile_metadata"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="filecache",
+            name="file_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.9 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netcdf", "0007_filecache_file_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="filecache",
+            name="source_fingerprint",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
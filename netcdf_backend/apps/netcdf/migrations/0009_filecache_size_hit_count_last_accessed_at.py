@@ -0,0 +1,28 @@
+# Generated by Django 5.1.9 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netcdf", "0008_filecache_source_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="filecache",
+            name="size",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="filecache",
+            name="hit_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="filecache",
+            name="last_accessed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
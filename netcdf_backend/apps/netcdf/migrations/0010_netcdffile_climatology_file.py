@@ -0,0 +1,22 @@
+# Generated by Django 5.1.9 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netcdf", "0009_filecache_size_hit_count_last_accessed_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="netcdffile",
+            name="climatology_file",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                upload_to="netcdf-climatologies/",
+            ),
+        ),
+    ]
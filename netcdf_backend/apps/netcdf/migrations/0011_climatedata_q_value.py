@@ -0,0 +1,18 @@
+# Generated by Django 5.1.9 on 2026-10-19 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netcdf", "0010_netcdffile_climatology_file"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="climatedata",
+            name="q_value",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.9 on 2026-10-19 20:10
+
+import uuid
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netcdf", "0011_climatedata_q_value"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdministrativeArea",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "uuid",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                ("level", models.CharField(db_index=True, max_length=32)),
+                ("name", models.CharField(max_length=255)),
+                ("code", models.CharField(blank=True, max_length=64)),
+                (
+                    "geom",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326),
+                ),
+            ],
+            options={
+                "ordering": ["level", "name"],
+            },
+        ),
+    ]
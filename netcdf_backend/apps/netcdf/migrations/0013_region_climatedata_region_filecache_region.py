@@ -0,0 +1,100 @@
+# Generated by Django 5.1.9 on 2026-10-19 21:30
+
+import uuid
+from pathlib import Path
+
+import django.contrib.gis.db.models.fields
+from django.contrib.gis.gdal import DataSource
+from django.contrib.gis.geos import MultiPolygon
+from django.db import migrations, models
+
+TANZANIA_BORDER = Path("netcdf_backend/data/tanzania.geojson")
+
+
+def create_tanzania(apps, schema_editor):
+    """
+    The region the pipeline was hardcoded to, with the bounding box it used.
+    Deployments without the border file add it with `load_region` instead.
+    """
+    if not TANZANIA_BORDER.exists():
+        return
+    geometries = [feature.geom.geos for feature in DataSource(TANZANIA_BORDER)[0]]
+    geom = geometries[0]
+    for geometry in geometries[1:]:
+        geom = geom.union(geometry)
+    if geom.geom_type == "Polygon":
+        geom = MultiPolygon(geom)
+    geom.srid = 4326
+
+    Region = apps.get_model("netcdf", "Region")
+    Region.objects.get_or_create(
+        slug="tanzania",
+        defaults={
+            "name": "Tanzania",
+            "geom": geom,
+            "min_lon": 29,
+            "min_lat": -11.75,
+            "max_lon": 40.5,
+            "max_lat": -1,
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netcdf", "0012_administrativearea"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Region",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "uuid",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                ("slug", models.SlugField(unique=True)),
+                ("name", models.CharField(max_length=255)),
+                (
+                    "geom",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326),
+                ),
+                ("min_lon", models.FloatField(blank=True, null=True)),
+                ("min_lat", models.FloatField(blank=True, null=True)),
+                ("max_lon", models.FloatField(blank=True, null=True)),
+                ("max_lat", models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="climatedata",
+            name="region",
+            field=models.CharField(default="tanzania", max_length=50),
+        ),
+        migrations.AddField(
+            model_name="filecache",
+            name="region",
+            field=models.CharField(default="tanzania", max_length=50),
+        ),
+        migrations.AlterUniqueTogether(
+            name="filecache",
+            unique_together={
+                ("file_type", "region", "scenario", "variable", "season", "period"),
+            },
+        ),
+        migrations.RunPython(create_tanzania, migrations.RunPython.noop),
+    ]
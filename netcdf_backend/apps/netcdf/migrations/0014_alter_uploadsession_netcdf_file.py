@@ -0,0 +1,25 @@
+# Generated by Django 5.1.9 on 2026-10-19 22:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netcdf", "0013_region_climatedata_region_filecache_region"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="uploadsession",
+            name="netcdf_file",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="upload_sessions",
+                to="netcdf.netcdffile",
+            ),
+        ),
+    ]
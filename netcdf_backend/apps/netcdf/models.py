@@ -1,17 +1,104 @@
 # Create your models here.
 from django.contrib.gis.db import models
 
-from netcdf_backend.core.mixins import CreatedAtMixin, UUIDMixin
+from netcdf_backend.core.mixins import (
+    CreatedAndUpdatedAtMixin,
+    CreatedAtMixin,
+    UUIDMixin,
+)
+
+
+# Region of results computed before regions were configurable
+DEFAULT_REGION = "tanzania"
 
 
 class NetCDFFile(UUIDMixin, CreatedAtMixin, models.Model):
     file = models.FileField(upload_to="netcdf-files/")
+    # Copy of `file` chunked along time for point timeseries reads.
+    timeseries_file = models.FileField(
+        upload_to="netcdf-timeseries/",
+        null=True,
+        blank=True,
+    )
+    # Monthly means, annual mean and std of every time-dependent variable.
+    climatology_file = models.FileField(
+        upload_to="netcdf-climatologies/",
+        null=True,
+        blank=True,
+    )
+    # SHA-256 of the file contents, so re-uploads reuse this row and its caches.
+    content_hash = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    metadata = models.JSONField(null=True, blank=True)
 
     def __str__(self):
         return self.file.name
 
 
+class UploadSession(UUIDMixin, CreatedAndUpdatedAtMixin, models.Model):
+    """
+    A resumable upload: the client sends the file in chunks at increasing
+    offsets, written straight to `storage_name`, then finalizes it into a
+    NetCDFFile once all `size` bytes have arrived.
+    """
+
+    STATUS_UPLOADING = "uploading"
+    STATUS_COMPLETED = "completed"
+
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    # Expected SHA-256 (hex) of the whole file, verified on finalize.
+    checksum = models.CharField(max_length=64, blank=True)
+    storage_name = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10,
+        choices=[(STATUS_UPLOADING, "Uploading"), (STATUS_COMPLETED, "Completed")],
+        default=STATUS_UPLOADING,
+    )
+    # Several sessions may upload the same contents, and then share the file.
+    netcdf_file = models.ForeignKey(
+        NetCDFFile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload_sessions",
+    )
+
+    def __str__(self):
+        return self.filename
+
+
+class Region(UUIDMixin, CreatedAndUpdatedAtMixin, models.Model):
+    """
+    An area the processing pipeline computes results for. Results are
+    computed over its bounding box and kept for points inside its geometry.
+    """
+
+    slug = models.SlugField(unique=True)
+    name = models.CharField(max_length=255)
+    geom = models.MultiPolygonField(srid=4326)
+    # Bounding box (defaults to the geometry's extent)
+    min_lon = models.FloatField(null=True, blank=True)
+    min_lat = models.FloatField(null=True, blank=True)
+    max_lon = models.FloatField(null=True, blank=True)
+    max_lat = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def bbox(self) -> list[float]:
+        """[min_lon, min_lat, max_lon, max_lat]"""
+        return [self.min_lon, self.min_lat, self.max_lon, self.max_lat]
+
+    def save(self, *args, **kwargs):
+        if None in self.bbox:
+            self.min_lon, self.min_lat, self.max_lon, self.max_lat = self.geom.extent
+        super().save(*args, **kwargs)
+
+
 class ClimateData(models.Model):
+    region = models.CharField(max_length=50, default=DEFAULT_REGION)
     scenario = models.CharField(
         max_length=10,
         choices=[("ssp245", "SSP-245"), ("ssp585", "SSP-585")],
@@ -40,6 +127,8 @@ class ClimateData(models.Model):
     longitude = models.FloatField()
     value = models.FloatField()
     p_value = models.FloatField()
+    # Benjamini-Hochberg adjusted p_value across the combination's grid
+    q_value = models.FloatField(null=True, blank=True)
     geom = models.PointField(srid=4326)
 
     class Meta:
@@ -54,12 +143,47 @@ class FileCache(models.Model):
         max_length=10,
         choices=[("geotiff", "GeoTIFF"), ("geojson", "GeoJSON")],
     )
+    region = models.CharField(max_length=50, default=DEFAULT_REGION)
     scenario = models.CharField(max_length=10)
     variable = models.CharField(max_length=10)
     season = models.CharField(max_length=10)
     period = models.CharField(max_length=20)
     file = models.FileField(upload_to="caches/")
+    # SHA-256 of the artifact, also part of its file name, used as ETag.
+    file_hash = models.CharField(max_length=64, blank=True)
+    # Hash of the source files and pipeline version the artifact was built
+    # from; entries whose fingerprint no longer matches are served stale
+    # while they are regenerated.
+    source_fingerprint = models.CharField(max_length=64, blank=True)
+    # Bytes in storage, precompressed variants included, and usage counters
+    # flushed from Redis; the eviction job uses them to stay within budget.
+    size = models.PositiveBigIntegerField(default=0)
+    hit_count = models.PositiveIntegerField(default=0)
+    last_accessed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ("file_type", "scenario", "variable", "season", "period")
+        unique_together = (
+            "file_type",
+            "region",
+            "scenario",
+            "variable",
+            "season",
+            "period",
+        )
+
+
+class AdministrativeArea(UUIDMixin, CreatedAndUpdatedAtMixin, models.Model):
+    """A polygon zonal statistics are reported for, e.g. one district."""
+
+    # e.g. "region", "district"; statistics are computed for a whole level
+    level = models.CharField(max_length=32, db_index=True)
+    name = models.CharField(max_length=255)
+    code = models.CharField(max_length=64, blank=True)
+    geom = models.MultiPolygonField(srid=4326)
+
+    class Meta:
+        ordering = ["level", "name"]
+
+    def __str__(self):
+        return f"{self.name} ({self.level})"
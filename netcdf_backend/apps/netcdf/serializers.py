@@ -1,6 +1,20 @@
 from rest_framework import serializers
 
-from netcdf_backend.apps.netcdf.models import FileCache, NetCDFFile
+from netcdf_backend.apps.netcdf.models import (
+    DEFAULT_REGION,
+    FileCache,
+    NetCDFFile,
+    UploadSession,
+)
+from netcdf_backend.apps.netcdf.services.choices import (
+    ANIMATION_FORMATS,
+    FREQUENCIES,
+    MIME_TYPES,
+    REFERENCES,
+    RENDER_MODES,
+)
+from netcdf_backend.apps.netcdf.services.regions import region_slugs
+from netcdf_backend.apps.netcdf.services.uploads import upload_storage_name
 
 
 class NetCDFFileSerializer(serializers.ModelSerializer):
@@ -11,6 +25,37 @@ class NetCDFFileSerializer(serializers.ModelSerializer):
         fields = ("file",)
 
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    size = serializers.IntegerField(min_value=1)
+    checksum = serializers.RegexField(
+        r"^[0-9a-fA-F]{64}$",
+        required=False,
+        allow_blank=True,
+    )
+
+    class Meta:
+        model = UploadSession
+        fields = (
+            "uuid",
+            "filename",
+            "size",
+            "offset",
+            "checksum",
+            "status",
+            "created_at",
+        )
+        read_only_fields = ("uuid", "offset", "status", "created_at")
+
+    def validate_checksum(self, value):
+        return value.lower()
+
+    def create(self, validated_data):
+        session = UploadSession(**validated_data)
+        session.storage_name = upload_storage_name(session.uuid, session.filename)
+        session.save()
+        return session
+
+
 class NetCDFFileReadSerializer(serializers.ModelSerializer[NetCDFFile]):
     file = serializers.FileField(use_url=True)
 
@@ -36,6 +81,65 @@ class PlotRequestSerializer(serializers.Serializer):
     max_lat = serializers.FloatField(required=False)
     min_lon = serializers.FloatField(required=False)
     max_lon = serializers.FloatField(required=False)
+    render_mode = serializers.ChoiceField(choices=RENDER_MODES, default="auto")
+    map_format = serializers.ChoiceField(choices=("png", "webp"), default="png")
+    timeseries_format = serializers.ChoiceField(
+        choices=tuple(MIME_TYPES),
+        default="png",
+    )
+    dpi = serializers.IntegerField(min_value=50, max_value=300, default=100)
+    width = serializers.IntegerField(min_value=100, max_value=4000, required=False)
+    height = serializers.IntegerField(min_value=100, max_value=4000, required=False)
+
+
+class AnimationRequestSerializer(serializers.Serializer):
+    variable = serializers.CharField()
+    filters = serializers.DictField(
+        child=serializers.ListField(child=serializers.CharField()),
+        required=False,
+    )
+    min_lat = serializers.FloatField(required=False)
+    max_lat = serializers.FloatField(required=False)
+    min_lon = serializers.FloatField(required=False)
+    max_lon = serializers.FloatField(required=False)
+    render_mode = serializers.ChoiceField(choices=RENDER_MODES, default="auto")
+    format = serializers.ChoiceField(choices=ANIMATION_FORMATS, default="gif")
+    # One frame per time step unless set
+    frequency = serializers.ChoiceField(choices=FREQUENCIES, required=False)
+    fps = serializers.IntegerField(min_value=1, max_value=30, default=4)
+    dpi = serializers.IntegerField(min_value=50, max_value=200, default=80)
+    width = serializers.IntegerField(min_value=100, max_value=2000, required=False)
+
+
+class ChangeRequestSerializer(serializers.Serializer):
+    variable = serializers.CharField()
+    filters = serializers.DictField(
+        child=serializers.ListField(child=serializers.CharField()),
+        required=False,
+    )
+    min_lat = serializers.FloatField(required=False)
+    max_lat = serializers.FloatField(required=False)
+    min_lon = serializers.FloatField(required=False)
+    max_lon = serializers.FloatField(required=False)
+    reference = serializers.ChoiceField(choices=REFERENCES, default="window")
+    # Time windows as dates (or partial dates, e.g. "1981" or "1981-06"),
+    # both ends inclusive. The baseline is only used with `window` reference.
+    baseline_start = serializers.CharField(required=False)
+    baseline_end = serializers.CharField(required=False)
+    target_start = serializers.CharField()
+    target_end = serializers.CharField()
+    relative = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if attrs["reference"] == "window" and not (
+            attrs.get("baseline_start") and attrs.get("baseline_end")
+        ):
+            msg = "baseline_start and baseline_end are required for a window reference"
+            raise serializers.ValidationError(msg)
+        if "time" in attrs.get("filters", {}):
+            msg = "Time is selected by the baseline and target windows, not filters"
+            raise serializers.ValidationError(msg)
+        return attrs
 
 
 class FilterParameterSerializer(serializers.Serializer):
@@ -43,11 +147,24 @@ class FilterParameterSerializer(serializers.Serializer):
     variable = serializers.CharField(required=True)
     season = serializers.CharField(required=True)
     period = serializers.CharField(required=True)
+    region = serializers.SlugField(default=DEFAULT_REGION)
+
+    def validate_region(self, value):
+        if value not in region_slugs():
+            msg = f"Unknown region: {value}"
+            raise serializers.ValidationError(msg)
+        return value
 
 
 class FileResponseSerializer(serializers.ModelSerializer):
     file = serializers.FileField(use_url=True)
+    name = serializers.CharField(source="file.name", read_only=True)
 
     class Meta:
         model = FileCache
-        fields = ("file",)
+        fields = ("file", "name", "file_hash", "source_fingerprint", "created_at")
+
+
+class ZonalStatisticsRequestSerializer(FilterParameterSerializer):
+    level = serializers.CharField(default="district")
+    format = serializers.ChoiceField(choices=("json", "csv"), default="json")
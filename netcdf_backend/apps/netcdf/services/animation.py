@@ -0,0 +1,116 @@
+import hashlib
+import io
+import json
+import math
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image
+
+ANIMATIONS_DIR = "animations"
+FRAMES_DIR = f"{ANIMATIONS_DIR}/frames"
+
+
+def animation_key(content_hash: str, params: dict) -> str:
+    """Digest of the file contents and every animation parameter."""
+    payload = json.dumps({"file": content_hash, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def animation_name(key: str, fmt: str) -> str:
+    return f"{ANIMATIONS_DIR}/{key}.{fmt}"
+
+
+def frame_name(job_id: str, index: int) -> str:
+    return f"{FRAMES_DIR}/{job_id}/{index:05d}.png"
+
+
+def frame_label(value) -> str:
+    if isinstance(value, np.datetime64):
+        value = pd.Timestamp(value)
+    return value.strftime("%Y-%m-%d") if hasattr(value, "strftime") else str(value)
+
+
+def plan_frames(
+    da: xr.DataArray,
+    frequency: str | None,
+    max_frames: int,
+) -> list[tuple[str, int, int]]:
+    """
+    (label, start, stop) time slices of every frame: one per time step, or
+    one per ``frequency`` period averaged. Longer series keep every n-th
+    frame so there are at most ``max_frames``.
+    """
+    if "time" not in da.dims:
+        msg = f"'{da.name}' has no time dimension to animate"
+        raise ValueError(msg)
+
+    times = da["time"]
+    if frequency is None:
+        frames = [
+            (frame_label(value), index, index + 1)
+            for index, value in enumerate(times.values)
+        ]
+    else:
+        frames = []
+        for label, group in times.resample(time=frequency).groups.items():
+            start, stop, _ = group.indices(times.size)
+            if stop > start:
+                frames.append((frame_label(label), start, stop))
+    if not frames:
+        msg = f"'{da.name}' has no time steps to animate"
+        raise ValueError(msg)
+
+    step = math.ceil(len(frames) / max_frames)
+    return frames[::step] if step > 1 else frames
+
+
+def frame_data(da: xr.DataArray, start: int, stop: int) -> xr.DataArray:
+    return da.isel(time=slice(start, stop)).mean("time")
+
+
+def encode_animation(frames: list[bytes], fmt: str, fps: int) -> bytes:
+    """Encode PNG frames, all of the same size, as a looping animation."""
+    images = [Image.open(io.BytesIO(frame)) for frame in frames]
+    options = {"quality": 80, "method": 4} if fmt == "webp" else {"optimize": True}
+    buf = io.BytesIO()
+    images[0].save(
+        buf,
+        format=fmt.upper(),
+        save_all=True,
+        append_images=images[1:],
+        duration=round(1000 / fps),
+        loop=0,
+        **options,
+    )
+    return buf.getvalue()
+
+
+def _expired_files(directory: str, cutoff) -> list[str]:
+    if not default_storage.exists(directory):
+        return []
+    dirs, files = default_storage.listdir(directory)
+    expired = [
+        f"{directory}/{name}"
+        for name in files
+        if default_storage.get_modified_time(f"{directory}/{name}") < cutoff
+    ]
+    for name in dirs:
+        expired += _expired_files(f"{directory}/{name}", cutoff)
+    return expired
+
+
+def delete_expired_animations(max_age: int) -> int:
+    """
+    Delete animations, and frames left behind by failed jobs, older than
+    ``max_age`` seconds. Returns the number of files deleted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    expired = _expired_files(ANIMATIONS_DIR, cutoff)
+    for name in expired:
+        default_storage.delete(name)
+    return len(expired)
@@ -0,0 +1,48 @@
+import numpy as np
+import xarray as xr
+
+TIME_DIM = "time"
+
+
+def window_mean(da: xr.DataArray, start: str, end: str, block: int = 365):
+    """
+    Mean of ``da`` over the time steps between ``start`` and ``end``
+    (inclusive), reduced ``block`` time steps at a time so memory stays
+    bounded by one block whatever the window's length.
+    """
+    window = da.sel({TIME_DIM: slice(start, end)})
+    steps = window.sizes[TIME_DIM]
+    if steps == 0:
+        msg = f"No time steps between {start} and {end}"
+        raise ValueError(msg)
+
+    total = count = 0
+    for first in range(0, steps, block):
+        part = window.isel({TIME_DIM: slice(first, first + block)}).load()
+        total = total + part.sum(TIME_DIM, skipna=True)
+        count = count + part.count(TIME_DIM)
+    return (total / count.where(count > 0)).assign_attrs(da.attrs)
+
+
+def change(
+    target: xr.DataArray,
+    reference: xr.DataArray,
+    *,
+    relative: bool = False,
+) -> xr.DataArray:
+    """``target`` minus ``reference``, or as a percentage of ``reference``."""
+    difference = target - reference
+    if relative:
+        difference = 100 * difference / abs(reference).where(reference != 0)
+    return difference
+
+
+def change_summary(da: xr.DataArray) -> dict:
+    values = da.values
+    if np.isnan(values).all():
+        return {"mean": None, "min": None, "max": None}
+    return {
+        "mean": float(np.nanmean(values)),
+        "min": float(np.nanmin(values)),
+        "max": float(np.nanmax(values)),
+    }
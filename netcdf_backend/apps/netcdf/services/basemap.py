@@ -0,0 +1,78 @@
+import functools
+import hashlib
+import math
+
+import cartopy.crs as ccrs
+import cartopy.feature as cfeature
+import shapely
+from django.core.cache import cache
+
+# Natural Earth layers drawn on every map, with their style overrides. Land
+# sits under the data (zorder -1), the line layers over it.
+LAYERS = {
+    "land": (cfeature.LAND, {"edgecolor": "black"}),
+    "coastline": (cfeature.COASTLINE, {"facecolor": "none"}),
+    "borders": (cfeature.BORDERS, {}),
+    "rivers": (cfeature.RIVERS, {"linestyle": ":"}),
+}
+BASEMAP_TIMEOUT = 60 * 60 * 24 * 7
+# Extents are widened to whole multiples of this many degrees so nearby
+# requests share cache entries; the axes clip the extra margin.
+EXTENT_STEP = 1
+
+
+def basemap_extent(lon_min, lon_max, lat_min, lat_max) -> tuple:
+    return (
+        math.floor(lon_min / EXTENT_STEP) * EXTENT_STEP,
+        math.ceil(lon_max / EXTENT_STEP) * EXTENT_STEP,
+        max(-90, math.floor(lat_min / EXTENT_STEP) * EXTENT_STEP),
+        min(90, math.ceil(lat_max / EXTENT_STEP) * EXTENT_STEP),
+    )
+
+
+def _project_layers(extent: tuple, projection: ccrs.Projection) -> dict:
+    lon_min, lon_max, lat_min, lat_max = extent
+    clip = projection.project_geometry(
+        shapely.box(lon_min, lat_min, lon_max, lat_max),
+        ccrs.PlateCarree(),
+    )
+    layers = {}
+    for name, (feature, _) in LAYERS.items():
+        geometries = []
+        for geometry in feature.intersecting_geometries(extent):
+            projected = projection.project_geometry(geometry, feature.crs)
+            clipped = projected.intersection(clip)
+            if not clipped.is_empty:
+                geometries.append(clipped)
+        layers[name] = geometries
+    return layers
+
+
+@functools.lru_cache(maxsize=32)
+def basemap_layers(extent: tuple, projection: ccrs.Projection) -> dict:
+    """
+    Natural Earth geometries of every layer, already projected and clipped
+    to ``extent`` (lon_min, lon_max, lat_min, lat_max). Computed once and
+    shared with the other workers through the cache as WKB.
+    """
+    projection_hash = hashlib.sha256(projection.proj4_init.encode()).hexdigest()
+    key = f"netcdf:basemap:{projection_hash[:16]}:{'_'.join(map(str, extent))}"
+    wkb = cache.get(key)
+    if wkb is None:
+        layers = _project_layers(extent, projection)
+        wkb = {name: shapely.to_wkb(geoms).tolist() for name, geoms in layers.items()}
+        cache.set(key, wkb, timeout=BASEMAP_TIMEOUT)
+        return layers
+    return {name: list(shapely.from_wkb(geoms)) for name, geoms in wkb.items()}
+
+
+def add_basemap(ax, lon_min, lon_max, lat_min, lat_max):
+    """Draw the cached basemap layers on a GeoAxes showing the given extent."""
+    extent = basemap_extent(lon_min, lon_max, lat_min, lat_max)
+    for name, geometries in basemap_layers(extent, ax.projection).items():
+        feature, overrides = LAYERS[name]
+        ax.add_geometries(
+            geometries,
+            crs=ax.projection,
+            **{**feature.kwargs, **overrides},
+        )
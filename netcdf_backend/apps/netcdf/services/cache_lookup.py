@@ -0,0 +1,46 @@
+from django.core.cache import cache
+
+from netcdf_backend.apps.netcdf.models import FileCache
+from netcdf_backend.apps.netcdf.serializers import FileResponseSerializer
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+
+LOOKUP_TIMEOUT = 60 * 60 * 24
+# Misses are cached briefly with the id of the job computing them, so clients
+# polling an in-progress combination don't reach the database either.
+PENDING_TIMEOUT = 10
+
+
+def lookup_key(file_type: str, combination: Combination) -> str:
+    return f"netcdf:file-cache:v2:{file_type}:{combination}"
+
+
+def get_cached_file(file_type: str, combination: Combination) -> dict | None:
+    """
+    The serialized FileCache entry of ``combination``, read through the cache;
+    a `{"job_id": ...}` marker while it is being computed; None if unknown.
+    """
+    key = lookup_key(file_type, combination)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+
+    try:
+        cached = FileCache.objects.get(file_type=file_type, **combination.as_kwargs())
+    except FileCache.DoesNotExist:
+        return None
+
+    entry = FileResponseSerializer(cached).data
+    cache.set(key, entry, timeout=LOOKUP_TIMEOUT)
+    return entry
+
+
+def set_pending(file_type: str, combination: Combination, job_id: str):
+    cache.set(
+        lookup_key(file_type, combination),
+        {"job_id": job_id},
+        timeout=PENDING_TIMEOUT,
+    )
+
+
+def invalidate(file_type: str, combination: Combination):
+    cache.delete(lookup_key(file_type, combination))
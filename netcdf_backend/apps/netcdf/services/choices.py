@@ -0,0 +1,16 @@
+# Choices of request parameters, shared by the services and the request
+# serializers. Kept free of imports so validating a request doesn't load
+# matplotlib, cartopy, xarray or Pillow.
+
+# Plots
+RENDER_MODES = ("auto", "contour", "raster")
+MIME_TYPES = {"png": "image/png", "webp": "image/webp", "svg": "image/svg+xml"}
+
+# Animations
+ANIMATION_FORMATS = ("gif", "webp")
+# Periods frames can average over, as pandas offset aliases
+FREQUENCIES = ("MS", "QS-DEC", "YS")
+
+# Changes: what they are measured against, the mean over a baseline window
+# or the annual mean of the file's precomputed climatology
+REFERENCES = ("window", "climatology")
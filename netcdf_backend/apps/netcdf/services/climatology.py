@@ -0,0 +1,101 @@
+import logging
+
+import numpy as np
+import xarray as xr
+
+logger = logging.getLogger(__name__)
+
+TIME_DIM = "time"
+STATISTICS = ("monthly_mean", "annual_mean", "std")
+
+
+def climatology_name(var: str, statistic: str) -> str:
+    """Name of ``var``'s ``statistic`` in a climatology dataset."""
+    return f"{var}_{statistic}"
+
+
+def _has_datetime_axis(ds: xr.Dataset) -> bool:
+    try:
+        ds[TIME_DIM].dt  # noqa: B018
+    except (KeyError, AttributeError, TypeError):
+        return False
+    return True
+
+
+def _climatology_variables(ds: xr.Dataset) -> list[str]:
+    return [
+        name
+        for name, var in ds.data_vars.items()
+        if TIME_DIM in var.dims and np.issubdtype(var.dtype, np.number)
+    ]
+
+
+def _variable_climatology(da: xr.DataArray, block: int) -> dict:
+    """
+    Monthly means, their mean and the standard deviation of ``da``, read in
+    blocks of ``block`` time steps so memory stays bounded by one block plus
+    the per-month accumulators.
+    """
+    template = da.isel({TIME_DIM: 0}, drop=True)
+    sums = np.zeros((12, *template.shape))
+    counts = np.zeros((12, *template.shape))
+    total_sq = np.zeros(template.shape)
+
+    axis = da.dims.index(TIME_DIM)
+    for start in range(0, da.sizes[TIME_DIM], block):
+        part = da.isel({TIME_DIM: slice(start, start + block)})
+        values = np.moveaxis(part.values.astype(np.float64), axis, 0)
+        valid = ~np.isnan(values)
+        months = part[TIME_DIM].dt.month.values
+        for month in np.unique(months):
+            in_month = months == month
+            sums[month - 1] += np.nansum(values[in_month], axis=0)
+            counts[month - 1] += valid[in_month].sum(axis=0)
+        total_sq += np.nansum(values**2, axis=0)
+
+    present = counts.reshape(12, -1).any(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        monthly = sums[present] / counts[present]
+        n = counts.sum(axis=0)
+        mean = sums.sum(axis=0) / n
+        std = np.sqrt(np.maximum(total_sq / n - mean**2, 0))
+
+    months = np.arange(1, 13)[present]
+    monthly_mean = xr.DataArray(
+        monthly,
+        dims=("month", *template.dims),
+        coords={**template.coords, "month": months},
+        attrs=da.attrs,
+    )
+    return {
+        "monthly_mean": monthly_mean,
+        # Mean of the monthly means, so unevenly sampled months weigh the same
+        "annual_mean": monthly_mean.mean("month", keep_attrs=True),
+        "std": template.copy(data=std),
+    }
+
+
+def compute_climatology(ds: xr.Dataset, block: int = 365) -> xr.Dataset | None:
+    """
+    Climatology of every numeric time-dependent variable of ``ds``: monthly
+    means, annual mean and standard deviation, named by `climatology_name`.
+    None if ``ds`` has no datetime axis to group by month.
+    """
+    if not _has_datetime_axis(ds):
+        return None
+
+    climatology = xr.Dataset(attrs=ds.attrs)
+    for var in _climatology_variables(ds):
+        for statistic, da in _variable_climatology(ds[var], block).items():
+            climatology[climatology_name(var, statistic)] = da
+    return climatology
+
+
+def write_climatology(ds: xr.Dataset, output_path: str, block: int = 365):
+    climatology = compute_climatology(ds, block=block)
+    if climatology is None or not climatology.data_vars:
+        return None
+    encoding = {name: {"zlib": True, "complevel": 4} for name in climatology.data_vars}
+    climatology.to_netcdf(output_path, encoding=encoding)
+    logger.info("Wrote climatology to %s", output_path)
+    return output_path
@@ -0,0 +1,203 @@
+import gzip
+import re
+import shutil
+from pathlib import Path
+
+import brotli
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
+from django.utils.http import parse_http_date_safe, quote_etag
+
+CONTENT_TYPES = {"geotiff": "image/tiff", "geojson": "application/geo+json"}
+# Artifact types stored with precompressed variants, keyed by content coding
+# in order of preference.
+COMPRESSED_FILE_TYPES = {"geojson"}
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _compress(path: Path, encoding: str) -> Path:
+    output_path = path.with_name(path.name + ENCODINGS[encoding])
+    with path.open("rb") as src:
+        if encoding == "gzip":
+            with gzip.open(output_path, "wb", compresslevel=9) as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        else:
+            compressor = brotli.Compressor(quality=11)
+            with output_path.open("wb") as dst:
+                while chunk := src.read(CHUNK_SIZE):
+                    dst.write(compressor.process(chunk))
+                dst.write(compressor.finish())
+    return output_path
+
+
+def save_compressed_variants(path: Path, name: str):
+    """
+    Store gzip and brotli copies of the local artifact ``path`` next to its
+    stored copy ``name``, so downloads never compress on the fly.
+    """
+    for encoding, suffix in ENCODINGS.items():
+        if default_storage.exists(name + suffix):
+            # Content-hashed names: an existing variant has the same bytes.
+            continue
+        variant_path = _compress(path, encoding)
+        with variant_path.open("rb") as f:
+            default_storage.save(name + suffix, File(f))
+        variant_path.unlink()
+
+
+def artifact_size(name: str) -> int:
+    """Bytes an artifact takes in storage, precompressed variants included."""
+    size = default_storage.size(name)
+    for suffix in ENCODINGS.values():
+        if default_storage.exists(name + suffix):
+            size += default_storage.size(name + suffix)
+    return size
+
+
+def delete_artifact(name: str):
+    default_storage.delete(name)
+    for suffix in ENCODINGS.values():
+        default_storage.delete(name + suffix)
+
+
+def negotiate_encoding(request, file_type: str, name: str) -> str | None:
+    if file_type not in COMPRESSED_FILE_TYPES:
+        return None
+    accepted = {
+        coding.split(";")[0].strip()
+        for coding in request.headers.get("Accept-Encoding", "").split(",")
+    }
+    for encoding, suffix in ENCODINGS.items():
+        if encoding in accepted and default_storage.exists(name + suffix):
+            return encoding
+    return None
+
+
+def artifact_etag(file_hash: str, encoding: str | None) -> str:
+    """
+    Strong ETag of an artifact as sent with ``encoding``: each encoding is a
+    different representation, so it needs its own.
+    """
+    return quote_etag(f"{file_hash}-{encoding}" if encoding else file_hash)
+
+
+def if_range_matches(
+    header: str | None,
+    etag: str | None,
+    last_modified: int | None,
+) -> bool:
+    """
+    Whether a `Range` may be served given the request's `If-Range`: only
+    when it names the representation being served, by strong ETag or exact
+    modification date. Otherwise the whole file is sent instead.
+    """
+    if not header:
+        return True
+    header = header.strip()
+    if header.startswith(("W/", '"')):
+        # Weak validators never match
+        return etag is not None and header == etag
+    date = parse_http_date_safe(header)
+    return date is not None and date == last_modified
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Inclusive (start, end) of a single `bytes=` range, or None to serve the
+    whole file (no header, multiple ranges or other units). Raises
+    ValueError if the range can't be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last `last` bytes
+        if int(last) == 0:
+            raise ValueError(header)
+        return max(0, size - int(last)), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _stream_range(f, start: int, length: int):
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0 and (chunk := f.read(min(CHUNK_SIZE, remaining))):
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def artifact_response(
+    request,
+    name: str,
+    file_type: str,
+    file_hash: str | None = None,
+    last_modified: int | None = None,
+):
+    """
+    Stream a stored artifact, honouring `Range` (and `If-Range`, checked
+    against ``file_hash`` and ``last_modified``) and serving a precompressed
+    variant when the client accepts one. Whole files go through FileResponse
+    so the server can use sendfile; remote storages get a redirect, as they
+    serve ranges themselves.
+    """
+    encoding = negotiate_encoding(request, file_type, name)
+    stored_name = name + ENCODINGS[encoding] if encoding else name
+    try:
+        path = Path(default_storage.path(stored_name))
+    except NotImplementedError:
+        return HttpResponseRedirect(default_storage.url(name))
+
+    size = path.stat().st_size
+    content_type = CONTENT_TYPES[file_type]
+    etag = artifact_etag(file_hash, encoding) if file_hash else None
+    range_header = request.headers.get("Range")
+    if not if_range_matches(request.headers.get("If-Range"), etag, last_modified):
+        # The client's partial copy is of another version of the artifact
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(path.open("rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _stream_range(path.open("rb"), start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    if etag:
+        response["ETag"] = etag
+    if encoding:
+        response["Content-Encoding"] = encoding
+    if file_type in COMPRESSED_FILE_TYPES:
+        response["Vary"] = "Accept-Encoding"
+    return response
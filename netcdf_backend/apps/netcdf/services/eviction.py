@@ -0,0 +1,124 @@
+import logging
+import time
+from datetime import UTC, datetime
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce, Greatest
+from redis.exceptions import RedisError
+
+from netcdf_backend.apps.netcdf.models import FileCache
+from netcdf_backend.apps.netcdf.services.downloads import artifact_size, delete_artifact
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+from netcdf_backend.apps.netcdf.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Redis hashes of `<file_type>/<combination>` -> hits / last access timestamp,
+# accumulated per request and flushed to FileCache by the eviction job.
+HITS_KEY = "netcdf:file-cache:hits:v2"
+LAST_ACCESS_KEY = "netcdf:file-cache:last-access:v2"
+POLICIES = ("lru", "lfu")
+
+
+def record_hit(file_type: str, combination: Combination):
+    """
+    Count a hit on the request path. Like the cache, this never fails the
+    request when Redis is unavailable; the hit is only lost.
+    """
+    field = f"{file_type}/{combination}"
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.hincrby(HITS_KEY, field, 1)
+    pipe.hset(LAST_ACCESS_KEY, field, time.time())
+    try:
+        pipe.execute()
+    except RedisError:
+        logger.warning("Could not record a hit on %s", field, exc_info=True)
+
+
+def flush_hits() -> int:
+    """Move the hit counters accumulated in Redis onto their FileCache rows."""
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.hgetall(HITS_KEY)
+    pipe.hgetall(LAST_ACCESS_KEY)
+    pipe.delete(HITS_KEY, LAST_ACCESS_KEY)
+    hits, last_access, _ = pipe.execute()
+
+    for field, count in hits.items():
+        file_type, region, scenario, variable, season, period = (
+            field.decode().split("/")
+        )
+        updates = {"hit_count": F("hit_count") + int(count)}
+        # A counter can outlive its timestamp, e.g. after a partial write
+        timestamp = last_access.get(field)
+        if timestamp is not None:
+            accessed_at = datetime.fromtimestamp(float(timestamp), tz=UTC)
+            updates["last_accessed_at"] = Greatest(
+                Coalesce("last_accessed_at", accessed_at),
+                accessed_at,
+            )
+        FileCache.objects.filter(
+            file_type=file_type,
+            region=region,
+            scenario=scenario,
+            variable=variable,
+            season=season,
+            period=period,
+        ).update(**updates)
+    return len(hits)
+
+
+def eviction_order(policy: str):
+    """
+    FileCache entries in the order they should be evicted. Entries never
+    requested count as last accessed when they were created.
+    """
+    last_used = Coalesce("last_accessed_at", "created_at")
+    entries = FileCache.objects.all()
+    if policy == "lfu":
+        return entries.order_by("hit_count", last_used.asc())
+    return entries.order_by(last_used.asc(), "hit_count")
+
+
+def evict(max_bytes: int, policy: str = "lru") -> dict:
+    """
+    Delete cached artifacts, least recently (`lru`) or least frequently
+    (`lfu`) used first, until they fit in ``max_bytes``. Hit counts are
+    halved after every run so LFU favours recent popularity.
+    """
+    if policy not in POLICIES:
+        msg = f"Unknown eviction policy {policy!r}, expected one of {POLICIES}"
+        raise ValueError(msg)
+
+    flushed = flush_hits()
+
+    # Rows created before sizes were tracked
+    for entry in FileCache.objects.filter(size=0):
+        entry.size = artifact_size(entry.file.name)
+        entry.save(update_fields=["size"])
+
+    total = FileCache.objects.aggregate(total=Sum("size"))["total"] or 0
+    evicted = freed = 0
+    for entry in eviction_order(policy).iterator():
+        if total - freed <= max_bytes:
+            break
+        name = entry.file.name
+        with transaction.atomic():
+            entry.delete()
+            transaction.on_commit(lambda name=name: delete_artifact(name))
+        evicted += 1
+        freed += entry.size
+
+    FileCache.objects.filter(hit_count__gt=0).update(hit_count=F("hit_count") / 2)
+
+    report = {
+        "policy": policy,
+        "max_bytes": max_bytes,
+        "total_bytes": total,
+        "freed_bytes": freed,
+        "remaining_bytes": total - freed,
+        "evicted": evicted,
+        "hits_flushed": flushed,
+    }
+    logger.info("File cache eviction: %s", report)
+    return report
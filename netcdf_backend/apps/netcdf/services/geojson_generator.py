@@ -1,11 +1,14 @@
 from pathlib import Path
 from typing import Any
 
+import shapely
+from django.conf import settings
 from django.core.files import File
-from geopandas import GeoDataFrame, read_file
+from geopandas import GeoDataFrame
 from shapely.geometry import Point as ShapelyPoint  # Import shapely Point explicitly
 
-from netcdf_backend.apps.netcdf.models import ClimateData
+from netcdf_backend.apps.netcdf.models import ClimateData, Region
+from netcdf_backend.apps.netcdf.services.regions import region_geometry
 
 
 def generate_geojson(
@@ -14,22 +17,23 @@ def generate_geojson(
     season: Any,
     period: Any,
     output_path: str,
+    region: Region,
 ) -> File:
-    # Query significant points (p_value <= 0.05)
+    # Query significant points, controlling the false discovery rate across
+    # the grid unless disabled
+    significance = (
+        "q_value__lte" if settings.NETCDF_SIGNIFICANCE_FDR else "p_value__lte"
+    )
     data = ClimateData.objects.filter(
+        region=region.slug,
         scenario=scenario,
         variable=variable,
         season=season,
         period=period,
-        p_value__lte=0.05,
+        **{significance: settings.NETCDF_SIGNIFICANCE_LEVEL},
     )
 
-    # Load border
-    try:
-        border = read_file("netcdf_backend/data/tanzania.geojson").to_crs("EPSG:4326")
-    except Exception as e:
-        print(f"Failed to load border file: {e!s}")
-        raise ValueError("Invalid Tanzania border file")
+    border = region_geometry(region)
 
     # Create GeoDataFrame
     records = [
@@ -40,7 +44,7 @@ def generate_geojson(
             "geometry": ShapelyPoint(d.longitude, d.latitude),
         }
         for d in data
-        if border.geometry.unary_union.contains(ShapelyPoint(d.longitude, d.latitude))
+        if shapely.contains_xy(border, d.longitude, d.latitude)
     ]
 
     gdf = GeoDataFrame(records, crs="EPSG:4326")
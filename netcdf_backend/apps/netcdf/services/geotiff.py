@@ -3,17 +3,17 @@ from pathlib import Path
 import numpy as np
 import rasterio
 from django.core.files import File
-from geopandas import read_file
 from rasterio.features import geometry_mask
 from rasterio.transform import from_bounds
 
-from netcdf_backend.apps.netcdf.models import ClimateData
+from netcdf_backend.apps.netcdf.models import ClimateData, Region
 from netcdf_backend.apps.netcdf.serializers import FilterParameterSerializer
+from netcdf_backend.apps.netcdf.services.regions import region_geometry
 
 
 def generate_geotiff(
     filter_serializer: FilterParameterSerializer,
-    region_bbox,
+    region: Region,
     output_path,
 ):
     filter_serializer.is_valid(raise_exception=True)
@@ -26,19 +26,13 @@ def generate_geotiff(
 
     # Query database
     data = ClimateData.objects.filter(
+        region=region.slug,
         scenario=scenario,
         variable=variable,
         season=season,
         period=period,
     ).order_by("latitude", "longitude")
 
-    # Load border
-    try:
-        border = read_file("netcdf_backend/data/tanzania.geojson").to_crs("EPSG:4326")
-    except Exception as e:
-        print(f"Failed to load border file: {e!s}")
-        raise ValueError("Invalid Tanzania border file")
-
     # Create grid
     lats = sorted({d.latitude for d in data})
     lons = sorted({d.longitude for d in data})
@@ -57,11 +51,11 @@ def generate_geotiff(
     lats = lats[::-1]
 
     # Define GeoTIFF metadata
-    transform = from_bounds(*region_bbox, len(lons), len(lats))
+    transform = from_bounds(*region.bbox, len(lons), len(lats))
 
-    # Mask areas outside Tanzania
+    # Mask areas outside the region
     mask = geometry_mask(
-        border.geometry,
+        [region_geometry(region)],
         out_shape=grid.shape,
         transform=transform,
         invert=True,
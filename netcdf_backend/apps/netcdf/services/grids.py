@@ -0,0 +1,11 @@
+import hashlib
+
+import numpy as np
+
+
+def grid_hash(lats: np.ndarray, lons: np.ndarray) -> str:
+    """Identifies a lat/lon grid, for keying what is computed per grid."""
+    digest = hashlib.sha256()
+    for coords in (lats, lons):
+        digest.update(np.ascontiguousarray(coords, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
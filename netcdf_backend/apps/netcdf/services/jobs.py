@@ -0,0 +1,193 @@
+import json
+import time
+
+from celery import current_app, states
+from django.core.cache import cache
+
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+from netcdf_backend.apps.netcdf.services.redis_client import get_redis
+
+STAGES = ["load", "aggregate", "t-test", "clip", "insert", "raster", "geojson"]
+PROGRESS_STATE = "PROGRESS"
+JOB_DURATION_KEY = "netcdf:job-duration"
+# Stage timings recorded while a stage is still running
+STAGE_RUNNING = -1
+PROGRESS_TTL = 60 * 60 * 24
+
+# Upper bound on how long a crashed worker can leave a combination (or any
+# other keyed piece of work, e.g. an animation) marked as in flight; normally
+# the job releases it as soon as it finishes.
+PENDING_JOB_TTL = 60 * 60
+# Attempts at claiming a key whose job finishes while we look at it
+CLAIM_ATTEMPTS = 2
+
+
+def pending_job_key(combination: Combination | str) -> str:
+    return f"netcdf:pending-job:{combination}"
+
+
+def get_pending_job(combination: Combination | str) -> str | None:
+    return cache.get(pending_job_key(combination))
+
+
+def claim_pending_job(combination: Combination | str, job_id: str) -> str:
+    """
+    Register ``job_id`` as the job computing ``combination`` unless another
+    job already is, and return the id of the job in flight. Callers only
+    enqueue work when they get their own id back, and release it with
+    `release_pending_job` if enqueueing fails.
+    """
+    key = pending_job_key(combination)
+    for _ in range(CLAIM_ATTEMPTS):
+        if cache.add(key, job_id, timeout=PENDING_JOB_TTL):
+            return job_id
+        in_flight = cache.get(key)
+        if in_flight is not None:
+            return in_flight
+        # The other job finished between add() and get(), try again.
+    # Both keep failing when the cache is down (its errors are ignored):
+    # run the job without deduplication rather than wait for it.
+    return job_id
+
+
+def release_pending_job(combination: Combination | str, job_id: str):
+    key = pending_job_key(combination)
+    if cache.get(key) == job_id:
+        cache.delete(key)
+
+
+def job_channel(job_id: str) -> str:
+    """Redis pub/sub channel announcing the completion of a job."""
+    return f"netcdf:jobs:{job_id}"
+
+
+def publish_job_event(job_id: str, payload: dict):
+    get_redis().publish(job_channel(job_id), json.dumps(payload))
+
+
+def progress_key(job_id: str) -> str:
+    return f"netcdf:job-progress:{job_id}"
+
+
+def _summary(started_at: float, timings: dict, running: list) -> dict:
+    return {
+        "stage": running[-1] if running else None,
+        "running": running,
+        "progress": round(len(timings) / len(STAGES), 2),
+        "timings": timings,
+        "started_at": started_at,
+        "duration": round(time.time() - started_at, 3),
+    }
+
+
+def read_progress(job_id: str) -> dict:
+    """The progress summary the tasks of a job recorded, empty if none."""
+    fields = {
+        field.decode(): float(value)
+        for field, value in get_redis().hgetall(progress_key(job_id)).items()
+    }
+    if not fields:
+        return {}
+    started_at = fields.pop("started_at", time.time())
+    timings = {stage: elapsed for stage, elapsed in fields.items() if elapsed >= 0}
+    running = [stage for stage in STAGES if fields.get(stage) == STAGE_RUNNING]
+    return _summary(started_at, timings, running)
+
+
+class JobProgress:
+    """
+    Records which stages of a job are running, and how long finished ones
+    took, in a Redis hash under the job's id, so the tasks of one pipeline
+    report into one place from whichever worker runs them. Without a job id
+    (e.g. when the pipeline is called directly) it only keeps the timings.
+    """
+
+    def __init__(self, job_id: str | None = None):
+        self.job_id = job_id
+        self.started_at = time.time()
+        self.timings = {}
+        self.stage = None
+        self._stage_started = None
+
+        if job_id is not None:
+            # The job started when its first task did
+            key = progress_key(job_id)
+            pipe = get_redis().pipeline()
+            pipe.hsetnx(key, "started_at", self.started_at)
+            pipe.expire(key, PROGRESS_TTL)
+            pipe.hget(key, "started_at")
+            self.started_at = float(pipe.execute()[-1])
+
+    def start(self, stage: str):
+        """Finish the current stage, if any, and start ``stage``."""
+        self._close_stage()
+        self.stage = stage
+        self._stage_started = time.perf_counter()
+        self._record(stage, STAGE_RUNNING)
+
+    def finish(self) -> dict:
+        """Finish the current stage and return the summary to use as result."""
+        self._close_stage()
+        self.stage = None
+        return self.summary()
+
+    def summary(self) -> dict:
+        if self.job_id is not None:
+            return read_progress(self.job_id)
+        running = [self.stage] if self.stage is not None else []
+        return _summary(self.started_at, self.timings, running)
+
+    def _close_stage(self):
+        if self.stage is not None:
+            elapsed = round(time.perf_counter() - self._stage_started, 3)
+            self.timings[self.stage] = elapsed
+            self._record(self.stage, elapsed)
+
+    def _record(self, stage: str, value: float):
+        if self.job_id is not None:
+            pipe = get_redis().pipeline()
+            pipe.hset(progress_key(self.job_id), stage, value)
+            pipe.expire(progress_key(self.job_id), PROGRESS_TTL)
+            pipe.execute()
+
+
+def record_job_duration(duration: float):
+    """Keep a moving average of job durations to estimate ETAs from."""
+    average = cache.get(JOB_DURATION_KEY)
+    average = duration if average is None else 0.8 * average + 0.2 * duration
+    cache.set(JOB_DURATION_KEY, average, timeout=None)
+
+
+def job_status(job_id: str) -> dict:
+    """
+    Status of a job, whose id is that of its last task: it stays pending
+    until the earlier tasks are done, which the recorded progress tells.
+    """
+    result = current_app.AsyncResult(job_id)
+    info = read_progress(job_id)
+    if not info and isinstance(result.info, dict):
+        info = result.info
+    state = result.state
+    if state == states.PENDING and info:
+        state = PROGRESS_STATE
+    average = cache.get(JOB_DURATION_KEY)
+
+    eta = None
+    if result.ready():
+        eta = 0
+    elif average is not None:
+        elapsed = time.time() - info["started_at"] if "started_at" in info else 0
+        eta = max(0, round(average - elapsed))
+
+    status = {
+        "job_id": job_id,
+        "state": state,
+        "stage": info.get("stage"),
+        "running": info.get("running", []),
+        "progress": 1.0 if result.successful() else info.get("progress", 0),
+        "timings": info.get("timings", {}),
+        "eta": eta,
+    }
+    if result.failed():
+        status["error"] = str(result.result)
+    return status
@@ -1,15 +1,19 @@
 import logging
 
-import geopandas as gpd
 import numpy as np
-import xarray as xr
 from django.contrib.gis.geos import Point
+from django.db import transaction
 from rest_framework.exceptions import ValidationError
-from scipy.stats import ttest_ind
-from shapely.geometry import Point as ShapelyPoint
 
-from netcdf_backend.apps.netcdf.models import ClimateData
+from netcdf_backend.apps.netcdf.models import ClimateData, Region
 from netcdf_backend.apps.netcdf.serializers import FilterParameterSerializer
+from netcdf_backend.apps.netcdf.services.jobs import JobProgress
+from netcdf_backend.apps.netcdf.services.regions import region_mask
+from netcdf_backend.apps.netcdf.services.significance import (
+    benjamini_hochberg,
+    welch_ttest,
+)
+from netcdf_backend.apps.netcdf.services.zarr_store import open_dataset
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +21,10 @@ logger = logging.getLogger(__name__)
 def process_netcdf(  # noqa: C901, PLR0912, PLR0915
     file,
     filter_serializer: FilterParameterSerializer,
-    region_bbox,
+    region: Region,
+    progress: JobProgress | None = None,
 ):
+    progress = progress or JobProgress()
     filter_serializer.is_valid(raise_exception=True)
     data = filter_serializer.validated_data
 
@@ -27,21 +33,13 @@ def process_netcdf(  # noqa: C901, PLR0912, PLR0915
     period = data["period"]
     variable = data["variable"]
 
-    # Load Tanzania border
-    try:
-        border = gpd.read_file("netcdf_backend/data/tanzania.geojson")
-        border = border.to_crs("EPSG:4326")
-        border_geometry = (
-            border.geometry.unary_union
-        )  # Combine polygons (mainland + islands)
-    except Exception as e:
-        logger.exception(f"Failed to load border file: {e!s}")
-        msg = "Invalid Tanzania border file"
-        raise ValidationError(msg)  # noqa: B904
+    progress.start("load")
+
+    region_bbox = region.bbox
 
     # Load and subset NetCDF
     try:
-        ds = xr.open_dataset(file)
+        ds = open_dataset(file)
         # Ensure dataset covers expected range
         if "lat" not in ds.coords or "lon" not in ds.coords:
             msg = "Expected 'latitude' and 'longitude' coordinates not found"
@@ -49,7 +47,7 @@ def process_netcdf(  # noqa: C901, PLR0912, PLR0915
                 msg,
             )
 
-        # Subset to Tanzania with nearest neighbor to avoid empty slices
+        # Subset to the region with nearest neighbor to avoid empty slices
         ds = ds.sel(
             lat=slice(region_bbox[1], region_bbox[3]),
             lon=slice(region_bbox[0], region_bbox[2]),
@@ -60,11 +58,11 @@ def process_netcdf(  # noqa: C901, PLR0912, PLR0915
 
     # Load and subset of historical NetCDF
     try:
-        hist_ds = xr.open_dataset(
+        hist_ds = open_dataset(
             f"netcdf_backend/data/annual/{variable}_day_Ensmean_historical_r1i1p1f1_gr_merged.nc",
         )
 
-        # Subset to Tanzania with nearest neighbor to avoid empty slices
+        # Subset to the region with nearest neighbor to avoid empty slices
         hist_ds = hist_ds.sel(
             lat=slice(region_bbox[1], region_bbox[3]),
             lon=slice(region_bbox[0], region_bbox[2]),
@@ -88,16 +86,16 @@ def process_netcdf(  # noqa: C901, PLR0912, PLR0915
         logger.warning(
             f"No data in bounding box {region_bbox}. Expanding search.",
         )
-        ds = xr.open_dataset(file)
+        ds = open_dataset(file)
         lats = ds.lat.to_numpy()
         lons = ds.lon.to_numpy()
 
-        # Filter to points near Tanzania
+        # Filter to points near the region
         lats = lats[(lats >= region_bbox[1] - 1) & (lats <= region_bbox[3] + 1)]
         lons = lons[(lons >= region_bbox[0] - 1) & (lons <= region_bbox[2] + 1)]
 
         if len(lats) == 0 or len(lons) == 0:
-            msg = "No data points found in or near Tanzania"
+            msg = f"No data points found in or near {region}"
             raise ValidationError(msg)
 
         ds = ds.sel(lat=lats, lon=lons, method="nearest")
@@ -113,12 +111,12 @@ def process_netcdf(  # noqa: C901, PLR0912, PLR0915
     start_year, end_year = map(int, period.split("-"))
     ds = ds.sel(time=slice(f"{start_year}-01-01", f"{end_year}-12-31"))
 
+    progress.start("aggregate")
+
     historical = hist_ds[variable].sel(time=slice("1980", "2010"))
     historical = historical.groupby("time.year").mean("time")
     future = ds[variable].groupby("time.year").mean("time")
 
-    _, p_values = ttest_ind(historical, future, axis=0, nan_policy="omit")
-
     # Aggregate over time
     if "time" not in ds.dims or len(ds.time) == 0:
         logger.warning(
@@ -130,8 +128,12 @@ def process_netcdf(  # noqa: C901, PLR0912, PLR0915
         data = ds[variable].mean(dim="time").to_numpy()
         # p_values = ds.get("p_value", np.ones_like(data) * 0.01)
 
-    p_values = np.asarray(p_values)
-    logger.info(p_values)
+    progress.start("t-test")
+
+    _, p_values = welch_ttest(
+        historical.transpose("year", ...).to_numpy(),
+        future.transpose("year", ...).to_numpy(),
+    )
 
     # except Exception as e:
     #     logger.error(f"Error processing season/period: {e!s}")
@@ -188,39 +190,41 @@ def process_netcdf(  # noqa: C901, PLR0912, PLR0915
 
     print(data.tolist(), variable)
 
-    # Clip to Tanzania border
-    records = []
-    for i in range(len(lats)):
-        for j in range(len(lons)):
-            if not np.isnan(data[i, j]):
-                point = Point(float(lons[j]), float(lats[i]))
-                if border_geometry.contains(
-                    ShapelyPoint(float(lons[j]), float(lats[i])),
-                ):  # Check if point is within border
-                    records.append(
-                        ClimateData(
-                            scenario=scenario,
-                            variable=variable,
-                            season=season,
-                            period=period,
-                            latitude=float(lats[i]),
-                            longitude=float(lons[j]),
-                            value=float(data[i, j]),
-                            p_value=float(p_values[i, j]),
-                            geom=point,
-                        ),
-                    )
-
-    # Store in database
-
-    existing_data_count = ClimateData.objects.filter(
-        scenario=scenario,
-        variable=variable,
-        season=season,
-        period=period,
-    ).count()
-
-    print(existing_data_count, len(lats) * len(lons))
-
-    if existing_data_count == 0:
+    progress.start("clip")
+
+    # Clip to the region's border, with the mask prepared for this grid
+    inside = region_mask(region, lats, lons) & ~np.isnan(data)
+    records = [
+        ClimateData(
+            region=region.slug,
+            scenario=scenario,
+            variable=variable,
+            season=season,
+            period=period,
+            latitude=float(lats[i]),
+            longitude=float(lons[j]),
+            value=float(data[i, j]),
+            p_value=float(p_values[i, j]),
+            geom=Point(float(lons[j]), float(lats[i])),
+        )
+        for i, j in zip(*np.nonzero(inside), strict=True)
+    ]
+
+    # False discovery rate control across the cells inside the region
+    q_values = benjamini_hochberg(np.array([r.p_value for r in records]))
+    for record, q_value in zip(records, q_values, strict=True):
+        record.q_value = None if np.isnan(q_value) else float(q_value)
+
+    progress.start("insert")
+
+    # Store in database, replacing the rows of an earlier run: a refresh
+    # after the source changed must not export the old results again
+    with transaction.atomic():
+        ClimateData.objects.filter(
+            region=region.slug,
+            scenario=scenario,
+            variable=variable,
+            season=season,
+            period=period,
+        ).delete()
         ClimateData.objects.bulk_create(objs=records)
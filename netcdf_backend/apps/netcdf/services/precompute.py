@@ -0,0 +1,166 @@
+import hashlib
+import itertools
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+from netcdf_backend.apps.netcdf.models import (
+    DEFAULT_REGION,
+    ClimateData,
+    FileCache,
+    Region,
+)
+from netcdf_backend.apps.netcdf.services.regions import region_fingerprint
+from netcdf_backend.apps.netcdf.services.uploads import file_sha256
+
+logger = logging.getLogger(__name__)
+
+FILE_TYPES = [file_type for file_type, _ in FileCache._meta.get_field("file_type").choices]
+
+
+def normalize_variable(variable: str) -> str:
+    """Ensemble files only have daily max temperature for `tas`."""
+    return variable + "max" if variable == "tas" else variable
+
+
+def source_file_for(scenario: str, variable: str) -> str:
+    return f"netcdf_backend/data/annual/{variable}_day_Ensmean_{scenario}_r1i1p1f1_gr_merged.nc"  # noqa: E501
+
+
+@dataclass(frozen=True)
+class Combination:
+    scenario: str
+    variable: str
+    season: str
+    period: str
+    region: str = DEFAULT_REGION
+
+    @property
+    def source_file(self) -> str:
+        return source_file_for(self.scenario, self.variable)
+
+    def as_kwargs(self) -> dict:
+        return {
+            "scenario": self.scenario,
+            "variable": self.variable,
+            "season": self.season,
+            "period": self.period,
+            "region": self.region,
+        }
+
+    def __str__(self):
+        return (
+            f"{self.region}/{self.scenario}/{self.variable}/{self.season}/{self.period}"
+        )
+
+
+def source_hash(path: str, *, compute: bool = True) -> str | None:
+    """
+    SHA-256 of a source file, memoized per (path, mtime, size) since hashing
+    gigabytes on every call is too slow. With ``compute=False`` only the memo
+    is consulted and None is returned if the file changed since last hashed.
+    """
+    stat = os.stat(path)  # noqa: PTH116
+    key = f"netcdf:source-hash:{path}:{stat.st_mtime_ns}:{stat.st_size}"
+    digest = cache.get(key)
+    if digest is None and compute:
+        digest = file_sha256(Path(path))
+        cache.set(key, digest, timeout=None)
+    return digest
+
+
+def source_fingerprint(
+    combination: Combination,
+    *,
+    compute: bool = True,
+) -> str | None:
+    """
+    Identifies the inputs an artifact of ``combination`` is built from: the
+    source file contents, the region's border and bounding box, and the
+    pipeline version. See `source_hash` for ``compute``.
+    """
+    digest = source_hash(combination.source_file, compute=compute)
+    if digest is None:
+        return None
+    parts = [
+        settings.NETCDF_PIPELINE_VERSION,
+        digest,
+        region_fingerprint(combination.region),
+    ]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def is_outdated(combination: Combination, fingerprint: str) -> bool:
+    """
+    Cheap check for the request path of whether an artifact fingerprinted
+    ``fingerprint`` was built from other inputs than the current ones. A
+    source changed since it was last hashed counts as outdated.
+    """
+    if not os.path.exists(combination.source_file):  # noqa: PTH110
+        # Nothing to rebuild it from
+        return False
+    return fingerprint != source_fingerprint(combination, compute=False)
+
+
+def iter_combinations():
+    """
+    Every (scenario, variable, season, period, region) the API can be asked
+    for. Combinations only differing by region share the source file.
+    """
+
+    def choices(field):
+        return [value for value, _ in ClimateData._meta.get_field(field).choices]
+
+    variables = dict.fromkeys(normalize_variable(v) for v in choices("variable"))
+    regions = Region.objects.order_by("slug").values_list("slug", flat=True)
+    for scenario, variable, season, period, region in itertools.product(
+        choices("scenario"),
+        variables,
+        choices("season"),
+        settings.NETCDF_PRECOMPUTE_PERIODS,
+        regions,
+    ):
+        yield Combination(scenario, variable, season, period, region)
+
+
+def is_stale(combination: Combination, cached: dict) -> bool:
+    """
+    A combination needs (re)computing when any of its artifacts is missing
+    from the table or from storage, or was built from other inputs.
+    """
+    fingerprint = source_fingerprint(combination)
+    for file_type in FILE_TYPES:
+        entry = cached.get(file_type)
+        if entry is None or not default_storage.exists(entry.file.name):
+            return True
+        if entry.source_fingerprint != fingerprint:
+            return True
+    return False
+
+
+def plan_precompute() -> list[Combination]:
+    """Combinations whose FileCache entries are missing or stale."""
+    cached = {}
+    for entry in FileCache.objects.all():
+        key = Combination(
+            entry.scenario,
+            entry.variable,
+            entry.season,
+            entry.period,
+            entry.region,
+        )
+        cached.setdefault(key, {})[entry.file_type] = entry
+
+    missing = []
+    for combination in iter_combinations():
+        if not os.path.exists(combination.source_file):  # noqa: PTH110
+            logger.warning("Skipping %s, no source file", combination)
+            continue
+        if is_stale(combination, cached.get(combination, {})):
+            missing.append(combination)
+    return missing
@@ -0,0 +1,110 @@
+import logging
+import math
+
+import netCDF4
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TIME_DIM = "time"
+# Bytes of source data read at a time when copying a variable
+COPY_MEMORY = 256 * 1024 * 1024
+
+
+def timeseries_chunks(var: netCDF4.Variable, spatial_chunk: int):
+    """
+    Chunk shape for a time-contiguous layout: the full time axis in every
+    chunk and at most ``spatial_chunk`` cells along every other dimension.
+    Returns None for variables that don't vary in time.
+    """
+    if TIME_DIM not in var.dimensions:
+        return None
+    return tuple(
+        max(1, size) if dim == TIME_DIM else max(1, min(spatial_chunk, size))
+        for dim, size in zip(var.dimensions, var.shape, strict=True)
+    )
+
+
+def _slab_rows(src_var, axis: int, spatial_chunk: int, memory: int) -> int:
+    """
+    Rows per slab along ``axis``: as many as fit in ``memory`` bytes, since
+    sources chunked per time step decompress every chunk again for each
+    slab, rounded to whole output chunks so each is written once.
+    """
+    if not isinstance(src_var.datatype, np.dtype):
+        return spatial_chunk
+    cells = math.prod(size for i, size in enumerate(src_var.shape) if i != axis)
+    rows = memory // max(1, cells * src_var.datatype.itemsize)
+    return max(spatial_chunk, rows // spatial_chunk * spatial_chunk)
+
+
+def _copy_variable_data(src_var, dst_var, spatial_chunk: int, memory: int):
+    if src_var.ndim == 0:
+        dst_var.assignValue(src_var.getValue())
+        return
+
+    # Copy slabs along the first non-time dimension so memory stays bounded by
+    # one slab (full time axis x some rows) regardless of the file size.
+    axis = next(
+        (i for i, dim in enumerate(src_var.dimensions) if dim != TIME_DIM),
+        None,
+    )
+    if axis is None or src_var.ndim == 1:
+        dst_var[:] = src_var[:]
+        return
+
+    block_size = _slab_rows(src_var, axis, spatial_chunk, memory)
+    for start in range(0, src_var.shape[axis], block_size):
+        index = [slice(None)] * src_var.ndim
+        index[axis] = slice(start, start + block_size)
+        dst_var[tuple(index)] = src_var[tuple(index)]
+
+
+def write_timeseries_copy(
+    source: str,
+    output_path: str,
+    spatial_chunk: int = 8,
+    memory: int = COPY_MEMORY,
+):
+    """
+    Write a copy of ``source`` re-chunked for point timeseries access.
+
+    Uploaded files are usually chunked per time step (or contiguous), so reading
+    the timeseries of a single cell touches every chunk in the file. The copy
+    keeps the whole time axis in one chunk per ``spatial_chunk`` x
+    ``spatial_chunk`` block of cells instead. Data is copied in slabs of about
+    ``memory`` bytes.
+    """
+    with (
+        netCDF4.Dataset(source) as src,
+        netCDF4.Dataset(output_path, "w", format="NETCDF4") as dst,
+    ):
+        # Copy raw values; packing and fill values are carried over as attributes.
+        src.set_auto_maskandscale(False)
+        dst.setncatts({attr: src.getncattr(attr) for attr in src.ncattrs()})
+
+        for name, dim in src.dimensions.items():
+            dst.createDimension(name, None if dim.isunlimited() else len(dim))
+
+        for name, src_var in src.variables.items():
+            attrs = {attr: src_var.getncattr(attr) for attr in src_var.ncattrs()}
+            fill_value = attrs.pop("_FillValue", None)
+            chunks = timeseries_chunks(src_var, spatial_chunk)
+            numeric = isinstance(src_var.datatype, np.dtype) and src_var.ndim > 0
+
+            dst_var = dst.createVariable(
+                name,
+                src_var.datatype,
+                src_var.dimensions,
+                zlib=numeric,
+                complevel=1,
+                shuffle=numeric,
+                chunksizes=chunks if numeric else None,
+                fill_value=fill_value,
+            )
+            dst_var.set_auto_maskandscale(False)
+            dst_var.setncatts(attrs)
+            _copy_variable_data(src_var, dst_var, spatial_chunk, memory)
+
+    logger.info("Wrote timeseries copy of %s to %s", source, output_path)
+    return output_path
@@ -0,0 +1,14 @@
+import functools
+
+from django.conf import settings
+from redis import Redis
+
+
+@functools.cache
+def get_redis() -> Redis:
+    """
+    Client for the keys the services keep in Redis themselves rather than
+    in the cache (locks, job progress and events, hit counters), sharing one
+    connection pool per process.
+    """
+    return Redis.from_url(settings.REDIS_URL)
@@ -0,0 +1,89 @@
+import functools
+import hashlib
+
+import numpy as np
+import shapely
+from django.core.cache import cache
+
+from netcdf_backend.apps.netcdf.models import Region
+from netcdf_backend.apps.netcdf.services.grids import grid_hash
+
+MASK_TIMEOUT = 60 * 60 * 24 * 7
+FINGERPRINT_TIMEOUT = 60 * 60 * 24
+
+
+REGION_SLUGS_KEY = "netcdf:region-slugs"
+
+
+def get_region(slug: str) -> Region:
+    return Region.objects.get(slug=slug)
+
+
+def region_version(region: Region) -> str:
+    return f"{region.slug}:{region.updated_at.timestamp():.0f}"
+
+
+def region_slugs() -> frozenset[str]:
+    """
+    Slugs of every region, read through the cache (invalidated when a region
+    is saved or deleted) since each lookup request is validated against them.
+    """
+    slugs = cache.get(REGION_SLUGS_KEY)
+    if slugs is None:
+        slugs = frozenset(Region.objects.values_list("slug", flat=True))
+        cache.set(REGION_SLUGS_KEY, slugs, timeout=FINGERPRINT_TIMEOUT)
+    return slugs
+
+
+def region_fingerprint_key(slug: str) -> str:
+    return f"netcdf:region-fingerprint:{slug}"
+
+
+def region_fingerprint(slug: str) -> str:
+    """
+    Digest of the border and bounding box results of region ``slug`` are
+    clipped to, read through the cache (invalidated when the region is
+    saved) since it is part of every artifact's source fingerprint.
+    """
+    key = region_fingerprint_key(slug)
+    fingerprint = cache.get(key)
+    if fingerprint is not None:
+        return fingerprint
+
+    region = Region.objects.filter(slug=slug).first()
+    if region is None:
+        return "missing"
+    digest = hashlib.sha256(repr(region.bbox).encode())
+    digest.update(bytes(region.geom.wkb))
+    fingerprint = digest.hexdigest()
+    cache.set(key, fingerprint, timeout=FINGERPRINT_TIMEOUT)
+    return fingerprint
+
+
+@functools.lru_cache(maxsize=32)
+def _geometry(version: str, wkb: bytes):
+    geometry = shapely.from_wkb(wkb)
+    shapely.prepare(geometry)
+    return geometry
+
+
+def region_geometry(region: Region):
+    """The region's geometry as a prepared shapely geometry, built once."""
+    return _geometry(region_version(region), bytes(region.geom.wkb))
+
+
+def region_mask(region: Region, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Boolean (lat, lon) mask of the grid points inside the region, computed
+    once per grid and shared with the other workers through the cache.
+    """
+    key = f"netcdf:region-mask:{region_version(region)}:{grid_hash(lats, lons)}"
+    packed = cache.get(key)
+    if packed is not None:
+        mask = np.unpackbits(packed, count=lats.size * lons.size)
+        return mask.astype(bool).reshape(lats.size, lons.size)
+
+    lon_grid, lat_grid = np.meshgrid(lons, lats)
+    mask = shapely.contains_xy(region_geometry(region), lon_grid, lat_grid)
+    cache.set(key, np.packbits(mask), timeout=MASK_TIMEOUT)
+    return mask
@@ -0,0 +1,315 @@
+import base64
+import io
+import math
+import queue
+import time
+from collections.abc import Callable
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+
+import cartopy.crs as ccrs
+import numpy as np
+import xarray as xr
+from django.conf import settings
+from matplotlib import colormaps
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import BoundaryNorm
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
+
+from netcdf_backend.apps.netcdf.services.basemap import add_basemap
+from netcdf_backend.apps.netcdf.services.choices import MIME_TYPES
+
+# Templates kept per plot type; about the number of threads rendering at once.
+POOL_SIZE = 4
+# Encoder settings per format, passed to Pillow for the raster ones.
+SAVE_OPTIONS = {
+    "png": {"pil_kwargs": {"compress_level": 9}},
+    "webp": {"pil_kwargs": {"quality": 85, "method": 6}},
+    "svg": {},
+}
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    """
+    How a plot is encoded. ``width``/``height`` are in pixels; with only one
+    of them the template's aspect ratio is kept.
+    """
+
+    format: str = "png"
+    dpi: int = 100
+    width: int | None = None
+    height: int | None = None
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.format]
+
+    def size_inches(self, default: tuple) -> tuple:
+        width, height = default
+        if self.width and self.height:
+            return self.width / self.dpi, self.height / self.dpi
+        if self.width:
+            return self.width / self.dpi, height * self.width / self.dpi / width
+        if self.height:
+            return width * self.height / self.dpi / height, self.height / self.dpi
+        return default
+
+
+@dataclass
+class FigureTemplate:
+    """A figure with its axes already laid out, cleared between renders."""
+
+    figure: Figure
+    ax: Axes
+    cax: Axes | None = None
+    size_inches: tuple = field(init=False)
+
+    def __post_init__(self):
+        self.size_inches = tuple(self.figure.get_size_inches())
+
+    def reset(self):
+        self.ax.clear()
+        if self.cax is not None:
+            self.cax.clear()
+        self.figure.set_size_inches(self.size_inches)
+
+
+class FigurePool:
+    """
+    Reuses figure templates of one plot type instead of building and laying
+    out a new figure per render. Templates are handed to one caller at a
+    time, so renders on different threads never share a figure; nothing here
+    touches pyplot's global state.
+    """
+
+    def __init__(self, factory: Callable[[], FigureTemplate], size: int = POOL_SIZE):
+        self._factory = factory
+        self._free = queue.LifoQueue(maxsize=size)
+
+    @contextmanager
+    def template(self):
+        try:
+            template = self._free.get_nowait()
+        except queue.Empty:
+            template = self._factory()
+
+        yield template
+
+        # Only clean templates go back; one that failed mid-render is dropped.
+        template.reset()
+        with suppress(queue.Full):
+            self._free.put_nowait(template)
+
+
+def _figure(figsize: tuple) -> Figure:
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def map_template() -> FigureTemplate:
+    figure = _figure((10, 6))
+    ax = figure.add_axes((0.04, 0.06, 0.8, 0.86), projection=ccrs.PlateCarree())
+    cax = figure.add_axes((0.87, 0.18, 0.02, 0.62))
+    return FigureTemplate(figure, ax, cax)
+
+
+def spatial_template() -> FigureTemplate:
+    figure = _figure((8, 5))
+    ax = figure.add_axes((0.1, 0.12, 0.72, 0.8))
+    cax = figure.add_axes((0.85, 0.12, 0.03, 0.8))
+    return FigureTemplate(figure, ax, cax)
+
+
+def timeseries_template() -> FigureTemplate:
+    figure = _figure((8, 5))
+    ax = figure.add_axes((0.1, 0.12, 0.86, 0.8))
+    return FigureTemplate(figure, ax)
+
+
+POOLS = {
+    "map": FigurePool(map_template),
+    "spatial": FigurePool(spatial_template),
+    "timeseries": FigurePool(timeseries_template),
+}
+
+
+def figure_bytes(template: FigureTemplate, output: OutputFormat) -> bytes:
+    template.figure.set_size_inches(output.size_inches(template.size_inches))
+    buf = io.BytesIO()
+    template.figure.savefig(
+        buf,
+        format=output.format,
+        dpi=output.dpi,
+        **SAVE_OPTIONS[output.format],
+    )
+    return buf.getvalue()
+
+
+def data_uri(content: bytes, mime_type: str = "image/png") -> str:
+    return f"data:{mime_type};base64,{base64.b64encode(content).decode('utf-8')}"
+
+
+def select_render_mode(da: xr.DataArray, mode: str) -> str:
+    """Resolve `auto` to contours for small grids and a raster for large ones."""
+    if mode != "auto":
+        return mode
+    return "raster" if da.size > settings.NETCDF_RENDER_RASTER_MIN_CELLS else "contour"
+
+
+def color_levels(values: np.ndarray) -> np.ndarray:
+    """The band edges `contourf(levels=20)` would pick, usable by any mode."""
+    return MaxNLocator(nbins=20).tick_values(np.nanmin(values), np.nanmax(values))
+
+
+def coarsen_for_contours(da: xr.DataArray, lat_dim: str, lon_dim: str):
+    """Block-average ``da`` down to at most NETCDF_RENDER_CONTOUR_MAX_CELLS."""
+    factor = math.ceil(math.sqrt(da.size / settings.NETCDF_RENDER_CONTOUR_MAX_CELLS))
+    if factor <= 1:
+        return da
+    return da.coarsen({lat_dim: factor, lon_dim: factor}, boundary="trim").mean()
+
+
+def _is_regular(coord: np.ndarray) -> bool:
+    step = np.diff(coord)
+    return step.size > 0 and np.allclose(step, step[0], rtol=1e-3)
+
+
+def _draw_raster(ax, da: xr.DataArray, lat_dim: str, lon_dim: str, **style):
+    lons = da[lon_dim].values
+    lats = da[lat_dim].values
+    if not (_is_regular(lons) and _is_regular(lats)):
+        return ax.pcolormesh(
+            lons,
+            lats,
+            da.values,
+            shading="nearest",
+            transform=ccrs.PlateCarree(),
+            **style,
+        )
+
+    # Regular grids are plain images: no mesh to build
+    half_lon = abs(lons[1] - lons[0]) / 2
+    half_lat = abs(lats[1] - lats[0]) / 2
+    return ax.imshow(
+        da.values,
+        origin="lower" if lats[0] < lats[-1] else "upper",
+        extent=(
+            lons.min() - half_lon,
+            lons.max() + half_lon,
+            lats.min() - half_lat,
+            lats.max() + half_lat,
+        ),
+        interpolation="nearest",
+        transform=ccrs.PlateCarree(),
+        **style,
+    )
+
+
+def render_temperature_map(  # noqa: PLR0913
+    da: xr.DataArray,
+    var: str,
+    lat_dim: str,
+    lon_dim: str,
+    mode: str = "auto",
+    output: OutputFormat = OutputFormat(),
+    levels: np.ndarray | None = None,
+    title: str | None = None,
+) -> bytes:
+    """
+    Map of ``da`` over the basemap, as filled contours (`contour` mode) or a
+    raster with contour lines from a coarsened grid (`raster` mode, for grids
+    where contouring is slow). Both use the same color bands, ``levels`` if
+    given (e.g. to keep the scale fixed across animation frames). Contour
+    lines and their labels are only drawn while within
+    NETCDF_RENDER_TIME_BUDGET.
+    """
+    deadline = time.perf_counter() + settings.NETCDF_RENDER_TIME_BUDGET
+    mode = select_render_mode(da, mode)
+    if levels is None:
+        levels = color_levels(da.values)
+    cmap = colormaps["Spectral_r"]
+
+    with POOLS["map"].template() as template:
+        ax = template.ax
+        ax.set_title(title or f"{var.capitalize()} Map")
+
+        if mode == "raster":
+            mappable = _draw_raster(
+                ax,
+                da,
+                lat_dim,
+                lon_dim,
+                cmap=cmap,
+                norm=BoundaryNorm(levels, cmap.N),
+            )
+            contour_da = coarsen_for_contours(da, lat_dim, lon_dim)
+        else:
+            # Filled contour
+            mappable = ax.contourf(
+                da[lon_dim],
+                da[lat_dim],
+                da.values,
+                levels=levels,
+                cmap=cmap,
+                transform=ccrs.PlateCarree(),
+            )
+            contour_da = da
+
+        # Contour lines
+        if time.perf_counter() < deadline:
+            contours = ax.contour(
+                contour_da[lon_dim],
+                contour_da[lat_dim],
+                contour_da.values,
+                colors="black",
+                linewidths=0.5,
+                transform=ccrs.PlateCarree(),
+            )
+            if time.perf_counter() < deadline:
+                ax.clabel(contours, inline=True, fontsize=8)
+
+        # Add map features, pre-projected once per extent
+        add_basemap(
+            ax,
+            float(da[lon_dim].min()),
+            float(da[lon_dim].max()),
+            float(da[lat_dim].min()),
+            float(da[lat_dim].max()),
+        )
+
+        # Colorbar
+        cbar = template.figure.colorbar(mappable, cax=template.cax)
+        cbar.set_label("Temperature (°C)")
+
+        return figure_bytes(template, output)
+
+
+def render_spatial_plot(
+    data2d: xr.DataArray,
+    var: str,
+    output: OutputFormat = OutputFormat(),
+) -> bytes:
+    with POOLS["spatial"].template() as template:
+        data2d.plot(ax=template.ax, cbar_ax=template.cax)
+        template.ax.set_title(f"Mean {var} Spatial Plot")
+        return figure_bytes(template, output)
+
+
+def render_timeseries(  # noqa: PLR0913
+    times,
+    values: np.ndarray,
+    title: str,
+    var: str,
+    output: OutputFormat = OutputFormat(),
+) -> bytes:
+    with POOLS["timeseries"].template() as template:
+        ax = template.ax
+        ax.plot(times, values)
+        ax.set_title(title)
+        ax.set_xlabel("Time")
+        ax.set_ylabel(var)
+        return figure_bytes(template, output)
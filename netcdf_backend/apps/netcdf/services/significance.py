@@ -0,0 +1,89 @@
+import numpy as np
+from scipy.special import ndtr, stdtr
+
+
+def _moments(x: np.ndarray, axis: int) -> tuple:
+    """Count, mean and sample variance of the non-NaN values along ``axis``."""
+    valid = ~np.isnan(x)
+    n = valid.sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(x, axis=axis) / n
+        deviations = np.where(valid, x - np.expand_dims(mean, axis), 0)
+        var = (deviations**2).sum(axis=axis) / (n - 1)
+    return n, mean, var
+
+
+def welch_ttest(a: np.ndarray, b: np.ndarray, axis: int = 0) -> tuple:
+    """
+    Welch's two-sided t-test of ``a`` against ``b`` along ``axis``, for
+    every other index at once, ignoring NaNs. Matches
+    `scipy.stats.ttest_ind(a, b, equal_var=False, nan_policy="omit")`,
+    without its masked-array path. Cells with fewer than two values on
+    either side get NaN.
+    """
+    n_a, mean_a, var_a = _moments(np.asarray(a, dtype=np.float64), axis)
+    n_b, mean_b, var_b = _moments(np.asarray(b, dtype=np.float64), axis)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        se_a = var_a / n_a
+        se_b = var_b / n_b
+        t = (mean_a - mean_b) / np.sqrt(se_a + se_b)
+        df = (se_a + se_b) ** 2 / (se_a**2 / (n_a - 1) + se_b**2 / (n_b - 1))
+        p = 2 * stdtr(df, -np.abs(t))
+
+    too_few = (n_a < 2) | (n_b < 2)  # noqa: PLR2004
+    return np.where(too_few, np.nan, t), np.where(too_few, np.nan, p)
+
+
+def mann_kendall(x: np.ndarray, axis: int = 0) -> tuple:
+    """
+    Two-sided Mann-Kendall trend test along ``axis`` (e.g. yearly means),
+    for every other index at once. NaNs are skipped pairwise. Returns the
+    S statistic, its normal approximation Z (continuity corrected, no tie
+    correction) and the p-value. Cells with fewer than three values get NaN.
+    """
+    x = np.moveaxis(np.asarray(x, dtype=np.float64), axis, 0)
+    steps = x.shape[0]
+
+    s = np.zeros(x.shape[1:])
+    for lag in range(1, steps):
+        # NaN differences have sign NaN; nansum counts them as ties
+        s += np.nansum(np.sign(x[lag:] - x[:-lag]), axis=0)
+
+    n = (~np.isnan(x)).sum(axis=0)
+    var_s = n * (n - 1) * (2 * n + 5) / 18
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(s > 0, s - 1, np.where(s < 0, s + 1, 0)) / np.sqrt(var_s)
+    p = 2 * ndtr(-np.abs(z))
+
+    too_few = n < 3  # noqa: PLR2004
+    return (
+        np.where(too_few, np.nan, s),
+        np.where(too_few, np.nan, z),
+        np.where(too_few, np.nan, p),
+    )
+
+
+def benjamini_hochberg(p_values: np.ndarray) -> np.ndarray:
+    """
+    Benjamini-Hochberg adjusted p-values (q-values) across all of
+    ``p_values``, whatever their shape: a cell is significant at false
+    discovery rate ``alpha`` when its q-value is <= ``alpha``. NaNs are left
+    out of the family and stay NaN.
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    q_values = np.full(p_values.shape, np.nan)
+
+    tested = ~np.isnan(p_values)
+    p = p_values[tested]
+    if p.size == 0:
+        return q_values
+
+    order = np.argsort(p)
+    ranked = p[order] * p.size / np.arange(1, p.size + 1)
+    # Each q-value is the smallest adjusted p-value at its rank or above
+    ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+    q = np.empty_like(p)
+    q[order] = np.minimum(ranked, 1)
+    q_values[tested] = q
+    return q_values
@@ -0,0 +1,97 @@
+import fcntl
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils.text import get_valid_filename
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadLimitExceededError(Exception):
+    pass
+
+
+class UploadBusyError(Exception):
+    pass
+
+
+class SHA256UploadHandler(FileUploadHandler):
+    """
+    Hash multipart files as their chunks stream in. Install it ahead of the
+    default handlers: it passes every chunk through and leaves storing the
+    file to them, recording the digests in `hashes` by field name.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.hashes = {}
+        self._digest = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._digest.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.hashes[self.field_name] = self._digest.hexdigest()
+
+
+def upload_storage_name(uuid, filename: str) -> str:
+    return f"netcdf-files/{uuid}_{get_valid_filename(Path(filename).name)}"
+
+
+@contextmanager
+def hold_upload(path: Path):
+    """
+    Exclusive hold on the file of an upload, across processes, for as long
+    as a chunk is written or the file finalized. Raises UploadBusyError
+    rather than wait if another request holds it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("ab") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadBusyError from None
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def write_chunk(path: Path, offset: int, stream, max_bytes: int) -> int:
+    """
+    Write ``stream`` into ``path`` starting at ``offset`` and return the number
+    of bytes written. Anything previously written past ``offset`` (e.g. the
+    tail of an interrupted request) is discarded first.
+
+    Raises UploadLimitExceededError, leaving the file at ``offset`` bytes, if
+    the stream holds more than ``max_bytes``.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+
+    with path.open("r+b" if path.exists() else "wb") as f:
+        f.seek(offset)
+        f.truncate()
+        while chunk := stream.read(READ_CHUNK_SIZE):
+            written += len(chunk)
+            if written > max_bytes:
+                f.truncate(offset)
+                raise UploadLimitExceededError
+            f.write(chunk)
+
+    return written
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
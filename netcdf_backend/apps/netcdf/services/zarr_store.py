@@ -0,0 +1,105 @@
+import logging
+import shutil
+from pathlib import Path
+
+import xarray as xr
+from numcodecs import Blosc
+
+logger = logging.getLogger(__name__)
+
+TIME_DIM = "time"
+# Store attribute recording which version of the NetCDF file it was
+# converted from
+SOURCE_VERSION_ATTR = "zarr_source_version"
+
+
+def zarr_path_for(path) -> Path:
+    """The Zarr store for a NetCDF file lives next to it, e.g. `foo.nc.zarr`."""
+    return Path(f"{path}.zarr")
+
+
+def source_version(path) -> str:
+    """Changes whenever the file at ``path`` is replaced or modified."""
+    stat = Path(path).stat()
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def open_dataset(path, **kwargs) -> xr.Dataset:
+    """
+    Open a NetCDF file, reading from its converted Zarr store when one exists
+    and was converted from the file as it is now.
+
+    Zarr reads need no HDF5 lock, so they run in parallel across threads and
+    processes, and the consolidated metadata opens without scanning the file.
+    """
+    zarr_path = zarr_path_for(path)
+    if zarr_path.is_dir():
+        ds = xr.open_zarr(zarr_path, consolidated=True, chunks=None, **kwargs)
+        if ds.attrs.get(SOURCE_VERSION_ATTR) == source_version(path):
+            return ds
+        ds.close()
+        logger.warning(
+            "%s is out of date, reading %s until it is converted again",
+            zarr_path,
+            path,
+        )
+    return xr.open_dataset(path, **kwargs)
+
+
+def _chunks_for(var: xr.Variable, chunks: dict):
+    return tuple(
+        max(1, min(chunks.get(dim, size), size))
+        for dim, size in zip(var.dims, var.shape, strict=True)
+    )
+
+
+def convert_to_zarr(
+    source,
+    chunks: dict,
+    compression_level: int = 3,
+) -> Path:
+    """
+    Convert ``source`` to a Zarr store with Blosc/Zstd compression and
+    consolidated metadata, written next to it.
+
+    The data is copied in blocks of whole time chunks so memory stays bounded
+    for multi-GB files, into a temporary store that is renamed into place once
+    complete so readers never see a partial store.
+    """
+    output_path = zarr_path_for(source)
+    tmp_path = output_path.with_name(f"{output_path.name}.tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+    compressor = Blosc(cname="zstd", clevel=compression_level, shuffle=Blosc.SHUFFLE)
+
+    # Taken before reading, so a file replaced mid-conversion isn't matched
+    version = source_version(source)
+    with xr.open_dataset(source) as source_ds:
+        ds = source_ds.assign_attrs({SOURCE_VERSION_ATTR: version})
+        encoding = {
+            name: {"compressor": compressor, "chunks": _chunks_for(var, chunks)}
+            for name, var in ds.variables.items()
+            if var.ndim > 0
+        }
+
+        if TIME_DIM not in ds.dims:
+            ds.to_zarr(tmp_path, mode="w", encoding=encoding, consolidated=True)
+        else:
+            block = chunks.get(TIME_DIM, ds.sizes[TIME_DIM])
+            for start in range(0, ds.sizes[TIME_DIM], block):
+                part = ds.isel({TIME_DIM: slice(start, start + block)})
+                if start == 0:
+                    part.to_zarr(
+                        tmp_path,
+                        mode="w",
+                        encoding=encoding,
+                        consolidated=True,
+                    )
+                else:
+                    part.to_zarr(tmp_path, append_dim=TIME_DIM, consolidated=True)
+
+    shutil.rmtree(output_path, ignore_errors=True)
+    tmp_path.rename(output_path)
+
+    logger.info("Converted %s to %s", source, output_path)
+    return output_path
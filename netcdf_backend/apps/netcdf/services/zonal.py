@@ -0,0 +1,230 @@
+import csv
+import functools
+
+import numpy as np
+import shapely
+from django.core.cache import cache
+from django.db.models import Count, Max
+from scipy.sparse import csr_matrix
+
+from netcdf_backend.apps.netcdf.models import AdministrativeArea, ClimateData
+from netcdf_backend.apps.netcdf.services.grids import grid_hash
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+from netcdf_backend.apps.netcdf.services.regions import get_region
+from netcdf_backend.apps.netcdf.services.zarr_store import open_dataset
+
+WEIGHTS_TIMEOUT = 60 * 60 * 24 * 7
+CSV_COLUMNS = ["code", "name", "cells", "coverage", "mean", "min", "max"]
+
+
+def _axis_within(axis: np.ndarray, points: np.ndarray, low: float, high: float):
+    if points.size:
+        low = min(low, points.min())
+        high = max(high, points.max())
+    return np.sort(axis[(axis >= low) & (axis <= high)])
+
+
+def _nearest(axis: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Index of the ``axis`` value (sorted) closest to each of ``points``."""
+    if axis.size == 1:
+        return np.zeros(points.size, dtype=np.intp)
+    index = np.clip(np.searchsorted(axis, points), 1, axis.size - 1)
+    return index - (points - axis[index - 1] < axis[index] - points)
+
+
+def climate_grid(combination: Combination) -> tuple:
+    """
+    The stored result grid of ``combination`` as (lats, lons, values), with
+    NaN where no point was kept (e.g. outside the border). The axes are the
+    source file's over the region's bounding box, not those of the stored
+    points: a row or column without any would otherwise be left out and
+    stretch its neighbours' cells over it.
+    """
+    rows = np.array(
+        ClimateData.objects.filter(**combination.as_kwargs()).values_list(
+            "latitude",
+            "longitude",
+            "value",
+        ),
+        dtype=np.float64,
+    ).reshape(-1, 3)
+    min_lon, min_lat, max_lon, max_lat = get_region(combination.region).bbox
+    with open_dataset(combination.source_file) as ds:
+        # Preprocessing may fall back to the points nearest a small region
+        lats = _axis_within(ds.lat.to_numpy(), rows[:, 0], min_lat, max_lat)
+        lons = _axis_within(ds.lon.to_numpy(), rows[:, 1], min_lon, max_lon)
+
+    values = np.full((lats.size, lons.size), np.nan)
+    values[_nearest(lats, rows[:, 0]), _nearest(lons, rows[:, 1])] = rows[:, 2]
+    return lats, lons, values
+
+
+def _edges(centers: np.ndarray) -> np.ndarray:
+    """Cell boundaries halfway between centers, extended at both ends."""
+    if centers.size == 1:
+        return np.array([centers[0] - 0.5, centers[0] + 0.5])
+    middle = (centers[1:] + centers[:-1]) / 2
+    return np.concatenate(
+        [
+            [2 * centers[0] - middle[0]],
+            middle,
+            [2 * centers[-1] - middle[-1]],
+        ],
+    )
+
+
+def cell_weights(geometries: list, lats: np.ndarray, lons: np.ndarray) -> csr_matrix:
+    """
+    Sparse (zones x cells) matrix of the area each zone covers of each grid
+    cell, cells in row-major (lat, lon) order. Areas are in degrees scaled by
+    cos(latitude), proportional to the true area on regular lat/lon grids.
+    """
+    lat_edges = _edges(lats)
+    lon_edges = _edges(lons)
+    lon0, lat0 = np.meshgrid(lon_edges[:-1], lat_edges[:-1])
+    lon1, lat1 = np.meshgrid(lon_edges[1:], lat_edges[1:])
+    cells = shapely.box(
+        np.minimum(lon0, lon1).ravel(),
+        np.minimum(lat0, lat1).ravel(),
+        np.maximum(lon0, lon1).ravel(),
+        np.maximum(lat0, lat1).ravel(),
+    )
+
+    geometries = np.asarray(geometries, dtype=object)
+    zone_index, cell_index = shapely.STRtree(cells).query(
+        geometries,
+        predicate="intersects",
+    )
+    overlap = shapely.area(
+        shapely.intersection(geometries[zone_index], cells[cell_index]),
+    )
+    cell_lats = np.repeat(lats, lons.size)[cell_index]
+    weights = overlap * np.cos(np.deg2rad(cell_lats))
+    return csr_matrix(
+        (weights, (zone_index, cell_index)),
+        shape=(geometries.size, cells.size),
+    )
+
+
+def areas_version(level: str) -> str:
+    """Changes whenever an area of ``level`` is added, edited or removed."""
+    stats = AdministrativeArea.objects.filter(level=level).aggregate(
+        count=Count("id"),
+        updated_at=Max("updated_at"),
+    )
+    updated_at = stats["updated_at"].timestamp() if stats["updated_at"] else 0
+    return f"{stats['count']}-{updated_at:.0f}"
+
+
+@functools.lru_cache(maxsize=16)
+def _zone_weights(key: str, level: str, lats: tuple, lons: tuple) -> tuple:
+    cached = cache.get(key)
+    if cached is not None:
+        zones, (data, indices, indptr, shape) = cached
+        return zones, csr_matrix((data, indices, indptr), shape=shape)
+
+    areas = list(AdministrativeArea.objects.filter(level=level))
+    zones = [(area.code, area.name) for area in areas]
+    weights = cell_weights(
+        [shapely.from_wkb(bytes(area.geom.wkb)) for area in areas],
+        np.array(lats),
+        np.array(lons),
+    )
+    cache.set(
+        key,
+        (zones, (weights.data, weights.indices, weights.indptr, weights.shape)),
+        timeout=WEIGHTS_TIMEOUT,
+    )
+    return zones, weights
+
+
+def zone_weights(level: str, lats: np.ndarray, lons: np.ndarray) -> tuple:
+    """
+    The (code, name) of every area of ``level`` and their `cell_weights` on
+    the grid. Computed once per grid and set of areas, then shared with the
+    other workers through the cache.
+    """
+    key = (
+        f"netcdf:zonal-weights:{level}:{areas_version(level)}:{grid_hash(lats, lons)}"
+    )
+    return _zone_weights(key, level, tuple(lats.tolist()), tuple(lons.tolist()))
+
+
+def _weighted_percentiles(values, weights, percentiles) -> np.ndarray:
+    order = np.argsort(values)
+    values = values[order]
+    weights = weights[order]
+    # Each value sits at the middle of its share of the total weight
+    position = (np.cumsum(weights) - weights / 2) / weights.sum()
+    return np.interp(np.asarray(percentiles) / 100, position, values)
+
+
+def zonal_statistics(
+    values: np.ndarray,
+    zones: list,
+    weights: csr_matrix,
+    percentiles: list[int],
+) -> list[dict]:
+    """
+    Area-weighted mean, min, max and percentiles of ``values`` (the grid
+    the weights were computed for) over every zone. `coverage` is the share
+    of the zone's area on cells with data.
+    """
+    values = values.ravel()
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0)
+    total = np.asarray(weights.sum(axis=1)).ravel()
+    covered = weights @ valid.astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (weights @ filled) / covered
+        coverage = covered / total
+
+    rows = []
+    for index, (code, name) in enumerate(zones):
+        start, end = weights.indptr[index], weights.indptr[index + 1]
+        cells = weights.indices[start:end]
+        cell_weight = weights.data[start:end]
+        keep = valid[cells] & (cell_weight > 0)
+        row = {
+            "code": code,
+            "name": name,
+            "cells": int(keep.sum()),
+            "coverage": float(np.nan_to_num(coverage[index])),
+            "mean": None,
+            "min": None,
+            "max": None,
+            **{f"p{p}": None for p in percentiles},
+        }
+        if keep.any():
+            zone_values = values[cells[keep]]
+            row["mean"] = float(means[index])
+            row["min"] = float(zone_values.min())
+            row["max"] = float(zone_values.max())
+            quantiles = _weighted_percentiles(
+                zone_values,
+                cell_weight[keep],
+                percentiles,
+            )
+            for p, q in zip(percentiles, quantiles, strict=True):
+                row[f"p{p}"] = float(q)
+        rows.append(row)
+    return rows
+
+
+def combination_statistics(
+    combination: Combination,
+    level: str,
+    percentiles: list[int],
+) -> list[dict]:
+    lats, lons, values = climate_grid(combination)
+    zones, weights = zone_weights(level, lats, lons)
+    return zonal_statistics(values, zones, weights, percentiles)
+
+
+def write_csv(f, rows: list[dict], percentiles: list[int], extra_columns=()):
+    writer = csv.DictWriter(
+        f,
+        fieldnames=[*extra_columns, *CSV_COLUMNS, *(f"p{p}" for p in percentiles)],
+    )
+    writer.writeheader()
+    writer.writerows(rows)
@@ -0,0 +1,35 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from netcdf_backend.apps.netcdf.models import FileCache, Region
+from netcdf_backend.apps.netcdf.services.cache_lookup import invalidate
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+from netcdf_backend.apps.netcdf.services.regions import (
+    REGION_SLUGS_KEY,
+    region_fingerprint_key,
+)
+
+
+@receiver(post_save, sender=FileCache)
+@receiver(post_delete, sender=FileCache)
+def invalidate_file_cache_lookup(sender, instance: FileCache, **kwargs):
+    combination = Combination(
+        instance.scenario,
+        instance.variable,
+        instance.season,
+        instance.period,
+        instance.region,
+    )
+    # After commit, so a concurrent read can't cache the pre-save row again.
+    transaction.on_commit(lambda: invalidate(instance.file_type, combination))
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+def invalidate_region_caches(sender, instance: Region, **kwargs):
+    # A new border or bounding box outdates every artifact of the region;
+    # new, renamed and deleted regions change the valid slugs.
+    keys = [region_fingerprint_key(instance.slug), REGION_SLUGS_KEY]
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -1,75 +1,626 @@
-from celery import shared_task
+import contextlib
+import logging
+import tempfile
+import uuid
+from pathlib import Path
+
+import numpy as np
+from celery import Task, chain, chord, current_app, group, shared_task, states
 from django.conf import settings
-from redis import Redis
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
 from redis.exceptions import LockError
 from redis.lock import Lock
 
-from netcdf_backend.apps.netcdf.models import FileCache
+from netcdf_backend.apps.netcdf.models import FileCache, NetCDFFile
 from netcdf_backend.apps.netcdf.serializers import FilterParameterSerializer
+from netcdf_backend.apps.netcdf.services.animation import (
+    animation_name,
+    delete_expired_animations,
+    encode_animation,
+    frame_data,
+    frame_name,
+    plan_frames,
+)
+from netcdf_backend.apps.netcdf.services.climatology import write_climatology
+from netcdf_backend.apps.netcdf.services.downloads import (
+    COMPRESSED_FILE_TYPES,
+    artifact_size,
+    delete_artifact,
+    save_compressed_variants,
+)
+from netcdf_backend.apps.netcdf.services.eviction import evict
 from netcdf_backend.apps.netcdf.services.geojson_generator import generate_geojson
 from netcdf_backend.apps.netcdf.services.geotiff import generate_geotiff
+from netcdf_backend.apps.netcdf.services.jobs import (
+    JobProgress,
+    claim_pending_job,
+    get_pending_job,
+    job_status,
+    publish_job_event,
+    record_job_duration,
+    release_pending_job,
+)
 from netcdf_backend.apps.netcdf.services.netcdf_preprocess import process_netcdf
+from netcdf_backend.apps.netcdf.services.precompute import (
+    Combination,
+    is_stale,
+    plan_precompute,
+    source_fingerprint,
+)
+from netcdf_backend.apps.netcdf.services.rechunk import write_timeseries_copy
+from netcdf_backend.apps.netcdf.services.redis_client import get_redis
+from netcdf_backend.apps.netcdf.services.regions import get_region
+from netcdf_backend.apps.netcdf.services.renderers import (
+    OutputFormat,
+    color_levels,
+    render_temperature_map,
+)
+from netcdf_backend.apps.netcdf.services.uploads import file_sha256
+from netcdf_backend.apps.netcdf.services.zarr_store import (
+    convert_to_zarr,
+    open_dataset,
+)
+from netcdf_backend.apps.netcdf.utils import select_plot_data
+
+logger = logging.getLogger(__name__)
+
+# Broker priorities, 0 first: requests waiting on a miss go ahead of warm-up
+# batches and background refreshes.
+USER_PRIORITY = 0
+BATCH_PRIORITY = 6
+
+PREPROCESS_TIME_LIMIT = 30 * 60
+ANIMATION_TIME_LIMIT = 15 * 60
+
+
+def store_artifact(file_type: str, path: Path) -> dict:
+    """
+    Upload a generated artifact under a content-hashed name, so its URL is
+    immutable and can be cached forever. Its FileCache entry only points at
+    it once `swap_artifacts` runs.
+    """
+    content_hash = file_sha256(path)
+    upload_to = FileCache._meta.get_field("file").upload_to
+    name = f"{upload_to}{path.stem}.{content_hash[:12]}{path.suffix}"
+    if not default_storage.exists(name):
+        with path.open("rb") as f:
+            name = default_storage.save(name, File(f))
+    if file_type in COMPRESSED_FILE_TYPES:
+        save_compressed_variants(path, name)
+    return {
+        "file_type": file_type,
+        "name": name,
+        "file_hash": content_hash,
+        "size": artifact_size(name),
+    }
+
+
+def swap_artifacts(combination: Combination, artifacts: list[dict]):
+    """
+    Point the FileCache entries of ``combination`` at freshly stored
+    artifacts in one transaction; the previous versions are served until it
+    commits, and their files are deleted after.
+    """
+    with transaction.atomic():
+        for artifact in artifacts:
+            previous = FileCache.objects.filter(
+                file_type=artifact["file_type"],
+                **combination.as_kwargs(),
+            ).first()
+            FileCache.objects.update_or_create(
+                file_type=artifact["file_type"],
+                **combination.as_kwargs(),
+                defaults={
+                    "file": artifact["name"],
+                    "file_hash": artifact["file_hash"],
+                    "size": artifact["size"],
+                    "source_fingerprint": artifact["fingerprint"],
+                    "created_at": timezone.now(),
+                },
+            )
+            if previous is not None and previous.file.name != artifact["name"]:
+                name = previous.file.name
+                transaction.on_commit(lambda name=name: delete_artifact(name))
+
 
+def close_job(combination: Combination | str, job_id: str):
+    """Release the combination's pending-job slot and announce the outcome."""
+    release_pending_job(combination, job_id)
+    publish_job_event(job_id, job_status(job_id))
 
-@shared_task(bind=True)
-def process_and_cache_netcdf(
+
+def filter_serializer_for(scenario, season, period, variable, region):
+    return FilterParameterSerializer(
+        data={
+            "scenario": scenario,
+            "season": season,
+            "period": period,
+            "variable": variable,
+            "region": region,
+        },
+    )
+
+
+@shared_task(
+    bind=True,
+    max_retries=5,
+    time_limit=PREPROCESS_TIME_LIMIT,
+    soft_time_limit=PREPROCESS_TIME_LIMIT - 60,
+)
+def preprocess_netcdf(  # noqa: PLR0913
     self,
     file,
+    *,
+    job_id,
+    scenario,
+    season,
+    period,
+    variable,
+    region,
+):
+    """
+    First step of a processing job: compute the change and significance of a
+    combination into ClimateData. Tells the exports which source fingerprint
+    they build, and whether there is anything to build at all.
+    """
+    redis_client = get_redis()
+    lock_key = f"lock:geotiff:{region}:{scenario}:{season}:{period}:{variable}"
+
+    # Hold the lock for as long as the job may run. Jobs are normally
+    # deduplicated by the pending registry; this guards direct task calls.
+    lock = Lock(
+        redis_client,
+        lock_key,
+        timeout=PREPROCESS_TIME_LIMIT,
+        blocking_timeout=0,
+    )
+    if not lock.acquire():
+        raise self.retry(countdown=10)
+
+    progress = JobProgress(job_id)
+    combination = Combination(scenario, variable, season, period, region)
+    try:
+        # Fingerprint the inputs before reading them, so an update landing
+        # mid-job leaves the result marked stale rather than current.
+        fingerprint = source_fingerprint(combination)
+        cached = {
+            entry.file_type: entry
+            for entry in FileCache.objects.filter(**combination.as_kwargs())
+        }
+        if not is_stale(combination, cached):
+            return {"fingerprint": fingerprint, "up_to_date": True}
+
+        # Process NetCDF and store in database
+        process_netcdf(
+            file,
+            filter_serializer=filter_serializer_for(
+                scenario,
+                season,
+                period,
+                variable,
+                region,
+            ),
+            region=get_region(region),
+            progress=progress,
+        )
+        # The exports start their own stages, possibly on other workers
+        progress.finish()
+        return {"fingerprint": fingerprint, "up_to_date": False}
+    finally:
+        # The lock may have expired under a long job; nothing to release then.
+        with contextlib.suppress(LockError):
+            lock.release()
+
+
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=3,
+    time_limit=10 * 60,
+    soft_time_limit=9 * 60,
+)
+def export_geotiff(  # noqa: PLR0913
+    preprocessed,
+    *,
+    job_id,
+    scenario,
+    season,
+    period,
+    variable,
+    region,
+):
+    if preprocessed["up_to_date"]:
+        return None
+
+    progress = JobProgress(job_id)
+    progress.start("raster")
+    path = Path(
+        f"caches/change_ensmean_{variable}_{scenario}_{season}_{period}_{region}.tiff",
+    )
+    try:
+        generate_geotiff(
+            filter_serializer=filter_serializer_for(
+                scenario,
+                season,
+                period,
+                variable,
+                region,
+            ),
+            region=get_region(region),
+            output_path=path,
+        ).close()
+        artifact = store_artifact("geotiff", path)
+    finally:
+        # The artifact is in storage now; drop the local working copy.
+        path.unlink(missing_ok=True)
+    progress.finish()
+    return {**artifact, "fingerprint": preprocessed["fingerprint"]}
+
+
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=3,
+    time_limit=10 * 60,
+    soft_time_limit=9 * 60,
+)
+def export_geojson(  # noqa: PLR0913
+    preprocessed,
+    *,
+    job_id,
+    scenario,
+    season,
+    period,
+    variable,
+    region,
+):
+    if preprocessed["up_to_date"]:
+        return None
+
+    progress = JobProgress(job_id)
+    progress.start("geojson")
+    path = Path(
+        f"caches/sig_ensmean_{variable}_{scenario}_{season}_{period}_{region}.geojson",
+    )
+    try:
+        generate_geojson(
+            scenario,
+            variable,
+            season,
+            period,
+            str(path),
+            region=get_region(region),
+        ).close()
+        artifact = store_artifact("geojson", path)
+    finally:
+        path.unlink(missing_ok=True)
+    progress.finish()
+    return {**artifact, "fingerprint": preprocessed["fingerprint"]}
+
+
+class PendingJobTask(Task):
+    """
+    Closes the job once its last task is done. Failures of earlier tasks
+    never reach it and are handled by `fail_processing_job` instead.
+    """
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):  # noqa: PLR0913
+        if status == states.RETRY:
+            return
+        combination = Combination(
+            scenario=kwargs["scenario"],
+            variable=kwargs["variable"],
+            season=kwargs["season"],
+            period=kwargs["period"],
+            region=kwargs["region"],
+        )
+        # Jobs that found their artifacts up to date ran no stages
+        if status == states.SUCCESS and retval["timings"]:
+            record_job_duration(retval["duration"])
+        close_job(combination, task_id)
+
+
+@shared_task(bind=True, base=PendingJobTask)
+def finalize_netcdf_cache(  # noqa: PLR0913
+    self,
+    artifacts,
+    *,
     scenario,
     season,
     period,
     variable,
-    region_bbox,
+    region,
 ):
-    redis_client = Redis.from_url(settings.REDIS_URL)
-    lock_key = f"lock:geotiff:{scenario}:{season}:{period}:{variable}"
+    """Last step of a processing job, whose id is the job's: swap the exports in."""
+    combination = Combination(scenario, variable, season, period, region)
+    artifacts = [artifact for artifact in artifacts if artifact is not None]
+    if artifacts:
+        swap_artifacts(combination, artifacts)
+    return JobProgress(self.request.id).summary()
 
-    # Try to acquire lock with a 5-minute timeout
-    with Lock(redis_client, lock_key, timeout=300, blocking_timeout=0):
+
+@shared_task()
+def fail_processing_job(request, exc, traceback, *, job_id, **combination):
+    """
+    Error callback of a processing job: any failed step fails the job, as the
+    steps after it never run.
+    """
+    current_app.backend.mark_as_failure(job_id, exc, traceback=traceback)
+    close_job(Combination(**combination), job_id)
+
+
+def processing_pipeline(combination: Combination, job_id: str, priority: int):
+    """
+    preprocess -> (geotiff | geojson) -> finalize. The exports run in parallel
+    and retry on their own; finalize carries the job id, so the job is done
+    when it is.
+    """
+    kwargs = {"job_id": job_id, **combination.as_kwargs()}
+    return chain(
+        preprocess_netcdf.si(combination.source_file, **kwargs).set(
+            priority=priority,
+        ),
+        chord(
+            [
+                export_geotiff.s(**kwargs).set(priority=priority),
+                export_geojson.s(**kwargs).set(priority=priority),
+            ],
+            finalize_netcdf_cache.s(**combination.as_kwargs()).set(
+                task_id=job_id,
+                priority=priority,
+            ),
+        ),
+    ).on_error(fail_processing_job.s(job_id=job_id, **combination.as_kwargs()))
+
+
+def enqueue_processing(
+    combination: Combination,
+    priority: int = USER_PRIORITY,
+) -> str:
+    """
+    Start the job computing ``combination`` unless one is already in flight,
+    and return the id of the job that will produce it.
+    """
+    job_id = str(uuid.uuid4())
+    in_flight = claim_pending_job(combination, job_id)
+    if in_flight == job_id:
         try:
-            filter_serializer = FilterParameterSerializer(
-                data={
-                    "scenario": scenario,
-                    "season": season,
-                    "period": period,
-                    "variable": variable,
-                },
-            )
-            # Process NetCDF and store in database
-            process_netcdf(
-                file,
-                filter_serializer=filter_serializer,
-                region_bbox=region_bbox,
-            )
+            processing_pipeline(combination, job_id, priority).apply_async()
+        except Exception:
+            # Nothing will release the claim of a job that never started
+            release_pending_job(combination, job_id)
+            raise
+    return in_flight
 
-            # Generate and cache GeoTIFF
-            geotiff_path = f"caches/change_ensmean_{variable}_{scenario}_{season}_{period}_Tanzania.tiff"
-            print("Generating....")
-            geotiff = generate_geotiff(
-                filter_serializer=filter_serializer,
-                region_bbox=region_bbox,
-                output_path=geotiff_path,
-            )
-            FileCache.objects.update_or_create(
-                file_type="geotiff",
-                scenario=scenario,
-                variable=variable,
-                season=season,
-                period=period,
-                defaults={"file": geotiff},
-            )
 
-            # Generate and cache GeoJSON
-            geojson_path = f"caches/sig_ensmean_{variable}_{scenario}_{season}_{period}_Tanzania.geojson"
-            geojson = generate_geojson(scenario, variable, season, period, geojson_path)
-            FileCache.objects.update_or_create(
-                file_type="geojson",
-                scenario=scenario,
-                variable=variable,
-                season=season,
-                period=period,
-                defaults={"file": geojson},
+@shared_task(
+    time_limit=PREPROCESS_TIME_LIMIT,
+    soft_time_limit=PREPROCESS_TIME_LIMIT - 60,
+)
+def create_timeseries_copy(uuid):
+    nc_file = NetCDFFile.objects.get(uuid=uuid)
+    name = f"{Path(nc_file.file.name).stem}_timeseries.nc"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = Path(tmp_dir) / name
+        write_timeseries_copy(
+            nc_file.file.path,
+            str(output_path),
+            spatial_chunk=settings.NETCDF_TIMESERIES_SPATIAL_CHUNK,
+            memory=settings.NETCDF_TIMESERIES_COPY_MEMORY,
+        )
+        with output_path.open("rb") as f:
+            nc_file.timeseries_file.save(name, File(f, name=name))
+
+
+@shared_task(
+    time_limit=PREPROCESS_TIME_LIMIT,
+    soft_time_limit=PREPROCESS_TIME_LIMIT - 60,
+)
+def create_climatology(uuid):
+    nc_file = NetCDFFile.objects.get(uuid=uuid)
+    name = f"{Path(nc_file.file.name).stem}_climatology.nc"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = Path(tmp_dir) / name
+        with open_dataset(nc_file.file.path) as ds:
+            written = write_climatology(
+                ds,
+                str(output_path),
+                block=settings.NETCDF_CLIMATOLOGY_TIME_BLOCK,
             )
-        except LockError:
-            # Task is already running
-            raise self.retry(countdown=10, max_retries=5)
+        if written is None:
+            logger.info("%s has no datetime axis, no climatology", nc_file)
+            return
+        with output_path.open("rb") as f:
+            nc_file.climatology_file.save(name, File(f, name=name))
+
+
+@shared_task(
+    time_limit=PREPROCESS_TIME_LIMIT,
+    soft_time_limit=PREPROCESS_TIME_LIMIT - 60,
+)
+def convert_netcdf_to_zarr(uuid):
+    nc_file = NetCDFFile.objects.get(uuid=uuid)
+    convert_to_zarr(
+        nc_file.file.path,
+        chunks=settings.NETCDF_ZARR_CHUNKS,
+        compression_level=settings.NETCDF_ZARR_COMPRESSION_LEVEL,
+    )
+
+
+def animation_pending_key(key: str) -> str:
+    return f"animation:{key}"
+
+
+def open_animation_data(nc_uuid: str, data: dict):
+    nc_file = NetCDFFile.objects.get(uuid=nc_uuid)
+    return select_plot_data(open_dataset(nc_file.file.path), data)
+
+
+@shared_task(bind=True, time_limit=ANIMATION_TIME_LIMIT)
+def plan_animation(self, nc_uuid, data, *, key):
+    """
+    First step of an animation job: split the series into frames and fix one
+    color scale for all of them, then replace itself with the frame renders
+    and the encoding, which takes over the job id.
+    """
+    da, _, _ = open_animation_data(nc_uuid, data)
+    frames = plan_frames(
+        da,
+        data.get("frequency"),
+        settings.NETCDF_ANIMATION_MAX_FRAMES,
+    )
+    levels = color_levels(np.array([float(da.min()), float(da.max())]))
+
+    size = settings.NETCDF_ANIMATION_CHUNK_FRAMES
+    renders = group(
+        render_animation_frames.s(
+            nc_uuid,
+            data,
+            frames[start : start + size],
+            start=start,
+            levels=levels.tolist(),
+            job_id=self.request.id,
+        )
+        for start in range(0, len(frames), size)
+    )
+    return self.replace(
+        chord(
+            renders,
+            encode_animation_frames.s(key=key, fmt=data["format"], fps=data["fps"]),
+        ),
+    )
+
+
+@shared_task(time_limit=ANIMATION_TIME_LIMIT)
+def render_animation_frames(  # noqa: PLR0913
+    nc_uuid,
+    data,
+    frames,
+    *,
+    start,
+    levels,
+    job_id,
+):
+    """Render a run of frames into storage, returning their names."""
+    da, lat_dim, lon_dim = open_animation_data(nc_uuid, data)
+    var = data["variable"]
+    output = OutputFormat("png", data["dpi"], data.get("width"))
+    names = []
+    for index, (label, first, stop) in enumerate(frames, start):
+        content = render_temperature_map(
+            frame_data(da, first, stop).load(),
+            var,
+            lat_dim,
+            lon_dim,
+            mode=data["render_mode"],
+            output=output,
+            levels=np.array(levels),
+            title=f"{var.capitalize()} {label}",
+        )
+        names.append(
+            default_storage.save(frame_name(job_id, index), ContentFile(content)),
+        )
+    return names
+
+
+class AnimationJobTask(Task):
+    """Closes an animation job once its encoding step is done."""
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):  # noqa: PLR0913
+        if status == states.RETRY:
+            return
+        close_job(animation_pending_key(kwargs["key"]), task_id)
+
+
+@shared_task(base=AnimationJobTask, time_limit=ANIMATION_TIME_LIMIT)
+def encode_animation_frames(rendered, *, key, fmt, fps):
+    """Last step of an animation job, whose id is the job's."""
+    names = [name for chunk in rendered for name in chunk]
+    try:
+        frames = []
+        for frame in names:
+            with default_storage.open(frame) as f:
+                frames.append(f.read())
+        name = animation_name(key, fmt)
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(encode_animation(frames, fmt, fps)))
+    finally:
+        for frame in names:
+            default_storage.delete(frame)
+    return {"name": name, "url": default_storage.url(name), "frames": len(names)}
+
+
+@shared_task()
+def fail_animation_job(request, exc, traceback, *, job_id, key):
+    """Error callback of an animation job: any failed step fails the job."""
+    current_app.backend.mark_as_failure(job_id, exc, traceback=traceback)
+    close_job(animation_pending_key(key), job_id)
+
+
+def enqueue_animation(nc_uuid: str, data: dict, key: str) -> str:
+    """
+    Start the job rendering the animation ``key`` unless one is already in
+    flight, and return the id of the job that will produce it.
+    """
+    job_id = str(uuid.uuid4())
+    in_flight = claim_pending_job(animation_pending_key(key), job_id)
+    if in_flight == job_id:
+        try:
+            plan_animation.si(nc_uuid, data, key=key).set(task_id=job_id).on_error(
+                fail_animation_job.s(job_id=job_id, key=key),
+            ).apply_async()
+        except Exception:
+            release_pending_job(animation_pending_key(key), job_id)
+            raise
+    return in_flight
+
+
+@shared_task()
+def warm_file_cache(limit=None):
+    """
+    Start jobs for missing or stale FileCache combinations, keeping at most
+    `limit` of them running; beat calls this periodically until none are left.
+    """
+    limit = limit or settings.NETCDF_PRECOMPUTE_CONCURRENCY
+
+    missing = plan_precompute()
+    in_flight = sum(1 for c in missing if get_pending_job(c) is not None)
+    dispatched = 0
+    for combination in missing:
+        if in_flight >= limit:
+            break
+        if get_pending_job(combination) is not None:
+            continue
+        enqueue_processing(combination, priority=BATCH_PRIORITY)
+        in_flight += 1
+        dispatched += 1
+
+    report = {
+        "missing": len(missing),
+        "in_flight": in_flight,
+        "dispatched": dispatched,
+    }
+    logger.info("File cache warm-up: %s", report)
+    return report
+
+
+@shared_task(time_limit=30 * 60, soft_time_limit=25 * 60)
+def evict_file_cache():
+    """
+    Keep the cached GeoTIFF/GeoJSON artifacts within their byte budget, and
+    drop expired animations.
+    """
+    report = evict(
+        settings.NETCDF_CACHE_MAX_BYTES,
+        policy=settings.NETCDF_CACHE_EVICTION_POLICY,
+    )
+    report["animations_deleted"] = delete_expired_animations(
+        settings.NETCDF_ANIMATION_MAX_AGE,
+    )
+    return report
@@ -0,0 +1,78 @@
+from collections import defaultdict
+
+import pytest
+from django.core.cache import cache
+
+from netcdf_backend.apps.netcdf import tasks
+from netcdf_backend.apps.netcdf.services import eviction, jobs
+
+
+class FakeRedis:
+    """In-memory stand-in for the Redis hash commands the services use."""
+
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+        self.published = []
+
+    def pipeline(self, transaction=True):  # noqa: FBT002
+        return FakePipeline(self)
+
+    def hget(self, key, field):
+        return self.hashes[key].get(field.encode())
+
+    def hgetall(self, key):
+        return dict(self.hashes[key])
+
+    def hset(self, key, field, value):
+        self.hashes[key][field.encode()] = str(value).encode()
+
+    def hsetnx(self, key, field, value):
+        if field.encode() in self.hashes[key]:
+            return 0
+        self.hset(key, field, value)
+        return 1
+
+    def hincrby(self, key, field, amount):
+        value = int(self.hashes[key].get(field.encode(), 0)) + amount
+        self.hset(key, field, value)
+        return value
+
+    def delete(self, *keys):
+        return sum(self.hashes.pop(key, None) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        return key in self.hashes
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+        return lambda *args: self.commands.append((command, args))
+
+    def execute(self):
+        results = [command(*args) for command, args in self.commands]
+        self.commands = []
+        return results
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    # Lookups, fingerprints and markers are cached across tests otherwise
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = FakeRedis()
+    for module in (eviction, jobs, tasks):
+        monkeypatch.setattr(module, "get_redis", lambda: redis)
+    return redis
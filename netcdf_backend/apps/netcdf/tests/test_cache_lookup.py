@@ -0,0 +1,69 @@
+import pytest
+
+from netcdf_backend.apps.netcdf.models import FileCache
+from netcdf_backend.apps.netcdf.services.cache_lookup import (
+    get_cached_file,
+    invalidate,
+    set_pending,
+)
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+
+COMBINATION = Combination("ssp245", "pr", "ANN", "2025-2054")
+
+
+def create_entry(**kwargs):
+    return FileCache.objects.create(
+        file_type="geotiff",
+        file="caches/change.abc123.tiff",
+        file_hash="abc123",
+        **COMBINATION.as_kwargs(),
+        **kwargs,
+    )
+
+
+@pytest.mark.django_db
+def test_get_cached_file_reads_through(django_assert_num_queries):
+    create_entry()
+
+    with django_assert_num_queries(1):
+        entry = get_cached_file("geotiff", COMBINATION)
+    with django_assert_num_queries(0):
+        assert get_cached_file("geotiff", COMBINATION) == entry
+    assert entry["name"] == "caches/change.abc123.tiff"
+    assert entry["file_hash"] == "abc123"
+
+
+@pytest.mark.django_db
+def test_get_cached_file_unknown():
+    assert get_cached_file("geotiff", COMBINATION) is None
+    # Misses aren't cached, the artifact may be stored any moment
+    create_entry()
+    assert get_cached_file("geotiff", COMBINATION) is not None
+
+
+@pytest.mark.django_db
+def test_get_cached_file_pending(django_assert_num_queries):
+    set_pending("geotiff", COMBINATION, "job")
+
+    with django_assert_num_queries(0):
+        assert get_cached_file("geotiff", COMBINATION) == {"job_id": "job"}
+    assert get_cached_file("geojson", COMBINATION) is None
+
+    invalidate("geotiff", COMBINATION)
+    assert get_cached_file("geotiff", COMBINATION) is None
+
+
+@pytest.mark.django_db
+def test_saved_entries_invalidate_lookup(django_capture_on_commit_callbacks):
+    entry = create_entry()
+    assert get_cached_file("geotiff", COMBINATION)["file_hash"] == "abc123"
+
+    entry.file = "caches/change.def456.tiff"
+    entry.file_hash = "def456"
+    with django_capture_on_commit_callbacks(execute=True):
+        entry.save()
+    assert get_cached_file("geotiff", COMBINATION)["file_hash"] == "def456"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        entry.delete()
+    assert get_cached_file("geotiff", COMBINATION) is None
@@ -0,0 +1,148 @@
+import gzip
+from http import HTTPStatus
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.http import http_date
+
+from netcdf_backend.apps.netcdf.services.downloads import (
+    artifact_etag,
+    artifact_response,
+    if_range_matches,
+    parse_range,
+    save_compressed_variants,
+)
+
+CONTENTS = b'{"type": "FeatureCollection", "features": []}'
+FILE_HASH = "abc123"
+LAST_MODIFIED = 1_767_225_600
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, None),
+        ("bytes=0-9", (0, 9)),
+        ("bytes=5-", (5, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=-200", (0, 99)),
+        ("bytes=90-200", (90, 99)),
+        ("bytes=0-1,5-6", None),
+        ("items=0-9", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=5-4", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError, match="bytes"):
+        parse_range(header, 100)
+
+
+def test_etag_per_encoding():
+    assert artifact_etag(FILE_HASH, None) == '"abc123"'
+    assert artifact_etag(FILE_HASH, "gzip") == '"abc123-gzip"'
+    assert artifact_etag(FILE_HASH, "br") == '"abc123-br"'
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, True),
+        ('"abc123"', True),
+        ('"abc123-gzip"', False),
+        ('W/"abc123"', False),
+        (http_date(LAST_MODIFIED), True),
+        (http_date(LAST_MODIFIED - 1), False),
+        ("not a date", False),
+    ],
+)
+def test_if_range_matches(header, expected):
+    assert if_range_matches(header, '"abc123"', LAST_MODIFIED) is expected
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    name = default_storage.save("caches/sig.geojson", ContentFile(CONTENTS))
+    path = tmp_path / "sig.geojson"
+    path.write_bytes(CONTENTS)
+    save_compressed_variants(path, name)
+    return name
+
+
+def download(rf, name, **headers):
+    response = artifact_response(
+        rf.get("/", **headers),
+        name,
+        "geojson",
+        file_hash=FILE_HASH,
+        last_modified=LAST_MODIFIED,
+    )
+    body = b"".join(response.streaming_content)
+    response.close()
+    return response, body
+
+
+def test_whole_file(rf, artifact):
+    response, body = download(rf, artifact)
+
+    assert response.status_code == HTTPStatus.OK
+    assert body == CONTENTS
+    assert response["ETag"] == '"abc123"'
+    assert response["Accept-Ranges"] == "bytes"
+    assert "Content-Encoding" not in response
+
+
+def test_precompressed_variant(rf, artifact):
+    response, body = download(rf, artifact, HTTP_ACCEPT_ENCODING="gzip")
+
+    assert gzip.decompress(body) == CONTENTS
+    assert response["Content-Encoding"] == "gzip"
+    assert response["ETag"] == '"abc123-gzip"'
+    assert response["Vary"] == "Accept-Encoding"
+
+
+def test_range(rf, artifact):
+    response, body = download(rf, artifact, HTTP_RANGE="bytes=2-5")
+
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT
+    assert body == CONTENTS[2:6]
+    assert response["Content-Range"] == f"bytes 2-5/{len(CONTENTS)}"
+
+
+def test_range_with_matching_if_range(rf, artifact):
+    response, body = download(
+        rf,
+        artifact,
+        HTTP_RANGE="bytes=2-5",
+        HTTP_IF_RANGE='"abc123"',
+    )
+
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT
+    assert body == CONTENTS[2:6]
+
+
+def test_range_of_another_version(rf, artifact):
+    response, body = download(
+        rf,
+        artifact,
+        HTTP_RANGE="bytes=2-5",
+        HTTP_IF_RANGE='"older"',
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert body == CONTENTS
+
+
+def test_unsatisfiable_range(rf, artifact):
+    response = artifact_response(
+        rf.get("/", HTTP_RANGE=f"bytes={len(CONTENTS)}-"),
+        artifact,
+        "geojson",
+    )
+
+    assert response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response["Content-Range"] == f"bytes */{len(CONTENTS)}"
@@ -0,0 +1,90 @@
+from datetime import UTC, datetime
+from unittest import mock
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from netcdf_backend.apps.netcdf.models import FileCache
+from netcdf_backend.apps.netcdf.services import eviction
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+
+COMBINATION = Combination("ssp245", "pr", "ANN", "2025-2054")
+
+
+def create_entry(file_type="geotiff", **kwargs):
+    return FileCache.objects.create(
+        file_type=file_type,
+        file=f"caches/{file_type}-{kwargs.get('period', COMBINATION.period)}",
+        size=10,
+        **{**COMBINATION.as_kwargs(), **kwargs},
+    )
+
+
+def test_record_hit_survives_redis_errors(monkeypatch, caplog):
+    redis = mock.Mock()
+    redis.pipeline.return_value.execute.side_effect = RedisConnectionError()
+    monkeypatch.setattr(eviction, "get_redis", lambda: redis)
+
+    eviction.record_hit("geotiff", COMBINATION)
+
+    assert "Could not record a hit" in caplog.text
+
+
+@pytest.mark.django_db
+def test_flush_hits(redis):
+    entry = create_entry()
+    other = create_entry(file_type="geojson")
+    eviction.record_hit("geotiff", COMBINATION)
+    eviction.record_hit("geotiff", COMBINATION)
+
+    assert eviction.flush_hits() == 1
+    entry.refresh_from_db()
+    other.refresh_from_db()
+    assert entry.hit_count == 2
+    assert entry.last_accessed_at is not None
+    assert other.hit_count == 0
+    assert other.last_accessed_at is None
+    # Flushed hits aren't counted again
+    assert eviction.flush_hits() == 0
+
+
+@pytest.mark.django_db
+def test_flush_hits_without_last_access(redis):
+    entry = create_entry()
+    eviction.record_hit("geotiff", COMBINATION)
+    del redis.hashes[eviction.LAST_ACCESS_KEY]
+
+    assert eviction.flush_hits() == 1
+    entry.refresh_from_db()
+    assert entry.hit_count == 1
+    assert entry.last_accessed_at is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    ("policy", "kept"),
+    [("lru", {"2035-2064", "2045-2074"}), ("lfu", {"2025-2054", "2045-2074"})],
+)
+def test_evict(redis, monkeypatch, policy, kept):
+    monkeypatch.setattr(eviction, "delete_artifact", mock.Mock())
+    for period, hits, day in [
+        ("2025-2054", 9, 1),
+        ("2035-2064", 1, 2),
+        ("2045-2074", 5, 3),
+    ]:
+        create_entry(
+            period=period,
+            hit_count=hits,
+            last_accessed_at=datetime(2026, 1, day, tzinfo=UTC),
+        )
+
+    report = eviction.evict(max_bytes=25, policy=policy)
+
+    assert report["evicted"] == 1
+    assert report["freed_bytes"] == 10
+    assert set(FileCache.objects.values_list("period", flat=True)) == kept
+
+
+def test_evict_unknown_policy():
+    with pytest.raises(ValueError, match="Unknown eviction policy"):
+        eviction.evict(max_bytes=0, policy="fifo")
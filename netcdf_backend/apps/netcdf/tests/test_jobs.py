@@ -0,0 +1,225 @@
+import json
+from unittest import mock
+
+import pytest
+from celery import states
+
+from netcdf_backend.apps.netcdf import tasks, views
+from netcdf_backend.apps.netcdf.services import jobs
+from netcdf_backend.apps.netcdf.services.jobs import (
+    PROGRESS_STATE,
+    STAGES,
+    JobProgress,
+    claim_pending_job,
+    get_pending_job,
+    job_channel,
+    job_status,
+    read_progress,
+    record_job_duration,
+    release_pending_job,
+)
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+
+JOB_ID = "0b7c5d0e-job"
+COMBINATION = {
+    "scenario": "ssp245",
+    "season": "ANN",
+    "period": "2025-2054",
+    "variable": "pr",
+    "region": "tanzania",
+}
+PREPROCESS_STAGES = ["load", "aggregate", "t-test", "clip", "insert"]
+
+
+@pytest.fixture
+def job_result(monkeypatch):
+    """The job's last task, still waiting on the earlier ones."""
+    result = mock.Mock(state=states.PENDING, info=None)
+    result.ready.return_value = False
+    result.successful.return_value = False
+    result.failed.return_value = False
+    monkeypatch.setattr(
+        jobs,
+        "current_app",
+        mock.Mock(**{"AsyncResult.return_value": result}),
+    )
+    return result
+
+
+def test_job_status_unknown(redis, job_result):
+    status = job_status(JOB_ID)
+
+    assert status["state"] == states.PENDING
+    assert status["progress"] == 0
+    assert status["timings"] == {}
+    assert status["eta"] is None
+
+
+def test_job_status_eta(redis, job_result, monkeypatch):
+    record_job_duration(100)
+    record_job_duration(200)
+    JobProgress(JOB_ID).start("load")
+    started_at = read_progress(JOB_ID)["started_at"]
+    monkeypatch.setattr(jobs.time, "time", lambda: started_at + 30)
+
+    # 0.8 * 100 + 0.2 * 200, less the 30s the job has run
+    assert job_status(JOB_ID)["eta"] == 90
+
+
+def test_job_status_finished(redis, job_result):
+    progress = JobProgress(JOB_ID)
+    progress.start("raster")
+    progress.finish()
+    job_result.state = states.SUCCESS
+    job_result.ready.return_value = True
+    job_result.successful.return_value = True
+
+    status = job_status(JOB_ID)
+
+    assert status["state"] == states.SUCCESS
+    assert status["progress"] == 1
+    assert status["eta"] == 0
+    assert list(status["timings"]) == ["raster"]
+    assert "error" not in status
+
+
+def test_job_status_failed(redis, job_result):
+    job_result.state = states.FAILURE
+    job_result.ready.return_value = True
+    job_result.failed.return_value = True
+    job_result.result = ValueError("No data points found in or near Tanzania")
+
+    status = job_status(JOB_ID)
+
+    assert status["state"] == states.FAILURE
+    assert status["error"] == "No data points found in or near Tanzania"
+
+
+def test_job_status_view(rf, redis, job_result):
+    JobProgress(JOB_ID).start("load")
+
+    response = views.JobStatusView.as_view()(rf.get("/"), job_id=JOB_ID)
+
+    assert response.data["result"]["job_id"] == JOB_ID
+    assert response.data["result"]["running"] == ["load"]
+
+
+def test_close_job(redis, job_result):
+    combination = Combination(**COMBINATION)
+    claim_pending_job(combination, JOB_ID)
+
+    tasks.close_job(combination, JOB_ID)
+
+    assert get_pending_job(combination) is None
+    [(channel, message)] = redis.published
+    assert channel == job_channel(JOB_ID)
+    assert json.loads(message)["job_id"] == JOB_ID
+
+
+def test_job_progress_without_job_id():
+    progress = JobProgress()
+    progress.start("load")
+    assert progress.summary()["running"] == ["load"]
+    progress.start("aggregate")
+    summary = progress.finish()
+
+    assert summary["running"] == []
+    assert summary["stage"] is None
+    assert set(summary["timings"]) == {"load", "aggregate"}
+    assert summary["progress"] == round(2 / len(STAGES), 2)
+
+
+def test_job_progress_shared_between_tasks(redis):
+    first = JobProgress(JOB_ID)
+    first.start("load")
+    second = JobProgress(JOB_ID)
+    second.start("raster")
+
+    assert second.started_at == first.started_at
+    assert read_progress(JOB_ID)["running"] == ["load", "raster"]
+    first.finish()
+    progress = read_progress(JOB_ID)
+    assert progress["running"] == ["raster"]
+    assert progress["stage"] == "raster"
+    assert list(progress["timings"]) == ["load"]
+
+
+@pytest.mark.django_db
+def test_processing_job_status(redis, job_result, monkeypatch):
+    running = []
+
+    def process_netcdf(file, *, filter_serializer, region, progress):
+        for stage in PREPROCESS_STAGES:
+            progress.start(stage)
+        running.append(job_status(JOB_ID)["running"])
+
+    monkeypatch.setattr(tasks, "Lock", mock.MagicMock())
+    monkeypatch.setattr(tasks, "source_fingerprint", lambda combination: "abc")
+    monkeypatch.setattr(tasks, "is_stale", lambda combination, cached: True)
+    monkeypatch.setattr(tasks, "get_region", mock.Mock())
+    monkeypatch.setattr(tasks, "process_netcdf", process_netcdf)
+    monkeypatch.setattr(tasks, "generate_geotiff", mock.Mock())
+    monkeypatch.setattr(
+        tasks,
+        "store_artifact",
+        lambda file_type, path: {"file_type": file_type},
+    )
+
+    preprocessed = tasks.preprocess_netcdf("source.nc", job_id=JOB_ID, **COMBINATION)
+    assert running == [["insert"]]
+    status = job_status(JOB_ID)
+    assert status["state"] == PROGRESS_STATE
+    assert status["running"] == []
+    assert set(status["timings"]) == set(PREPROCESS_STAGES)
+
+    tasks.export_geotiff(preprocessed, job_id=JOB_ID, **COMBINATION)
+    status = job_status(JOB_ID)
+    assert status["running"] == []
+    assert set(status["timings"]) == {*PREPROCESS_STAGES, "raster"}
+    assert status["progress"] == round(6 / len(STAGES), 2)
+
+
+def test_claim_pending_job():
+    combination = Combination(**COMBINATION)
+    assert claim_pending_job(combination, "first") == "first"
+    assert claim_pending_job(combination, "second") == "first"
+
+    # Only the job holding the claim releases it
+    release_pending_job(combination, "second")
+    assert get_pending_job(combination) == "first"
+    release_pending_job(combination, "first")
+    assert get_pending_job(combination) is None
+    assert claim_pending_job(combination, "second") == "second"
+
+
+def test_claim_pending_job_without_cache(monkeypatch):
+    # What a cache ignoring its connection errors answers
+    broken = mock.Mock(**{"add.return_value": False, "get.return_value": None})
+    monkeypatch.setattr(jobs, "cache", broken)
+
+    assert claim_pending_job(Combination(**COMBINATION), "job") == "job"
+    assert broken.add.call_count == jobs.CLAIM_ATTEMPTS
+
+
+def test_enqueue_processing_coalesces(monkeypatch):
+    pipeline = mock.Mock()
+    monkeypatch.setattr(tasks, "processing_pipeline", pipeline)
+    combination = Combination(**COMBINATION)
+
+    job_id = tasks.enqueue_processing(combination)
+
+    assert tasks.enqueue_processing(combination) == job_id
+    pipeline.assert_called_once_with(combination, job_id, tasks.USER_PRIORITY)
+    pipeline.return_value.apply_async.assert_called_once_with()
+    assert get_pending_job(combination) == job_id
+
+
+def test_enqueue_processing_releases_on_error(monkeypatch):
+    pipeline = mock.Mock()
+    pipeline.return_value.apply_async.side_effect = ConnectionError("broker down")
+    monkeypatch.setattr(tasks, "processing_pipeline", pipeline)
+    combination = Combination(**COMBINATION)
+
+    with pytest.raises(ConnectionError):
+        tasks.enqueue_processing(combination)
+    assert get_pending_job(combination) is None
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from netcdf_backend.apps.netcdf import utils
+from netcdf_backend.apps.netcdf.utils import coordinate_range, extract_netcdf_metadata
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "tas.nc"
+    xr.Dataset(
+        {
+            "tas": (
+                ("time", "lat", "lon"),
+                np.zeros((3, 4, 6), dtype=np.float32),
+                {"long_name": "Near-Surface Air Temperature", "units": "K"},
+            ),
+        },
+        coords={
+            "time": pd.date_range("2025-01-01", periods=3, freq="MS"),
+            # Descending, as in many climate files
+            "lat": [1.5, 0.5, -0.5, -1.5],
+            "lon": np.arange(30.0, 36.0),
+        },
+        attrs={"title": "Ensemble mean", "institution": "TMA"},
+    ).to_netcdf(path)
+    return path
+
+
+def test_coordinate_range_from_attribute():
+    lat = xr.DataArray(
+        [3.0, 1.0, 5.0],
+        dims="lat",
+        name="lat",
+        attrs={"actual_range": [1, 5]},
+    )
+    assert coordinate_range(lat) == [1, 5]
+
+
+def test_coordinate_range_from_endpoints():
+    lat = xr.DataArray([2.0, 1.0, 0.0], dims="lat", name="lat")
+    assert coordinate_range(lat) == [0, 2]
+
+
+@pytest.mark.parametrize(
+    "var",
+    [
+        # Auxiliary 2D coordinate
+        xr.DataArray([[1.0, 3.0], [-2.0, 0.0]], dims=("y", "x"), name="lat"),
+        # Endpoint missing
+        xr.DataArray([np.nan, 4.0, -1.0], dims="lat", name="lat"),
+    ],
+)
+def test_coordinate_range_full_read(var):
+    assert coordinate_range(var) == [var.min(), var.max()]
+
+
+def test_extract_netcdf_metadata(source, monkeypatch):
+    monkeypatch.setattr(utils, "MAX_DIMENSION_VALUES", 4)
+
+    metadata = extract_netcdf_metadata(str(source))
+
+    assert metadata["filename"] == "tas.nc"
+    assert metadata["variables"] == [
+        {
+            "name": "tas",
+            "longName": "Near-Surface Air Temperature",
+            "units": "K",
+            "dimensions": ["time", "lat", "lon"],
+            "shape": [3, 4, 6],
+        },
+    ]
+    assert metadata["dimensions"] == [
+        {
+            "name": "time",
+            "length": 3,
+            "values": [
+                "2025-01-01T00:00:00",
+                "2025-02-01T00:00:00",
+                "2025-03-01T00:00:00",
+            ],
+        },
+        {"name": "lat", "length": 4, "values": [1.5, 0.5, -0.5, -1.5]},
+        # Too long to list
+        {"name": "lon", "length": 6, "values": None},
+    ]
+    assert metadata["lat_range"] == [-1.5, 1.5]
+    assert metadata["lon_range"] == [30, 35]
+    assert metadata["metadata"]["title"] == "Ensemble mean"
+    assert metadata["metadata"]["history"] == ""
@@ -0,0 +1,198 @@
+import hashlib
+import io
+import os
+
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from netcdf_backend.apps.netcdf import tasks
+from netcdf_backend.apps.netcdf.management.commands import warm_file_cache
+from netcdf_backend.apps.netcdf.models import FileCache, Region
+from netcdf_backend.apps.netcdf.services import precompute
+from netcdf_backend.apps.netcdf.services.jobs import (
+    claim_pending_job,
+    release_pending_job,
+)
+from netcdf_backend.apps.netcdf.services.precompute import (
+    FILE_TYPES,
+    Combination,
+    is_outdated,
+    is_stale,
+    iter_combinations,
+    plan_precompute,
+    source_fingerprint,
+    source_hash,
+)
+
+COMBINATION = Combination("ssp245", "pr", "ANN", "2025-2054")
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    path = tmp_path / "pr_day_Ensmean_ssp245_r1i1p1f1_gr_merged.nc"
+    path.write_bytes(b"original")
+    monkeypatch.setattr(precompute, "source_file_for", lambda *_: str(path))
+    return path
+
+
+def replace(path, content: bytes):
+    """Rewrite ``path`` with a visibly different mtime."""
+    stat = path.stat()
+    path.write_bytes(content)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def create_entries(fingerprint: str) -> dict:
+    return {
+        file_type: FileCache.objects.create(
+            file_type=file_type,
+            file=default_storage.save(f"caches/{file_type}", ContentFile(b"data")),
+            source_fingerprint=fingerprint,
+            **COMBINATION.as_kwargs(),
+        )
+        for file_type in FILE_TYPES
+    }
+
+
+def test_source_hash(source):
+    expected = hashlib.sha256(b"original").hexdigest()
+    assert source_hash(str(source), compute=False) is None
+    assert source_hash(str(source)) == expected
+    # Memoized until the file changes
+    assert source_hash(str(source), compute=False) == expected
+
+    replace(source, b"replaced")
+    assert source_hash(str(source), compute=False) is None
+    assert source_hash(str(source)) == hashlib.sha256(b"replaced").hexdigest()
+
+
+@pytest.mark.django_db
+def test_source_fingerprint(source, settings):
+    fingerprint = source_fingerprint(COMBINATION)
+    assert fingerprint == source_fingerprint(COMBINATION, compute=False)
+
+    version = settings.NETCDF_PIPELINE_VERSION
+    settings.NETCDF_PIPELINE_VERSION = "next"
+    assert source_fingerprint(COMBINATION) != fingerprint
+    settings.NETCDF_PIPELINE_VERSION = version
+
+    replace(source, b"replaced")
+    assert source_fingerprint(COMBINATION, compute=False) is None
+    assert source_fingerprint(COMBINATION) not in {None, fingerprint}
+
+
+@pytest.mark.django_db
+def test_is_outdated(source):
+    fingerprint = source_fingerprint(COMBINATION)
+    assert not is_outdated(COMBINATION, fingerprint)
+    assert is_outdated(COMBINATION, "other")
+
+    # Replaced but not hashed again yet
+    replace(source, b"replaced")
+    assert is_outdated(COMBINATION, fingerprint)
+
+    source.unlink()
+    assert not is_outdated(COMBINATION, fingerprint)
+
+
+@pytest.mark.django_db
+def test_is_stale(source):
+    assert is_stale(COMBINATION, {})
+
+    entries = create_entries(source_fingerprint(COMBINATION))
+    assert not is_stale(COMBINATION, entries)
+
+    default_storage.delete(entries["geojson"].file.name)
+    assert is_stale(COMBINATION, entries)
+
+
+@pytest.mark.django_db
+def test_is_stale_after_source_change(source):
+    entries = create_entries(source_fingerprint(COMBINATION))
+
+    replace(source, b"replaced")
+    assert is_stale(COMBINATION, entries)
+
+
+@pytest.fixture
+def tanzania(db):
+    return Region.objects.create(
+        slug="tanzania",
+        name="Tanzania",
+        geom=MultiPolygon(Polygon.from_bbox((29, -12, 41, -1)), srid=4326),
+    )
+
+
+def test_iter_combinations(tanzania, settings):
+    settings.NETCDF_PRECOMPUTE_PERIODS = ["2025-2054", "2055-2084"]
+
+    combinations = list(iter_combinations())
+
+    # Both SSPs x pr/tasmax/tasmin (tas is read as tasmax) x 5 seasons x 2 periods
+    assert len(combinations) == 2 * 3 * 5 * 2
+    assert len(set(combinations)) == len(combinations)
+    assert {c.variable for c in combinations} == {"pr", "tasmax", "tasmin"}
+    assert {c.region for c in combinations} == {"tanzania"}
+
+
+def test_plan_precompute(tanzania, source, settings, monkeypatch):
+    settings.NETCDF_PRECOMPUTE_PERIODS = ["2025-2054"]
+    # Only ssp245 precipitation has a source file
+    monkeypatch.setattr(
+        precompute,
+        "source_file_for",
+        lambda scenario, variable: (
+            str(source) if (scenario, variable) == ("ssp245", "pr") else "missing.nc"
+        ),
+    )
+    create_entries(source_fingerprint(COMBINATION))
+
+    planned = plan_precompute()
+
+    assert COMBINATION not in planned
+    assert {c.season for c in planned} == {"DJF", "MAM", "JJA", "SON"}
+    assert {(c.scenario, c.variable) for c in planned} == {("ssp245", "pr")}
+
+
+def test_warm_file_cache(monkeypatch):
+    planned = [
+        Combination("ssp245", "pr", season, "2025-2054")
+        for season in ("DJF", "MAM", "JJA", "SON", "ANN")
+    ]
+    monkeypatch.setattr(tasks, "plan_precompute", lambda: planned)
+    enqueued = []
+
+    def enqueue_processing(combination, priority):
+        enqueued.append((combination, priority))
+        return claim_pending_job(combination, str(combination))
+
+    monkeypatch.setattr(tasks, "enqueue_processing", enqueue_processing)
+    claim_pending_job(planned[1], "already running")
+
+    report = tasks.warm_file_cache(limit=3)
+
+    assert report == {"missing": 5, "in_flight": 3, "dispatched": 2}
+    assert enqueued == [
+        (planned[0], tasks.BATCH_PRIORITY),
+        (planned[2], tasks.BATCH_PRIORITY),
+    ]
+    # Topped up as jobs finish
+    done = planned.pop(0)
+    release_pending_job(done, str(done))
+    assert tasks.warm_file_cache(limit=3)["dispatched"] == 1
+    assert enqueued[-1] == (planned[2], tasks.BATCH_PRIORITY)
+
+
+def test_warm_file_cache_command_dry_run(monkeypatch):
+    monkeypatch.setattr(warm_file_cache, "plan_precompute", lambda: [COMBINATION])
+    out = io.StringIO()
+
+    call_command("warm_file_cache", "--dry-run", stdout=out)
+
+    assert out.getvalue().splitlines() == [
+        "1 combination(s) missing or stale",
+        f"  {COMBINATION}",
+    ]
@@ -0,0 +1,56 @@
+import pytest
+from django.conf import settings
+
+from config.celery_app import app
+from netcdf_backend.apps.netcdf import tasks
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+
+
+def test_routes_name_tasks():
+    for name in settings.CELERY_TASK_ROUTES:
+        assert name in app.tasks
+
+
+@pytest.mark.parametrize(
+    ("task", "queue"),
+    [
+        (tasks.preprocess_netcdf, "preprocess"),
+        (tasks.create_timeseries_copy, "preprocess"),
+        (tasks.export_geotiff, "export"),
+        (tasks.export_geojson, "export"),
+        (tasks.render_animation_frames, "render"),
+        (tasks.warm_file_cache, "maintenance"),
+        (tasks.evict_file_cache, "maintenance"),
+        # Quick bookkeeping stays with the interactive work
+        (tasks.finalize_netcdf_cache, "default"),
+        (tasks.fail_processing_job, "default"),
+    ],
+)
+def test_task_queues(task, queue):
+    assert app.amqp.router.route({}, task.name)["queue"].name == queue
+
+
+def test_priorities_are_broker_steps():
+    steps = settings.CELERY_BROKER_TRANSPORT_OPTIONS["priority_steps"]
+    assert tasks.USER_PRIORITY in steps
+    assert tasks.BATCH_PRIORITY in steps
+    assert tasks.USER_PRIORITY < tasks.BATCH_PRIORITY
+
+
+def test_visibility_timeout_exceeds_time_limits():
+    timeout = settings.CELERY_BROKER_TRANSPORT_OPTIONS["visibility_timeout"]
+    assert timeout > tasks.PREPROCESS_TIME_LIMIT
+    assert timeout > tasks.ANIMATION_TIME_LIMIT
+
+
+@pytest.mark.parametrize("priority", [tasks.USER_PRIORITY, tasks.BATCH_PRIORITY])
+def test_processing_pipeline_priority(priority):
+    combination = Combination("ssp245", "pr", "ANN", "2025-2054")
+
+    pipeline = tasks.processing_pipeline(combination, "job", priority)
+
+    preprocess, exports = pipeline.tasks
+    for signature in (preprocess, *exports.tasks, exports.body):
+        assert signature.options["priority"] == priority
+    # The job is done when its last task is
+    assert exports.body.options["task_id"] == "job"
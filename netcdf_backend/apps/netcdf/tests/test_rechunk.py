@@ -0,0 +1,75 @@
+import netCDF4
+import numpy as np
+import pytest
+
+from netcdf_backend.apps.netcdf.services.rechunk import (
+    _slab_rows,
+    timeseries_chunks,
+    write_timeseries_copy,
+)
+
+
+@pytest.fixture
+def source(tmp_path):
+    """A file chunked per time step, as uploads usually are."""
+    path = tmp_path / "source.nc"
+    rng = np.random.default_rng(0)
+    with netCDF4.Dataset(path, "w") as ds:
+        ds.title = "Ensemble mean"
+        ds.createDimension("time", None)
+        ds.createDimension("lat", 20)
+        ds.createDimension("lon", 6)
+        ds.createVariable("time", "f8", ("time",))[:] = np.arange(10)
+        ds.createVariable("lat", "f4", ("lat",))[:] = np.arange(20)
+        ds.createVariable("lon", "f4", ("lon",))[:] = np.arange(6)
+        pr = ds.createVariable(
+            "pr",
+            "i2",
+            ("time", "lat", "lon"),
+            chunksizes=(1, 20, 6),
+            fill_value=-999,
+        )
+        pr.scale_factor = 0.1
+        pr.units = "mm/day"
+        pr.set_auto_maskandscale(False)
+        pr[:] = rng.integers(0, 1000, size=(10, 20, 6), dtype=np.int16)
+        pr[3, 4, 5] = -999
+        ds.createVariable("crs", "i4").assignValue(4326)
+    return path
+
+
+def test_timeseries_chunks(source):
+    with netCDF4.Dataset(source) as ds:
+        assert timeseries_chunks(ds["pr"], spatial_chunk=8) == (10, 8, 6)
+        assert timeseries_chunks(ds["time"], spatial_chunk=8) == (10,)
+        assert timeseries_chunks(ds["lat"], spatial_chunk=8) is None
+
+
+def test_slab_rows(source):
+    with netCDF4.Dataset(source) as ds:
+        # A row of pr is 10 x 6 int16 values, 120 bytes
+        assert _slab_rows(ds["pr"], 1, spatial_chunk=4, memory=1000) == 8
+        # Never less than one output chunk
+        assert _slab_rows(ds["pr"], 1, spatial_chunk=4, memory=100) == 4
+
+
+@pytest.mark.parametrize("memory", [100, 1000, 1_000_000])
+def test_write_timeseries_copy(source, tmp_path, memory):
+    output = tmp_path / "copy.nc"
+    write_timeseries_copy(str(source), str(output), spatial_chunk=4, memory=memory)
+
+    with netCDF4.Dataset(source) as src, netCDF4.Dataset(output) as dst:
+        assert dst.title == src.title
+        assert dst.dimensions["time"].isunlimited()
+        assert dst["pr"].chunking() == [10, 4, 4]
+        assert dst["pr"].scale_factor == pytest.approx(0.1)
+        assert dst["pr"].units == "mm/day"
+        assert dst["pr"]._FillValue == -999
+        assert dst["crs"].getValue() == 4326
+        for name in ("time", "lat", "lon", "pr"):
+            src[name].set_auto_maskandscale(False)
+            dst[name].set_auto_maskandscale(False)
+            np.testing.assert_array_equal(dst[name][:], src[name][:])
+        # Masking and scaling still apply when reading normally
+        dst["pr"].set_auto_maskandscale(True)
+        assert dst["pr"][3, 4, 5] is np.ma.masked
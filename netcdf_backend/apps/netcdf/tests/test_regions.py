@@ -0,0 +1,67 @@
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Polygon
+
+from netcdf_backend.apps.netcdf.models import Region
+from netcdf_backend.apps.netcdf.serializers import FilterParameterSerializer
+from netcdf_backend.apps.netcdf.services.regions import (
+    region_fingerprint,
+    region_slugs,
+)
+
+FILTERS = {
+    "scenario": "ssp245",
+    "variable": "pr",
+    "season": "ANN",
+    "period": "2025-2054",
+}
+
+
+def border(*bbox) -> MultiPolygon:
+    return MultiPolygon(Polygon.from_bbox(bbox), srid=4326)
+
+
+@pytest.fixture
+def region(db):
+    return Region.objects.create(
+        slug="tanzania",
+        name="Tanzania",
+        geom=border(29, -12, 41, -1),
+    )
+
+
+def test_validate_region_from_cache(region, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert FilterParameterSerializer(data=FILTERS).is_valid()
+    with django_assert_num_queries(0):
+        assert FilterParameterSerializer(data=FILTERS).is_valid()
+        serializer = FilterParameterSerializer(data={**FILTERS, "region": "kenya"})
+        assert not serializer.is_valid()
+    assert serializer.errors["region"] == ["Unknown region: kenya"]
+
+
+def test_region_slugs_invalidated(region, django_capture_on_commit_callbacks):
+    assert region_slugs() == {"tanzania"}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        kenya = Region.objects.create(
+            slug="kenya",
+            name="Kenya",
+            geom=border(34, -5, 42, 5),
+        )
+    assert region_slugs() == {"tanzania", "kenya"}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        kenya.delete()
+    assert region_slugs() == {"tanzania"}
+
+
+def test_region_fingerprint_invalidated(region, django_capture_on_commit_callbacks):
+    fingerprint = region_fingerprint("tanzania")
+    assert region_fingerprint("tanzania") == fingerprint
+    assert region_fingerprint("kenya") == "missing"
+
+    region.geom = border(29, -12, 40, -1)
+    region.min_lon = None
+    with django_capture_on_commit_callbacks(execute=True):
+        region.save()
+    assert region_fingerprint("tanzania") != fingerprint
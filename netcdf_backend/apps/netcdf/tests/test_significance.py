@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from netcdf_backend.apps.netcdf.services.significance import (
+    benjamini_hochberg,
+    mann_kendall,
+    welch_ttest,
+)
+
+
+@pytest.fixture
+def samples():
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(30, 6, 7))
+    b = rng.normal(loc=0.3, scale=1.5, size=(25, 6, 7))
+    a[rng.random(a.shape) < 0.1] = np.nan
+    b[rng.random(b.shape) < 0.1] = np.nan
+    return a, b
+
+
+def test_welch_ttest_matches_scipy(samples):
+    a, b = samples
+    t, p = welch_ttest(a, b)
+    expected_t, expected_p = stats.ttest_ind(
+        a,
+        b,
+        axis=0,
+        equal_var=False,
+        nan_policy="omit",
+    )
+    np.testing.assert_allclose(t, expected_t, rtol=1e-10)
+    np.testing.assert_allclose(p, expected_p, rtol=1e-10)
+
+
+def test_welch_ttest_other_axis(samples):
+    a, b = samples
+    _, p = welch_ttest(np.moveaxis(a, 0, -1), np.moveaxis(b, 0, -1), axis=-1)
+    np.testing.assert_allclose(p, welch_ttest(a, b)[1])
+
+
+def test_welch_ttest_too_few_values():
+    a = np.array([[1.0, 2.0], [np.nan, 3.0], [np.nan, 4.0]])
+    b = np.array([[1.5, 0.5], [2.5, 1.0], [3.5, np.nan]])
+    t, p = welch_ttest(a, b)
+    # One value left in the first cell
+    assert np.isnan(t[0])
+    assert np.isnan(p[0])
+    assert np.isfinite(p[1])
+
+
+def test_welch_ttest_all_nan_cell():
+    a = np.full((5, 1), np.nan)
+    b = np.arange(5.0).reshape(5, 1)
+    _, p = welch_ttest(a, b)
+    assert np.isnan(p).all()
+
+
+def _mann_kendall_s(series):
+    values = series[~np.isnan(series)]
+    return sum(
+        np.sign(values[j] - values[i])
+        for i in range(len(values))
+        for j in range(i + 1, len(values))
+    )
+
+
+def test_mann_kendall_statistic():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=(20, 4)) + np.linspace(0, 2, 20)[:, None]
+    x[3, 1] = np.nan
+    x[10:12, 2] = np.nan
+    s, z, p = mann_kendall(x)
+
+    for cell in range(x.shape[1]):
+        series = x[:, cell]
+        assert s[cell] == _mann_kendall_s(series)
+        # Without ties S is Kendall's tau against time, rescaled
+        values = series[~np.isnan(series)]
+        n = values.size
+        tau = stats.kendalltau(np.arange(n), values).statistic
+        assert s[cell] == pytest.approx(tau * n * (n - 1) / 2)
+    np.testing.assert_allclose(p, 2 * stats.norm.sf(np.abs(z)))
+
+
+def test_mann_kendall_trend_is_significant():
+    x = np.arange(30.0)[:, None] + np.zeros((1, 2))
+    x[:, 1] = x[::-1, 1]
+    s, z, p = mann_kendall(x)
+    assert s[0] > 0
+    assert s[1] < 0
+    assert z[0] == -z[1]
+    assert (p < 0.001).all()
+
+
+def test_mann_kendall_too_few_values():
+    x = np.array([[1.0, 1.0], [2.0, np.nan], [3.0, np.nan], [4.0, 2.0]])
+    s, z, p = mann_kendall(x)
+    assert np.isfinite(p[0])
+    assert np.isnan(s[1])
+    assert np.isnan(z[1])
+    assert np.isnan(p[1])
+
+
+def test_benjamini_hochberg_matches_scipy():
+    p = np.random.default_rng(2).random((8, 9)) ** 3
+    np.testing.assert_allclose(
+        benjamini_hochberg(p),
+        stats.false_discovery_control(p.ravel()).reshape(p.shape),
+    )
+
+
+def test_benjamini_hochberg_ignores_nan():
+    p = np.array([0.01, np.nan, 0.04, 0.03, np.nan, 0.5])
+    q = benjamini_hochberg(p)
+    tested = ~np.isnan(p)
+    assert np.isnan(q[~tested]).all()
+    np.testing.assert_allclose(q[tested], stats.false_discovery_control(p[tested]))
+
+
+def test_benjamini_hochberg_nothing_tested():
+    assert np.isnan(benjamini_hochberg(np.full(3, np.nan))).all()
+    assert benjamini_hochberg(np.array([])).shape == (0,)
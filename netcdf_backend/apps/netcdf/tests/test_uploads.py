@@ -0,0 +1,95 @@
+import hashlib
+import io
+from http import HTTPStatus
+from pathlib import Path
+
+import pytest
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from netcdf_backend.apps.netcdf.models import NetCDFFile, UploadSession
+from netcdf_backend.apps.netcdf.services.uploads import (
+    SHA256UploadHandler,
+    UploadBusyError,
+    UploadLimitExceededError,
+    hold_upload,
+    write_chunk,
+)
+
+
+def test_write_chunk_appends_at_offset(tmp_path):
+    path = tmp_path / "uploads" / "file.nc"
+    assert write_chunk(path, 0, io.BytesIO(b"abc"), max_bytes=6) == 3
+    assert write_chunk(path, 3, io.BytesIO(b"def"), max_bytes=3) == 3
+    assert path.read_bytes() == b"abcdef"
+
+
+def test_write_chunk_discards_bytes_past_offset(tmp_path):
+    path = tmp_path / "file.nc"
+    path.write_bytes(b"abcdef")
+    # The tail of an interrupted chunk is written again
+    write_chunk(path, 2, io.BytesIO(b"CD"), max_bytes=4)
+    assert path.read_bytes() == b"abCD"
+
+
+def test_write_chunk_over_limit(tmp_path):
+    path = tmp_path / "file.nc"
+    write_chunk(path, 0, io.BytesIO(b"abc"), max_bytes=5)
+    with pytest.raises(UploadLimitExceededError):
+        write_chunk(path, 3, io.BytesIO(b"defg"), max_bytes=2)
+    assert path.read_bytes() == b"abc"
+
+
+def test_hold_upload_is_exclusive(tmp_path):
+    path = tmp_path / "uploads" / "file.nc"
+    with hold_upload(path):
+        with pytest.raises(UploadBusyError), hold_upload(path):
+            pass
+        write_chunk(path, 0, io.BytesIO(b"abc"), max_bytes=3)
+    with hold_upload(path):
+        assert path.read_bytes() == b"abc"
+
+
+def test_sha256_upload_handler_hashes_by_field():
+    handler = SHA256UploadHandler()
+    handler.new_file("file", "data.nc", "application/x-netcdf", 6)
+    assert handler.receive_data_chunk(b"abc", 0) == b"abc"
+    assert handler.receive_data_chunk(b"def", 3) == b"def"
+    handler.file_complete(6)
+    assert handler.hashes == {"file": hashlib.sha256(b"abcdef").hexdigest()}
+
+
+@pytest.mark.django_db
+def test_finalize_sessions_of_the_same_contents():
+    contents = b"netcdf contents"
+    existing = NetCDFFile.objects.create(
+        file="netcdf-files/existing.nc",
+        content_hash=hashlib.sha256(contents).hexdigest(),
+        metadata={"variables": []},
+    )
+    client = APIClient()
+    for filename in ("first.nc", "second.nc"):
+        session = UploadSession.objects.create(
+            filename=filename,
+            size=len(contents),
+            offset=len(contents),
+            storage_name=f"netcdf-files/{filename}",
+        )
+        path = Path(default_storage.path(session.storage_name))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(contents)
+
+        response = client.post(
+            reverse(
+                "netcdf:netcdf-upload-session-finalize",
+                kwargs={"uuid": session.uuid},
+            ),
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        session.refresh_from_db()
+        assert session.status == UploadSession.STATUS_COMPLETED
+        assert session.netcdf_file == existing
+        assert not path.exists()
+    assert existing.upload_sessions.count() == 2
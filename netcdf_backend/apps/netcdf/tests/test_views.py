@@ -0,0 +1,157 @@
+from http import HTTPStatus
+from unittest import mock
+
+import pytest
+from celery import states
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.utils.http import http_date
+
+from netcdf_backend.apps.netcdf import tasks, views
+from netcdf_backend.apps.netcdf.models import FileCache, Region
+from netcdf_backend.apps.netcdf.services.jobs import release_pending_job
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+from netcdf_backend.apps.netcdf.views import GeoJSONView, GeoTIFFView
+
+CREATED_AT = 1_767_225_600  # 2026-01-01T00:00:00Z
+CACHED = {
+    "file": "/media/caches/change.tiff",
+    "name": "caches/change.tiff",
+    "file_hash": "abc123",
+    "source_fingerprint": "fingerprint",
+    "created_at": "2026-01-01T00:00:00Z",
+}
+
+FILTERS = {
+    "scenario": "ssp245",
+    "variable": "pr",
+    "season": "ANN",
+    "period": "2025-2054",
+}
+
+
+@pytest.fixture
+def view():
+    return GeoTIFFView()
+
+
+@pytest.fixture
+def tanzania(db):
+    return Region.objects.create(
+        slug="tanzania",
+        name="Tanzania",
+        geom=MultiPolygon(Polygon.from_bbox((29, -12, 41, -1)), srid=4326),
+    )
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    pipeline = mock.Mock()
+    monkeypatch.setattr(tasks, "processing_pipeline", pipeline)
+    return pipeline
+
+
+@pytest.fixture
+def job_state(monkeypatch):
+    """State of every job, as job_status reports it to the views."""
+    state = {"state": states.PENDING}
+    monkeypatch.setattr(views, "job_status", lambda job_id: {**state, "eta": None})
+    return state
+
+
+def lookup(rf, view_class=GeoTIFFView, **params):
+    return view_class.as_view()(rf.get("/", {**FILTERS, **params}))
+
+
+def test_lookup_sends_validators(rf, view, settings):
+    response = view.cached_response(rf.get("/"), CACHED)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response["ETag"] == '"abc123"'
+    assert response["Last-Modified"] == http_date(CREATED_AT)
+    assert response["Cache-Control"] == (
+        f"public, max-age={settings.NETCDF_LOOKUP_MAX_AGE}, must-revalidate"
+    )
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"HTTP_IF_NONE_MATCH": '"abc123"'},
+        {"HTTP_IF_NONE_MATCH": '"other", W/"abc123"'},
+        {"HTTP_IF_MODIFIED_SINCE": http_date(CREATED_AT)},
+    ],
+)
+def test_lookup_not_modified(rf, view, headers):
+    response = view.cached_response(rf.get("/", **headers), CACHED)
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response["ETag"] == '"abc123"'
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"HTTP_IF_NONE_MATCH": '"other"'},
+        {"HTTP_IF_MODIFIED_SINCE": http_date(CREATED_AT - 1)},
+    ],
+)
+def test_lookup_modified(rf, view, headers):
+    response = view.cached_response(rf.get("/", **headers), CACHED)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.data["result"] == CACHED
+
+
+def test_concurrent_misses_share_a_job(rf, tanzania, pipeline, job_state):
+    first = lookup(rf)
+    second = lookup(rf, GeoJSONView)
+
+    assert first.status_code == second.status_code == HTTPStatus.ACCEPTED
+    assert first["Cache-Control"] == "no-store"
+    job_id = first.data["result"]["job_id"]
+    assert second.data["result"]["job_id"] == job_id
+    pipeline.assert_called_once()
+
+
+def test_polls_dont_refresh_pending_marker(  # noqa: PLR0913
+    rf,
+    tanzania,
+    pipeline,
+    job_state,
+    redis,
+    monkeypatch,
+):
+    set_pending = mock.Mock(wraps=views.set_pending)
+    monkeypatch.setattr(views, "set_pending", set_pending)
+    monkeypatch.setattr(views, "is_outdated", lambda combination, fingerprint: False)
+    job_id = lookup(rf).data["result"]["job_id"]
+
+    response = lookup(rf)
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.data["result"]["job_id"] == job_id
+    set_pending.assert_called_once()
+
+    # Once the job is over, the next poll reads its row
+    FileCache.objects.create(
+        file_type="geotiff",
+        file="caches/change.abc123.tiff",
+        file_hash="abc123",
+        **FILTERS,
+    )
+    job_state["state"] = states.SUCCESS
+    response = lookup(rf)
+    assert response.status_code == HTTPStatus.OK
+    assert response.data["result"]["file_hash"] == "abc123"
+    pipeline.assert_called_once()
+
+
+def test_failed_job_is_retried(rf, tanzania, pipeline, job_state):
+    job_id = lookup(rf).data["result"]["job_id"]
+    job_state["state"] = states.FAILURE
+    # As the job's error callback does
+    release_pending_job(Combination(**FILTERS), job_id)
+
+    response = lookup(rf)
+    assert response.status_code == HTTPStatus.ACCEPTED
+    assert response.data["result"]["job_id"] != job_id
+    assert pipeline.call_count == 2
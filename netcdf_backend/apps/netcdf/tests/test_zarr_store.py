@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from netcdf_backend.apps.netcdf.services.zarr_store import (
+    convert_to_zarr,
+    open_dataset,
+    zarr_path_for,
+)
+
+
+def write_source(path, value: float):
+    xr.Dataset(
+        {"pr": (("time", "lat", "lon"), np.full((5, 2, 3), value))},
+        coords={
+            "time": pd.date_range("2025-01-01", periods=5),
+            "lat": [0.0, 1.0],
+            "lon": [0.0, 1.0, 2.0],
+        },
+    ).to_netcdf(path)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "pr.nc"
+    write_source(path, 1.0)
+    return path
+
+
+def test_convert_to_zarr(source):
+    output_path = convert_to_zarr(source, chunks={"time": 2, "lat": 1})
+
+    assert output_path == zarr_path_for(source)
+    with open_dataset(source) as ds:
+        assert ds.encoding["source"] != str(source)
+        assert ds["pr"].encoding["chunks"] == (2, 1, 3)
+        np.testing.assert_array_equal(ds["pr"].values, 1.0)
+
+
+def test_open_dataset_skips_outdated_store(source):
+    convert_to_zarr(source, chunks={"time": 2})
+    stat = source.stat()
+    write_source(source, 2.0)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    with open_dataset(source) as ds:
+        assert ds.encoding["source"] == str(source)
+        np.testing.assert_array_equal(ds["pr"].values, 2.0)
+
+    convert_to_zarr(source, chunks={"time": 2})
+    with open_dataset(source) as ds:
+        assert ds.encoding["source"] != str(source)
+        np.testing.assert_array_equal(ds["pr"].values, 2.0)
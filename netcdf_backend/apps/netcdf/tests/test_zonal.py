@@ -0,0 +1,156 @@
+import csv
+import io
+
+import numpy as np
+import pytest
+import shapely
+import xarray as xr
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+
+from netcdf_backend.apps.netcdf.models import ClimateData, Region
+from netcdf_backend.apps.netcdf.services import precompute
+from netcdf_backend.apps.netcdf.services.precompute import Combination
+from netcdf_backend.apps.netcdf.services.zonal import (
+    _edges,
+    cell_weights,
+    climate_grid,
+    write_csv,
+    zonal_statistics,
+)
+
+LATS = np.array([0.0, 1.0])
+LONS = np.array([0.0, 1.0])
+COS_1 = np.cos(np.deg2rad(1))
+ZONES = [
+    ("A", "West column"),
+    ("B", "Half of the first cell and the second"),
+    ("C", "Only the cell without data"),
+    ("D", "Off the grid"),
+]
+
+
+@pytest.fixture
+def weights():
+    return cell_weights(
+        [
+            shapely.box(-0.5, -0.5, 0.5, 1.5),
+            shapely.box(0, -0.5, 1.5, 0.5),
+            shapely.box(0.5, 0.5, 1.5, 1.5),
+            shapely.box(10, 10, 11, 11),
+        ],
+        LATS,
+        LONS,
+    )
+
+
+@pytest.fixture
+def values():
+    return np.array([[1.0, 2.0], [3.0, np.nan]])
+
+
+def test_edges():
+    np.testing.assert_allclose(_edges(np.array([0, 1, 3])), [-0.5, 0.5, 2, 4])
+    np.testing.assert_allclose(_edges(np.array([2])), [1.5, 2.5])
+
+
+def test_cell_weights(weights):
+    np.testing.assert_allclose(
+        weights.toarray(),
+        [
+            [1, 0, COS_1, 0],
+            [0.5, 1, 0, 0],
+            [0, 0, 0, COS_1],
+            [0, 0, 0, 0],
+        ],
+    )
+
+
+def test_zonal_statistics(values, weights):
+    west, east, nodata, outside = zonal_statistics(values, ZONES, weights, [0, 50])
+
+    assert west["cells"] == 2
+    assert west["coverage"] == 1
+    assert west["mean"] == pytest.approx((1 + 3 * COS_1) / (1 + COS_1))
+    assert (west["min"], west["max"]) == (1, 3)
+    assert west["p0"] == 1
+    assert west["p50"] == pytest.approx(2, abs=1e-3)
+
+    # Weighted by the half of the first cell the zone covers
+    assert east["mean"] == pytest.approx(5 / 3)
+    assert east["p50"] == pytest.approx(5 / 3)
+
+    for row in (nodata, outside):
+        assert row["cells"] == 0
+        assert row["coverage"] == 0
+        assert row["mean"] is row["p50"] is None
+
+
+def test_zonal_statistics_partial_coverage(weights):
+    values = np.array([[1.0, np.nan], [np.nan, np.nan]])
+    _, east, *_ = zonal_statistics(values, ZONES, weights, [50])
+
+    assert east["cells"] == 1
+    assert east["coverage"] == pytest.approx(1 / 3)
+    assert east["mean"] == east["p50"] == 1
+
+
+def test_write_csv(values, weights):
+    rows = zonal_statistics(values, ZONES, weights, [10, 90])
+    f = io.StringIO()
+    write_csv(f, [{"period": "2025-2054", **row} for row in rows], [10, 90], ["period"])
+
+    f.seek(0)
+    reader = csv.DictReader(f)
+    assert reader.fieldnames == [
+        "period",
+        "code",
+        "name",
+        "cells",
+        "coverage",
+        "mean",
+        "min",
+        "max",
+        "p10",
+        "p90",
+    ]
+    written = list(reader)
+    assert [row["code"] for row in written] == ["A", "B", "C", "D"]
+    assert float(written[0]["mean"]) == pytest.approx(rows[0]["mean"])
+    assert written[2]["mean"] == ""
+
+
+@pytest.mark.django_db
+def test_climate_grid_keeps_empty_rows_and_columns(tmp_path, monkeypatch):
+    source = tmp_path / "pr.nc"
+    xr.Dataset(
+        coords={"lat": np.arange(-3.0, 4.0), "lon": np.arange(30.0, 36.0)},
+    ).to_netcdf(source)
+    monkeypatch.setattr(precompute, "source_file_for", lambda *_: str(source))
+    Region.objects.create(
+        slug="tanzania",
+        name="Tanzania",
+        geom=MultiPolygon(Polygon.from_bbox((30.5, -2, 34, 2)), srid=4326),
+    )
+    combination = Combination("ssp245", "pr", "ANN", "2025-2054")
+    # No point kept at latitude 0 or longitude 32, e.g. cells over a lake
+    points = [(lat, lon) for lat in (-2, -1, 1, 2) for lon in (31, 33, 34)]
+    ClimateData.objects.bulk_create(
+        ClimateData(
+            latitude=lat,
+            longitude=lon,
+            value=lat * 10 + lon,
+            p_value=0.5,
+            geom=Point(lon, lat, srid=4326),
+            **combination.as_kwargs(),
+        )
+        for lat, lon in points
+    )
+
+    lats, lons, values = climate_grid(combination)
+
+    np.testing.assert_array_equal(lats, [-2, -1, 0, 1, 2])
+    np.testing.assert_array_equal(lons, [31, 32, 33, 34])
+    assert np.isnan(values[2]).all()
+    assert np.isnan(values[:, 1]).all()
+    assert values[0, 0] == -20 + 31
+    assert values[4, 3] == 20 + 34
@@ -1,19 +1,65 @@
 from django.urls import path
 
 from netcdf_backend.apps.netcdf.views import (
+    GeoJSONDownloadView,
     GeoJSONView,
+    GeoTIFFDownloadView,
     GeoTIFFView,
+    JobStatusView,
+    NCDataAnimation,
+    NCDataChange,
     NCDataPlot,
     NetCDFMetadata,
     NetCDFUploadView,
+    UploadSessionCreateView,
+    UploadSessionFinalizeView,
+    UploadSessionView,
+    ZonalStatisticsView,
 )
 
 app_name = "netcdf"
 
 urlpatterns = [
     path("uploads/", NetCDFUploadView.as_view(), name="netcdf-upload"),
+    path(
+        "uploads/sessions/",
+        UploadSessionCreateView.as_view(),
+        name="netcdf-upload-session-create",
+    ),
+    path(
+        "uploads/sessions/<uuid:uuid>/",
+        UploadSessionView.as_view(),
+        name="netcdf-upload-session",
+    ),
+    path(
+        "uploads/sessions/<uuid:uuid>/finalize/",
+        UploadSessionFinalizeView.as_view(),
+        name="netcdf-upload-session-finalize",
+    ),
     path("metadata/<uuid:uuid>/", NetCDFMetadata.as_view(), name="netcdf-metadata"),
     path("plots/<uuid:uuid>/", NCDataPlot.as_view(), name="netcdf-plot"),
+    path("changes/<uuid:uuid>/", NCDataChange.as_view(), name="netcdf-change"),
+    path(
+        "animations/<uuid:uuid>/",
+        NCDataAnimation.as_view(),
+        name="netcdf-animation",
+    ),
     path("geotiff/", GeoTIFFView.as_view(), name="geotiff"),
     path("geojson/", GeoJSONView.as_view(), name="geojson"),
+    path(
+        "geotiff/download/",
+        GeoTIFFDownloadView.as_view(),
+        name="geotiff-download",
+    ),
+    path(
+        "geojson/download/",
+        GeoJSONDownloadView.as_view(),
+        name="geojson-download",
+    ),
+    path(
+        "zonal-statistics/",
+        ZonalStatisticsView.as_view(),
+        name="zonal-statistics",
+    ),
+    path("jobs/<str:job_id>/", JobStatusView.as_view(), name="job-status"),
 ]
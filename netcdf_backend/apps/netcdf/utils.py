@@ -1,18 +1,38 @@
-import base64
-import io
+import hashlib
 import json
+import logging
 import os
+import time
 
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import xarray as xr
 from cftime import DatetimeNoLeap
-
-from netcdf_backend.apps.netcdf.serializers import NetCDFFile, PlotRequestSerializer
+from django.conf import settings
+from django.core.cache import cache
+
+from netcdf_backend.apps.netcdf.serializers import (
+    ChangeRequestSerializer,
+    NetCDFFile,
+    PlotRequestSerializer,
+)
+from netcdf_backend.apps.netcdf.services.anomaly import (
+    change,
+    change_summary,
+    window_mean,
+)
+from netcdf_backend.apps.netcdf.services.climatology import climatology_name
+from netcdf_backend.apps.netcdf.services.renderers import (
+    OutputFormat,
+    data_uri,
+    render_spatial_plot,
+    render_temperature_map,
+    render_timeseries,
+)
+from netcdf_backend.apps.netcdf.services.zarr_store import open_dataset
+
+logger = logging.getLogger(__name__)
 
 
 def find_coord_var_for_dim(ds, dim):
@@ -29,92 +49,109 @@ def convert_cftime(obj):
     raise TypeError(msg)
 
 
-def extract_netcdf_metadata(file: str):  # noqa: C901
-    ds = xr.open_dataset(file)
+MAX_DIMENSION_VALUES = 1000
 
-    # Extract variables
-    variables = []
-    for var_name in ds.data_vars:
-        var = ds[var_name]
-        variables.append(
-            {
-                "name": var_name,
-                "longName": var.attrs.get("long_name", ""),
-                "units": var.attrs.get("units", ""),
-                "dimensions": list(var.dims),
-                "shape": list(var.shape),
-            },
-        )
 
-    # Extract dimensions
-    dimensions = []
-
-    for dim in ds.dims:
-        dim_values = ds.coords[dim].values if dim in ds.coords else None  # noqa: PD011
-        var_key = find_coord_var_for_dim(ds, dim)
-
-        if dim_values is None:
-            var_values = ds[var_key].values if var_key else None  # noqa: PD011
-            if (
-                var_values is not None
-                and var_values.size > 0
-                and not np.all(np.isnan(var_values))
-                and var_key in ds.variables
-            ):
-                ds = ds.set_coords(var_key)
-
-        dim_values = ds.coords[var_key].values if var_key in ds.coords else None
-        values = None
-
-        if dim_values is not None and len(dim_values) <= 1000:  # noqa: PLR2004
-            # Handle datetime values: convert to ISO format
-            if np.issubdtype(dim_values.dtype, np.datetime64):
-                # Convert datetime64[ns] → pandas datetime → ISO
-                values = (
-                    pd.to_datetime(dim_values).strftime("%Y-%m-%dT%H:%M:%S").tolist()
-                )
-            else:
-                values = dim_values.tolist()
+def serialize_dimension_values(values: np.ndarray) -> list:
+    if np.issubdtype(values.dtype, np.datetime64):
+        # Convert datetime64[ns] → pandas datetime → ISO
+        return pd.to_datetime(values).strftime("%Y-%m-%dT%H:%M:%S").tolist()
+    return values.tolist()
+
+
+def coordinate_range(var: xr.DataArray) -> list[float]:
+    """
+    Min/max of a coordinate, reading as little data as possible: the stored
+    `actual_range` attribute if present, else the endpoints of a 1D dimension
+    coordinate (CF requires those to be monotonic), else a full read.
+    """
+    actual_range = var.attrs.get("actual_range")
+    if actual_range is not None and np.size(actual_range) == 2:  # noqa: PLR2004
+        return [float(np.min(actual_range)), float(np.max(actual_range))]
+
+    if var.ndim == 1 and var.name in var.dims and var.size > 0:
+        first, last = float(var[0]), float(var[-1])
+        if not (np.isnan(first) or np.isnan(last)):
+            return [min(first, last), max(first, last)]
+
+    values = var.to_numpy()
+    return [float(np.nanmin(values)), float(np.nanmax(values))]
 
-        dimensions.append(
-            {
-                "name": dim,
-                "length": int(ds.dims[dim]),
-                "values": values,
-            },
-        )
 
-    # Identify lat/lon dims
-    lat_dim = "lat" if "lat" in ds.dims else "latitude"
-    lon_dim = "lon" if "lon" in ds.dims else "longitude"
-
-    # Add lat/lon range info
-    lat_range, lon_range = [], []
-
-    if lat_dim not in ds:
-        lat_dim = find_coord_var_for_dim(ds, lat_dim)
-
-    if lon_dim not in ds:
-        lon_dim = find_coord_var_for_dim(ds, lon_dim)
-
-    if lat_dim in ds:
-        lat_values = ds[lat_dim].values  # noqa: PD011
-        lat_range = [float(np.min(lat_values)), float(np.max(lat_values))]
-    if lon_dim in ds:
-        lon_values = ds[lon_dim].values  # noqa: PD011
-        lon_range = [float(np.min(lon_values)), float(np.max(lon_values))]
-
-    # Extract global metadata
-    metadata_keys = [
-        "title",
-        "institution",
-        "source",
-        "history",
-        "references",
-        "comment",
-        "conventions",
-    ]
-    metadata = {key: str(ds.attrs.get(key, "")) for key in metadata_keys}
+def extract_netcdf_metadata(file: str):
+    timings = {}
+    started = time.perf_counter()
+
+    with open_dataset(file) as ds:
+        timings["open"] = time.perf_counter() - started
+
+        # Extract variables
+        step = time.perf_counter()
+        variables = [
+            {
+                "name": var_name,
+                "longName": ds[var_name].attrs.get("long_name", ""),
+                "units": ds[var_name].attrs.get("units", ""),
+                "dimensions": list(ds[var_name].dims),
+                "shape": list(ds[var_name].shape),
+            }
+            for var_name in ds.data_vars
+        ]
+        timings["variables"] = time.perf_counter() - step
+
+        # Extract dimensions, only reading values for short coordinates
+        step = time.perf_counter()
+        dimensions = []
+        for dim in ds.dims:
+            length = int(ds.sizes[dim])
+            var_key = dim if dim in ds.variables else find_coord_var_for_dim(ds, dim)
+            values = None
+
+            if var_key is not None and length <= MAX_DIMENSION_VALUES:
+                dim_values = ds[var_key].to_numpy()
+                all_nan = np.issubdtype(dim_values.dtype, np.floating) and bool(
+                    np.all(np.isnan(dim_values)),
+                )
+                if dim_values.size > 0 and not all_nan:
+                    values = serialize_dimension_values(dim_values)
+
+            dimensions.append({"name": dim, "length": length, "values": values})
+        timings["dimensions"] = time.perf_counter() - step
+
+        # Identify lat/lon dims
+        lat_dim = "lat" if "lat" in ds.dims else "latitude"
+        lon_dim = "lon" if "lon" in ds.dims else "longitude"
+
+        if lat_dim not in ds:
+            lat_dim = find_coord_var_for_dim(ds, lat_dim)
+
+        if lon_dim not in ds:
+            lon_dim = find_coord_var_for_dim(ds, lon_dim)
+
+        # Add lat/lon range info
+        step = time.perf_counter()
+        lat_range = coordinate_range(ds[lat_dim]) if lat_dim in ds else []
+        lon_range = coordinate_range(ds[lon_dim]) if lon_dim in ds else []
+        timings["ranges"] = time.perf_counter() - step
+
+        # Extract global metadata
+        metadata_keys = [
+            "title",
+            "institution",
+            "source",
+            "history",
+            "references",
+            "comment",
+            "conventions",
+        ]
+        metadata = {key: str(ds.attrs.get(key, "")) for key in metadata_keys}
+
+    timings["total"] = time.perf_counter() - started
+    logger.info(
+        "Extracted metadata for %s in %s",
+        file,
+        ", ".join(f"{name}={seconds:.3f}s" for name, seconds in timings.items()),
+    )
 
     return json.loads(
         json.dumps(
@@ -131,68 +168,46 @@ def extract_netcdf_metadata(file: str):  # noqa: C901
     )
 
 
-def plot_temperature_map(da: xr.DataArray, var: str, lat_dim: str, lon_dim: str):
-    # Set up the plot
-    fig, ax = plt.subplots(
-        figsize=(10, 6),
-        subplot_kw={"projection": ccrs.PlateCarree()},
-    )
-    ax.set_title(f"{var.capitalize()} Map")
-
+def plot_temperature_map(
+    da: xr.DataArray,
+    var: str,
+    lat_dim: str,
+    lon_dim: str,
+    mode: str = "auto",
+    output: OutputFormat = OutputFormat(),
+):
     if "time" in da.dims:
         da = da.isel(time=0)
 
     if da.ndim != 2 or da.shape[0] < 2 or da.shape[1] < 2:  # noqa: PLR2004
-        plt.close(fig)
         return None
 
-    # Filled contour
-    contourf = ax.contourf(
-        da[lon_dim],
-        da[lat_dim],
-        da.values,
-        levels=20,
-        cmap="Spectral_r",
-        transform=ccrs.PlateCarree(),
-    )
-
-    # Contour lines
-    contours = ax.contour(
-        da[lon_dim],
-        da[lat_dim],
-        da.values,
-        colors="black",
-        linewidths=0.5,
-        transform=ccrs.PlateCarree(),
+    content = render_temperature_map(
+        da,
+        var,
+        lat_dim,
+        lon_dim,
+        mode=mode,
+        output=output,
     )
-    ax.clabel(contours, inline=True, fontsize=8)
+    return data_uri(content, output.mime_type)
 
-    # Add map features
-    ax.coastlines()
-    ax.add_feature(cfeature.BORDERS)
-    ax.add_feature(cfeature.RIVERS, linestyle=":")
-    ax.add_feature(cfeature.LAND, edgecolor="black")
 
-    # Colorbar
-    cbar = plt.colorbar(contourf, ax=ax, orientation="vertical", shrink=0.7)
-    cbar.set_label("Temperature (°C)")
-
-    # Return image as base64
-    buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
-
-    spatial_base64 = base64.b64encode(buf.read()).decode("utf-8")
-    return f"data:image/png;base64,{spatial_base64}"
-
-
-def get_spatial_plot(da: xr.DataArray, var: str):
+def get_spatial_plot(
+    da: xr.DataArray,
+    var: str,
+    output: OutputFormat = OutputFormat(),
+    annual_mean: xr.DataArray | None = None,
+):
+    """
+    Plot of the mean of the monthly means of ``da``. ``annual_mean`` is the
+    same reduction precomputed by the file's climatology, selected like
+    ``da``; with it the time series isn't read at all.
+    """
+    if annual_mean is not None:
+        da = annual_mean.expand_dims("month")
     # Average over time (or other dimensions) if present
-    fig, ax = plt.subplots(figsize=(8, 5))
-
-    if "time" in da.dims:
+    elif "time" in da.dims:
         da = da.groupby("time.month").mean(dim="time")
 
     # Collapse all other dims except lat/lon
@@ -202,18 +217,7 @@ def get_spatial_plot(da: xr.DataArray, var: str):
 
     data2D = da.mean(dim="month")  # Average over months  # noqa: N806
 
-    data2D.plot(ax=ax)
-    ax.set_title(f"Mean {var} Spatial Plot")
-
-    # Return image as base64
-    buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
-
-    spatial_base64 = base64.b64encode(buf.read()).decode("utf-8")
-    return f"data:image/png;base64,{spatial_base64}"
+    return data_uri(render_spatial_plot(data2D, var, output), output.mime_type)
 
 
 def get_timeseries(  # noqa: PLR0913
@@ -224,9 +228,9 @@ def get_timeseries(  # noqa: PLR0913
     var: str,
     lat_dim: str,
     lon_dim: str,
+    output: OutputFormat = OutputFormat(),
 ):
     # Find nearest lat/lon
-    fig, ax = plt.subplots(figsize=(8, 5))
     da = da.sel({lat_dim: lat, lon_dim: lon}, method="nearest")
 
     if "time" not in da.coords:
@@ -240,25 +244,13 @@ def get_timeseries(  # noqa: PLR0913
             [t.isoformat() for t in da["time"].values],  # noqa: PD011
         )
 
-    ax.plot(times, da.values)
-
     if lat and lon:
-        ax.set_title(f"Time Series of {var} at ({lat}, {lon})")
+        title = f"Time Series of {var} at ({lat}, {lon})"
     else:
-        ax.set_title("Time Series")
-
-    ax.set_xlabel("Time")
-    ax.set_ylabel(var)
-
-    # Return image as base64
-    buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
+        title = "Time Series"
 
-    timeseries_base64 = base64.b64encode(buf.read()).decode("utf-8")
-    return f"data:image/png;base64,{timeseries_base64}"
+    content = render_timeseries(times, da.values, title, var, output)
+    return data_uri(content, output.mime_type)
 
 
 def generate_plotly_geospatial_map(
@@ -343,27 +335,22 @@ def get_coordinates_dim(dims: tuple, coord_type: str):
     return forms.get(coord_type) if forms.get(coord_type) in dims else None
 
 
-def create_plot_from_filter(  # noqa: C901, PLR0912
-    serializer: PlotRequestSerializer,
-) -> tuple[dict, str]:
-    serializer.is_valid(raise_exception=True)
-    data = serializer.validated_data
-
-    try:
-        nc_file = NetCDFFile.objects.get(uuid=data["uuid"])
-        ds = xr.open_dataset(nc_file.file.path)
-    except NetCDFFile.DoesNotExist:
-        return {"error": "File not found."}, "error"
-
-    var = data["variable"]
-    filters = data.get("filters", {})
-    lat = data.get("lat")
-    lon = data.get("lon")
+def select_dataset_path(nc_file: NetCDFFile, *, point_query: bool) -> str:
+    """
+    Pick the copy of the file whose chunk layout matches the query: the
+    time-contiguous copy for single-point timeseries, the original otherwise.
+    """
+    if point_query and nc_file.timeseries_file:
+        return nc_file.timeseries_file.path
+    return nc_file.file.path
 
-    if var not in ds:
-        return {"error": f"Variable '{var}' not found in dataset."}, "error"
 
-    da: xr.DataArray = ds[var]
+def select_plot_data(ds: xr.Dataset, data: dict) -> tuple[xr.DataArray, str, str]:
+    """
+    The requested variable of ``ds`` with the dimension filters and bounding
+    box of a plot request applied, and its lat/lon dimension names.
+    """
+    da: xr.DataArray = ds[data["variable"]]
 
     lat_dim = get_coordinates_dim(da.dims, "lat")
     lon_dim = get_coordinates_dim(da.dims, "lon")
@@ -374,7 +361,7 @@ def create_plot_from_filter(  # noqa: C901, PLR0912
         da = da.assign_coords({lat_dim: ds[lat_var_key], lon_dim: ds[lon_var_key]})
 
     # Apply filters to all available dimensions
-    for dim, vals in filters.items():
+    for dim, vals in data.get("filters", {}).items():
         if dim in da.dims:
             if isinstance(vals, list) and len(vals) == 2:  # noqa: PLR2004
                 # Assume it's a range
@@ -398,19 +385,116 @@ def create_plot_from_filter(  # noqa: C901, PLR0912
     if min_lon is not None and max_lon is not None:
         da = da.sel({lon_dim: slice(min_lon, max_lon)})
 
+    return da, lat_dim, lon_dim
+
+
+def select_climatology(
+    nc_file: NetCDFFile,
+    data: dict,
+    statistic: str,
+) -> xr.DataArray | None:
+    """
+    ``statistic`` of the requested variable from the file's precomputed
+    climatology, with the request's filters and bounding box applied. None
+    when there is no climatology yet, or the request filters on time, which
+    the climatology has already reduced.
+    """
+    if not nc_file.climatology_file or "time" in data.get("filters", {}):
+        return None
+    with xr.open_dataset(nc_file.climatology_file.path) as ds:
+        name = climatology_name(data["variable"], statistic)
+        if name not in ds:
+            return None
+        da, _, _ = select_plot_data(ds, {**data, "variable": name})
+        return da.load()
+
+
+def plot_cache_key(nc_file: NetCDFFile, data: dict, kind: str = "plot") -> str:
+    """
+    Render cache key: the file contents and every plot parameter, output
+    format, DPI and size included.
+    """
+    params = json.dumps(data, sort_keys=True, default=str)
+    digest = hashlib.sha256(params.encode()).hexdigest()
+    return f"netcdf:{kind}:{nc_file.content_hash or nc_file.uuid}:{digest}"
+
+
+def create_plot_from_filter(  # noqa: C901, PLR0912
+    serializer: PlotRequestSerializer,
+) -> tuple[dict, str]:
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+
+    var = data["variable"]
+    lat = data.get("lat")
+    lon = data.get("lon")
+
+    try:
+        nc_file = NetCDFFile.objects.get(uuid=data["uuid"])
+    except NetCDFFile.DoesNotExist:
+        return {"error": "File not found."}, "error"
+
+    cache_key = plot_cache_key(nc_file, data)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached, "success"
+
+    ds = open_dataset(select_dataset_path(nc_file, point_query=bool(lat and lon)))
+
+    if var not in ds:
+        return {"error": f"Variable '{var}' not found in dataset."}, "error"
+
+    da, lat_dim, lon_dim = select_plot_data(ds, data)
+
     if lat and lon and lat_dim in da.coords:
         da = da.sel({lat_dim: [lat], lon_dim: [lon]}, method="nearest")
 
+    # Whether every image that could be drawn was, in full. Results missing
+    # any are only cached briefly, so a transient failure doesn't stick.
+    complete = True
+    started = time.perf_counter()
     try:
         spatial_plot = plot_temperature_map(
             da,
             var=var,
             lat_dim=lat_dim,
             lon_dim=lon_dim,
+            mode=data["render_mode"],
+            output=OutputFormat(
+                data["map_format"],
+                data["dpi"],
+                data.get("width"),
+                data.get("height"),
+            ),
         )
     except Exception:  # noqa: BLE001
         # print(traceback.format_exc()) # noqa: ERA001
         spatial_plot = None
+        complete = False
+    if time.perf_counter() - started >= settings.NETCDF_RENDER_TIME_BUDGET:
+        # Over budget, the map may have been drawn without its contour lines
+        complete = False
+
+    mean_plot = None
+    if not (lat and lon):
+        try:
+            # Read from the precomputed climatology when there is one, so
+            # the time series is only reduced here until it's built
+            mean_plot = get_spatial_plot(
+                da,
+                var,
+                output=OutputFormat(
+                    data["map_format"],
+                    data["dpi"],
+                    data.get("width"),
+                    data.get("height"),
+                ),
+                annual_mean=select_climatology(nc_file, data, "annual_mean"),
+            )
+        except Exception:  # noqa: BLE001
+            mean_plot = None
+            complete = False
+
     try:
         plotly_map_data = generate_plotly_geospatial_map(
             da,
@@ -421,6 +505,7 @@ def create_plot_from_filter(  # noqa: C901, PLR0912
     except Exception:  # noqa: BLE001
         # print(traceback.format_exc())  # noqa: ERA001
         plotly_map_data = None
+        complete = False
 
     try:
         timeseries = get_timeseries(
@@ -431,13 +516,95 @@ def create_plot_from_filter(  # noqa: C901, PLR0912
             var=var,
             lat_dim=lat_dim,
             lon_dim=lon_dim,
+            output=OutputFormat(
+                data["timeseries_format"],
+                data["dpi"],
+                data.get("width"),
+                data.get("height"),
+            ),
         )
     except Exception:  # noqa: BLE001
         # print(traceback.format_exc()) # noqa: ERA001
         timeseries = None
+        complete = False
 
-    return {
+    result = {
         "spatial_image": spatial_plot,
+        "mean_image": mean_plot,
         "timeseries_image": timeseries,
         "plotly": plotly_map_data,
-    }, "success"
+    }
+    cache.set(
+        cache_key,
+        result,
+        timeout=(
+            settings.NETCDF_PLOT_CACHE_TIMEOUT
+            if complete
+            else settings.NETCDF_PLOT_PARTIAL_CACHE_TIMEOUT
+        ),
+    )
+    return result, "success"
+
+
+def create_change_from_filter(
+    nc_file: NetCDFFile,
+    serializer: ChangeRequestSerializer,
+) -> tuple[dict, str]:
+    """
+    Change of a variable's mean over the target window, against its mean
+    over the baseline window or against the file's climatology.
+    """
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    var = data["variable"]
+
+    cache_key = plot_cache_key(nc_file, data, kind="change")
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached, "success"
+
+    ds = open_dataset(select_dataset_path(nc_file, point_query=False))
+    if var not in ds:
+        return {"error": f"Variable '{var}' not found in dataset."}, "error"
+
+    da, _, _ = select_plot_data(ds, data)
+    if "time" not in da.dims:
+        return {"error": f"Variable '{var}' has no time dimension."}, "error"
+
+    block = settings.NETCDF_CLIMATOLOGY_TIME_BLOCK
+    if data["reference"] == "climatology":
+        reference = select_climatology(nc_file, data, "annual_mean")
+        if reference is None:
+            return {"error": "No climatology computed for this file yet."}, "error"
+        baseline = "climatology"
+    else:
+        baseline = [data["baseline_start"], data["baseline_end"]]
+    try:
+        if data["reference"] == "window":
+            reference = window_mean(da, *baseline, block=block)
+        target = window_mean(
+            da,
+            data["target_start"],
+            data["target_end"],
+            block=block,
+        )
+    except ValueError as e:
+        return {"error": str(e)}, "error"
+
+    result_da = change(target, reference, relative=data["relative"])
+    result = {
+        "variable": var,
+        "baseline": baseline,
+        "target": [data["target_start"], data["target_end"]],
+        "relative": data["relative"],
+        "dims": list(result_da.dims),
+        "coords": {
+            dim: serialize_dimension_values(result_da[dim].values)
+            for dim in result_da.dims
+            if dim in result_da.coords
+        },
+        "values": np.where(np.isnan(result_da.values), None, result_da.values).tolist(),
+        "summary": change_summary(result_da),
+    }
+    cache.set(cache_key, result, timeout=settings.NETCDF_PLOT_CACHE_TIMEOUT)
+    return result, "success"
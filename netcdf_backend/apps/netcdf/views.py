@@ -1,19 +1,77 @@
+import io
+from pathlib import Path
+
+from celery import states
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
 from rest_framework import status
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import AllowAny
 from rest_framework.request import Request
 from rest_framework.views import APIView
 
-from netcdf_backend.apps.netcdf.models import FileCache, NetCDFFile
+from netcdf_backend.apps.netcdf.models import ClimateData, NetCDFFile, UploadSession
 from netcdf_backend.apps.netcdf.serializers import (
-    FileResponseSerializer,
+    AnimationRequestSerializer,
+    ChangeRequestSerializer,
     FilterParameterSerializer,
     NetCDFFileSerializer,
     PlotRequestSerializer,
+    UploadSessionSerializer,
+    ZonalStatisticsRequestSerializer,
+)
+from netcdf_backend.apps.netcdf.services.animation import (
+    animation_key,
+    animation_name,
+)
+from netcdf_backend.apps.netcdf.services.cache_lookup import (
+    get_cached_file,
+    invalidate,
+    set_pending,
+)
+from netcdf_backend.apps.netcdf.services.downloads import (
+    COMPRESSED_FILE_TYPES,
+    artifact_etag,
+    artifact_response,
+    negotiate_encoding,
+)
+from netcdf_backend.apps.netcdf.services.eviction import record_hit
+from netcdf_backend.apps.netcdf.services.jobs import job_status
+from netcdf_backend.apps.netcdf.services.precompute import (
+    Combination,
+    is_outdated,
+    normalize_variable,
+)
+from netcdf_backend.apps.netcdf.services.uploads import (
+    SHA256UploadHandler,
+    UploadBusyError,
+    UploadLimitExceededError,
+    file_sha256,
+    hold_upload,
+    write_chunk,
+)
+from netcdf_backend.apps.netcdf.services.zonal import (
+    combination_statistics,
+    write_csv,
+)
+from netcdf_backend.apps.netcdf.tasks import (
+    BATCH_PRIORITY,
+    convert_netcdf_to_zarr,
+    create_climatology,
+    create_timeseries_copy,
+    enqueue_animation,
+    enqueue_processing,
 )
-from netcdf_backend.apps.netcdf.tasks import process_and_cache_netcdf
 from netcdf_backend.apps.netcdf.utils import (
+    create_change_from_filter,
     create_plot_from_filter,
     extract_netcdf_metadata,
 )
@@ -21,6 +79,34 @@ from netcdf_backend.core.error_response import ErrorResponse
 from netcdf_backend.core.success_response import SuccessResponse
 
 
+def netcdf_file_metadata(instance: NetCDFFile) -> dict:
+    """Metadata of a stored file, extracted once and then read from the row."""
+    if instance.metadata is None:
+        instance.metadata = extract_netcdf_metadata(instance.file.path)
+        instance.save(update_fields=["metadata"])
+    metadata = dict(instance.metadata)
+    metadata["uuid"] = instance.uuid
+    metadata["created_at"] = instance.created_at
+    return metadata
+
+
+def ingest_netcdf_file(instance: NetCDFFile) -> dict:
+    """Schedule the derived copies of a new upload and return its metadata."""
+    if settings.NETCDF_TIMESERIES_COPY_ENABLED:
+        transaction.on_commit(
+            lambda: create_timeseries_copy.delay(str(instance.uuid)),
+        )
+    if settings.NETCDF_ZARR_ENABLED:
+        transaction.on_commit(
+            lambda: convert_netcdf_to_zarr.delay(str(instance.uuid)),
+        )
+    if settings.NETCDF_CLIMATOLOGY_ENABLED:
+        transaction.on_commit(
+            lambda: create_climatology.delay(str(instance.uuid)),
+        )
+    return netcdf_file_metadata(instance)
+
+
 class NetCDFUploadView(APIView):
     serializer_class = NetCDFFileSerializer
     permission_classes = [AllowAny]
@@ -28,13 +114,225 @@ class NetCDFUploadView(APIView):
     parser_classes = [MultiPartParser, FormParser]
 
     def post(self, request: Request):
+        # Must be installed before request.data parses the multipart body.
+        hasher = SHA256UploadHandler(request)
+        request.upload_handlers.insert(0, hasher)
+
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
+        content_hash = hasher.hashes["file"]
+
+        # Identical contents reuse the stored file, metadata and derived caches.
+        existing = NetCDFFile.objects.filter(content_hash=content_hash).first()
+        if existing is not None:
+            return SuccessResponse(
+                status=status.HTTP_200_OK,
+                data=netcdf_file_metadata(existing),
+            )
+
+        instance = NetCDFFile(**serializer.validated_data, content_hash=content_hash)
+        try:
+            with transaction.atomic():
+                instance.save()
+        except IntegrityError:
+            # Lost a race with a concurrent upload of the same file, after
+            # our copy was stored.
+            instance.file.delete(save=False)
+            existing = NetCDFFile.objects.get(content_hash=content_hash)
+            return SuccessResponse(
+                status=status.HTTP_200_OK,
+                data=netcdf_file_metadata(existing),
+            )
+
+        metadata = ingest_netcdf_file(instance)
+        return SuccessResponse(status=status.HTTP_200_OK, data=metadata)
+
+
+class UploadSessionCreateView(APIView):
+    """Start a resumable upload; chunks are then PATCHed to the session."""
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request: Request):
+        serializer = UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         serializer.save()
-        instance = serializer.instance
-        metadata = extract_netcdf_metadata(instance.file.path)
-        metadata["uuid"] = instance.uuid
-        metadata["created_at"] = instance.created_at
+        response = SuccessResponse(
+            status=status.HTTP_201_CREATED,
+            data=serializer.data,
+        )
+        response["Upload-Offset"] = serializer.instance.offset
+        return response
+
+
+# No request-wide transaction: chunks stream in and files are hashed for
+# minutes, while the row only needs updating once they are done.
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
+class UploadSessionView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request: Request, uuid: str):
+        session = get_object_or_404(UploadSession, uuid=uuid)
+        response = SuccessResponse(
+            status=status.HTTP_200_OK,
+            data=UploadSessionSerializer(session).data,
+        )
+        response["Upload-Offset"] = session.offset
+        return response
+
+    def patch(self, request: Request, uuid: str):
+        """
+        Append the raw request body at the `Upload-Offset` header, which must
+        match the bytes already received (fetch it with GET after a dropped
+        connection). A file lock serializes concurrent chunks; the row is
+        only touched to check and advance the offset, so no transaction stays
+        open while the chunk streams in.
+        """
+        session = get_object_or_404(UploadSession, uuid=uuid)
+        if session.status != UploadSession.STATUS_UPLOADING:
+            return ErrorResponse(
+                status=status.HTTP_409_CONFLICT,
+                message="Upload has already been finalized.",
+            )
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+        except ValueError:
+            return ErrorResponse(
+                status=status.HTTP_400_BAD_REQUEST,
+                message="A numeric Upload-Offset header is required.",
+            )
+
+        path = Path(default_storage.path(session.storage_name))
+        try:
+            with hold_upload(path):
+                # Current as of the lock: every writer advances it before
+                # releasing the lock.
+                session.refresh_from_db(fields=["offset", "status"])
+                if session.status != UploadSession.STATUS_UPLOADING:
+                    return ErrorResponse(
+                        status=status.HTTP_409_CONFLICT,
+                        message="Upload has already been finalized.",
+                    )
+                if offset != session.offset:
+                    return ErrorResponse(
+                        status=status.HTTP_409_CONFLICT,
+                        message=f"Upload-Offset must be {session.offset}.",
+                    )
+
+                written = write_chunk(
+                    path,
+                    offset,
+                    request.stream or io.BytesIO(),
+                    max_bytes=session.size - offset,
+                )
+                UploadSession.objects.filter(pk=session.pk, offset=offset).update(
+                    offset=offset + written,
+                    updated_at=timezone.now(),
+                )
+                session.offset = offset + written
+        except UploadBusyError:
+            return ErrorResponse(
+                status=status.HTTP_409_CONFLICT,
+                message="Another chunk of this upload is being written.",
+            )
+        except UploadLimitExceededError:
+            return ErrorResponse(
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                message=f"Chunk exceeds the declared upload size of {session.size}.",
+            )
+
+        response = SuccessResponse(
+            status=status.HTTP_200_OK,
+            data=UploadSessionSerializer(session).data,
+        )
+        response["Upload-Offset"] = session.offset
+        return response
+
+
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
+class UploadSessionFinalizeView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request: Request, uuid: str):
+        """
+        Turn a complete upload into a NetCDFFile. The file lock keeps chunks
+        and other finalizations out while the contents are hashed, outside
+        any transaction.
+        """
+        session = get_object_or_404(UploadSession, uuid=uuid)
+        if session.status == UploadSession.STATUS_COMPLETED:
+            # Checked again under the lock; this keeps the lock from creating
+            # the file again after a deduplicated finalization removed it
+            return ErrorResponse(
+                status=status.HTTP_409_CONFLICT,
+                message="Upload has already been finalized.",
+            )
+        path = Path(default_storage.path(session.storage_name))
+        try:
+            with hold_upload(path):
+                return self.finalize(session, path)
+        except UploadBusyError:
+            return ErrorResponse(
+                status=status.HTTP_409_CONFLICT,
+                message="A chunk of this upload is still being written.",
+            )
+
+    def finalize(self, session: UploadSession, path: Path):
+        session.refresh_from_db(fields=["offset", "status"])
+        if session.status == UploadSession.STATUS_COMPLETED:
+            return ErrorResponse(
+                status=status.HTTP_409_CONFLICT,
+                message="Upload has already been finalized.",
+            )
+        if session.offset != session.size:
+            return ErrorResponse(
+                status=status.HTTP_400_BAD_REQUEST,
+                message=f"Upload incomplete: {session.offset} of {session.size} bytes received.",  # noqa: E501
+            )
+
+        content_hash = file_sha256(path)
+        if session.checksum and content_hash != session.checksum:
+            # The bytes on disk can't be trusted, so the client starts over.
+            path.unlink(missing_ok=True)
+            UploadSession.objects.filter(pk=session.pk).update(
+                offset=0,
+                updated_at=timezone.now(),
+            )
+            return ErrorResponse(
+                status=status.HTTP_400_BAD_REQUEST,
+                message="Checksum mismatch, the upload has been reset.",
+            )
+
+        existing = NetCDFFile.objects.filter(content_hash=content_hash).first()
+        if existing is None:
+            try:
+                with transaction.atomic():
+                    # The chunks were written to the final location, so no
+                    # copy is needed.
+                    instance = NetCDFFile.objects.create(
+                        file=session.storage_name,
+                        content_hash=content_hash,
+                    )
+            except IntegrityError:
+                # Lost a race with a concurrent upload of the same file.
+                existing = NetCDFFile.objects.get(content_hash=content_hash)
+        if existing is not None:
+            # Same contents as a stored file: reuse it and drop the new bytes.
+            path.unlink(missing_ok=True)
+            instance = existing
+
+        session.netcdf_file = instance
+        session.status = UploadSession.STATUS_COMPLETED
+        session.save(update_fields=["netcdf_file", "status", "updated_at"])
+
+        metadata = (
+            netcdf_file_metadata(instance)
+            if existing is not None
+            else ingest_netcdf_file(instance)
+        )
         return SuccessResponse(status=status.HTTP_200_OK, data=metadata)
 
 
@@ -44,10 +342,10 @@ class NetCDFMetadata(APIView):
 
     def get(self, request: Request, uuid: str):
         obj = get_object_or_404(NetCDFFile, uuid=uuid)
-        metadata = extract_netcdf_metadata(obj.file.path)
-        metadata["uuid"] = uuid
-        metadata["created_at"] = obj.created_at
-        return SuccessResponse(status=status.HTTP_200_OK, data=metadata)
+        return SuccessResponse(
+            status=status.HTTP_200_OK,
+            data=netcdf_file_metadata(obj),
+        )
 
 
 class NCDataPlot(APIView):
@@ -67,96 +365,239 @@ class NCDataPlot(APIView):
         )
 
 
-class GeoTIFFView(APIView):
+class NCDataChange(APIView):
     permission_classes = [AllowAny]
     authentication_classes = []
 
-    def get(self, request):
-        serializer = FilterParameterSerializer(data=request.query_params)
-        serializer.is_valid(raise_exception=True)
-        data = serializer.validated_data
+    def post(self, request: Request, uuid: str):
+        nc_file = get_object_or_404(NetCDFFile, uuid=uuid)
+        serializer = ChangeRequestSerializer(data=request.data)
+        response = create_change_from_filter(nc_file, serializer=serializer)
+        return (
+            SuccessResponse(status=status.HTTP_200_OK, data=response[0])
+            if response[1] == "success"
+            else ErrorResponse(
+                status=status.HTTP_400_BAD_REQUEST,
+                message=response[0]["error"],
+            )
+        )
 
-        scenario = data["scenario"]
-        season = data["season"]
-        period = data["period"]
-        variable = data["variable"]
-        variable = variable + "max" if variable == "tas" else data["variable"]
 
-        # Check cache
-        try:
-            cached = FileCache.objects.get(
-                file_type="geotiff",
-                scenario=scenario,
-                variable=variable,
-                season=season,
-                period=period,
-            )
+class NCDataAnimation(APIView):
+    """
+    Animated map of a variable through time. Returns the cached animation's
+    URL, or starts a background job rendering it and returns the job id.
+    """
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request: Request, uuid: str):
+        nc_file = get_object_or_404(NetCDFFile, uuid=uuid)
+        serializer = AnimationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.data)
+
+        key = animation_key(nc_file.content_hash or str(nc_file.uuid), data)
+        name = animation_name(key, data["format"])
+        if default_storage.exists(name):
             return SuccessResponse(
                 status=status.HTTP_200_OK,
-                data=FileResponseSerializer(
-                    cached,
-                ).data,
-            )
-        except FileCache.DoesNotExist:
-            # Trigger async task
-            file = f"netcdf_backend/data/annual/{variable}_day_Ensmean_{scenario}_r1i1p1f1_gr_merged.nc"  # noqa: E501
-            region_bbox = [29, -11.75, 40.5, -1]  # Tanzania
-            print("Processing....")
-            process_and_cache_netcdf.delay(
-                file,
-                scenario=scenario,
-                variable=variable,
-                season=season,
-                period=period,
-                region_bbox=region_bbox,
-            )
-            return SuccessResponse(
-                status=status.HTTP_202_ACCEPTED,
-                data={"status": "Processing started, try again later"},
+                data={"name": name, "url": default_storage.url(name)},
             )
 
+        job_id = enqueue_animation(str(nc_file.uuid), data, key)
+        return SuccessResponse(
+            status=status.HTTP_202_ACCEPTED,
+            data={"status": "Rendering started, try again later", "job_id": job_id},
+        )
+
+
+class CachedFileView(APIView):
+    """Returns the cached artifact of a combination, computing it on a miss."""
 
-class GeoJSONView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = []
+    file_type: str
 
     def get(self, request: Request):
         serializer = FilterParameterSerializer(data=request.query_params)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        scenario = data["scenario"]
-        season = data["season"]
-        period = data["period"]
-        variable = data["variable"]
-        variable = variable + "max" if variable == "tas" else data["variable"]
+        combination = Combination(
+            scenario=data["scenario"],
+            variable=normalize_variable(data["variable"]),
+            season=data["season"],
+            period=data["period"],
+            region=data["region"],
+        )
 
         # Check cache
-        try:
-            cached = FileCache.objects.get(
-                file_type="geojson",
-                scenario=scenario,
-                variable=variable,
-                season=season,
-                period=period,
-            )
-            data = FileResponseSerializer(
-                cached,
-            ).data
-            return SuccessResponse(status=status.HTTP_200_OK, data=data)
-        except FileCache.DoesNotExist:
-            # Trigger async task
-            file = f"netcdf_backend/data/annual/{variable}_day_Ensmean_{scenario}_r1i1p1f1_gr_merged.nc"  # noqa: E501
-            region_bbox = [29, -11.75, 40.5, -1]
-            process_and_cache_netcdf.delay(
-                file,
-                scenario=scenario,
-                variable=variable,
-                season=season,
-                period=period,
-                region_bbox=region_bbox,
-            )
+        cached = get_cached_file(self.file_type, combination)
+        if (
+            cached is not None
+            and "job_id" in cached
+            and job_status(cached["job_id"])["state"] in states.READY_STATES
+        ):
+            # The job the marker points at is over, whether it stored the
+            # artifact or failed: look again instead of waiting on it
+            invalidate(self.file_type, combination)
+            cached = get_cached_file(self.file_type, combination)
+
+        if cached is not None and "job_id" not in cached:
+            record_hit(self.file_type, combination)
+            response = self.cached_response(request, cached)
+            # Serve artifacts built from outdated inputs while a background
+            # job regenerates them
+            if is_outdated(combination, cached.get("source_fingerprint", "")):
+                enqueue_processing(combination, priority=BATCH_PRIORITY)
+                response["Cache-Control"] = "no-cache"
+                response["X-Cache-Status"] = "stale"
+            return response
+
+        # Misses while a job is in flight attach to it instead of
+        # enqueueing duplicate work. The marker is only set here, never
+        # refreshed by polls, so it expires soon after the job is gone.
+        if cached is not None:
+            job_id = cached["job_id"]
+        else:
+            job_id = enqueue_processing(combination)
+            set_pending(self.file_type, combination, job_id)
+        response = SuccessResponse(
+            status=status.HTTP_202_ACCEPTED,
+            data={
+                "status": "Processing started, try again later",
+                "job_id": job_id,
+                "eta": job_status(job_id)["eta"],
+            },
+        )
+        response["Cache-Control"] = "no-store"
+        return response
+
+    def cached_response(self, request: Request, cached: dict):
+        """
+        Answer conditional GETs with 304 from the lookup alone. The artifact
+        URL is content-hashed, so only this lookup needs revalidating.
+        """
+        etag = self.etag(request, cached)
+        last_modified = int(parse_datetime(cached["created_at"]).timestamp())
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        if response is None:
+            response = self.build_response(request, cached, last_modified)
+
+        if etag:
+            response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = (
+            f"public, max-age={settings.NETCDF_LOOKUP_MAX_AGE}, must-revalidate"
+        )
+        return response
+
+    def etag(self, request: Request, cached: dict) -> str | None:
+        return quote_etag(cached["file_hash"]) if cached.get("file_hash") else None
+
+    def build_response(self, request: Request, cached: dict, last_modified: int):
+        return SuccessResponse(status=status.HTTP_200_OK, data=cached)
+
+
+class GeoTIFFView(CachedFileView):
+    file_type = "geotiff"
+
+
+class GeoJSONView(CachedFileView):
+    file_type = "geojson"
+
+
+class CachedFileDownloadView(CachedFileView):
+    """Streams the cached artifact itself instead of returning its URL."""
+
+    def cached_response(self, request: Request, cached: dict):
+        response = super().cached_response(request, cached)
+        # 304s too, as their ETag depends on the negotiated encoding
+        if self.file_type in COMPRESSED_FILE_TYPES:
+            patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+    def etag(self, request: Request, cached: dict) -> str | None:
+        if not cached.get("file_hash"):
+            return None
+        encoding = negotiate_encoding(request, self.file_type, cached["name"])
+        return artifact_etag(cached["file_hash"], encoding)
+
+    def build_response(self, request: Request, cached: dict, last_modified: int):
+        return artifact_response(
+            request,
+            cached["name"],
+            self.file_type,
+            file_hash=cached.get("file_hash"),
+            last_modified=last_modified,
+        )
+
+
+class GeoTIFFDownloadView(CachedFileDownloadView):
+    file_type = "geotiff"
+
+
+class GeoJSONDownloadView(CachedFileDownloadView):
+    file_type = "geojson"
+
+
+class ZonalStatisticsView(APIView):
+    """
+    Area-weighted statistics of a combination's result grid over every
+    administrative area of a level, as JSON or CSV. Starts the combination's
+    processing job if it has no results yet.
+    """
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request: Request):
+        serializer = ZonalStatisticsRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        combination = Combination(
+            scenario=data["scenario"],
+            variable=normalize_variable(data["variable"]),
+            season=data["season"],
+            period=data["period"],
+            region=data["region"],
+        )
+        if not ClimateData.objects.filter(**combination.as_kwargs()).exists():
             return SuccessResponse(
                 status=status.HTTP_202_ACCEPTED,
-                data={"status": "Processing started, try again later"},
+                data={
+                    "status": "Processing started, try again later",
+                    "job_id": enqueue_processing(combination),
+                },
             )
+
+        percentiles = settings.NETCDF_ZONAL_PERCENTILES
+        rows = combination_statistics(combination, data["level"], percentiles)
+        if data["format"] == "csv":
+            response = HttpResponse(content_type="text/csv")
+            name = "_".join([*combination.as_kwargs().values(), data["level"]])
+            response["Content-Disposition"] = f'attachment; filename="zonal_{name}.csv"'
+            write_csv(response, rows, percentiles)
+            return response
+        return SuccessResponse(status=status.HTTP_200_OK, data=rows)
+
+
+class JobStatusView(APIView):
+    """
+    Stage-level progress of a preprocessing job. Clients can instead subscribe
+    to the job over the websocket to be notified when it completes.
+    """
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request: Request, job_id: str):
+        return SuccessResponse(status=status.HTTP_200_OK, data=job_status(job_id))
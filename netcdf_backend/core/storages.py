@@ -0,0 +1,16 @@
+from storages.backends.s3 import S3Storage
+
+
+class MediaS3Storage(S3Storage):
+    """
+    Media storage that marks cached artifacts as immutable: they are stored
+    under content-hashed names, so a URL never points at different bytes.
+    """
+
+    immutable_prefix = "caches/"
+
+    def get_object_parameters(self, name):
+        params = super().get_object_parameters(name)
+        if name.startswith(self.immutable_prefix):
+            params["CacheControl"] = "public, max-age=31536000, immutable"
+        return params
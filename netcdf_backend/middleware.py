@@ -1,4 +1,7 @@
 class CORSMiddlewareForMedia:
+    # Cached artifacts are stored under content-hashed names and never change.
+    immutable_prefix = "/media/caches/"
+
     def __init__(self, get_response):
         self.get_response = get_response
 
@@ -10,4 +13,10 @@ class CORSMiddlewareForMedia:
             response["Access-Control-Allow-Methods"] = "GET, OPTIONS"
             response["Access-Control-Allow-Headers"] = "Content-Type"
 
+        if (
+            request.path.startswith(self.immutable_prefix)
+            and response.status_code == 200  # noqa: PLR2004
+        ):
+            response["Cache-Control"] = "public, max-age=31536000, immutable"
+
         return response